@@ -1,13 +1,29 @@
-"""FastAPI: list pending approvals, approve/deny by id (MongoDB)."""
+"""FastAPI: list pending approvals, approve/deny by id (MongoDB), wait for resolution."""
+import asyncio
+import json
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
+from typing import Literal
 
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pymongo import ReturnDocument
 
+from app.config import settings
 from app.db import APPROVALS_COLLECTION, get_db
-from app.models import ApprovalResponse, ApproveDenyBody
+from app.approval_store import resolve_approvals
+from app.models import (
+    ApprovalResponse,
+    ApprovalStatus,
+    ApprovalSummary,
+    ApproveDenyBody,
+    BulkResolveBody,
+    BulkResolveResponse,
+)
+from app.notify import get_notifier
+from app.pagination import NEWEST_FIRST, page_query
 
 router = APIRouter(prefix="/approvals", tags=["approvals"])
 
@@ -26,9 +42,44 @@ def _doc_to_approval_response(doc: dict) -> ApprovalResponse:
         resolved_at=doc.get("resolved_at"),
         resolved_by=doc.get("resolved_by"),
         created_at=doc.get("created_at") or datetime.now(timezone.utc),
+        occurrences=doc.get("occurrences", 1),
+        last_seen_at=doc.get("last_seen_at"),
     )
 
 
+def _doc_to_approval_summary(doc: dict) -> ApprovalSummary:
+    return ApprovalSummary(
+        id=str(doc["_id"]),
+        action_id=doc["action_id"],
+        agent_id=doc["agent_id"],
+        action_type=doc["action_type"],
+        resource=doc.get("resource", ""),
+        risk_score=doc.get("risk_score", 0.0),
+        reason=doc.get("reason", ""),
+        status=doc["status"],
+        resolved_at=doc.get("resolved_at"),
+        resolved_by=doc.get("resolved_by"),
+        created_at=doc.get("created_at") or datetime.now(timezone.utc),
+        occurrences=doc.get("occurrences", 1),
+        last_seen_at=doc.get("last_seen_at"),
+    )
+
+
+async def _json_array(cursor, serialize) -> AsyncIterator[bytes]:
+    """Serialize documents as they arrive from the cursor, one batch per chunk."""
+    yield b"["
+    chunk: list[str] = []
+    first = True
+    async for doc in cursor:
+        chunk.append(serialize(doc).model_dump_json())
+        if len(chunk) >= 100:
+            yield ((b"" if first else b",") + ",".join(chunk).encode())
+            chunk, first = [], False
+    if chunk:
+        yield ((b"" if first else b",") + ",".join(chunk).encode())
+    yield b"]"
+
+
 def _parse_oid(approval_id: str) -> ObjectId:
     try:
         return ObjectId(approval_id)
@@ -36,16 +87,137 @@ def _parse_oid(approval_id: str) -> ObjectId:
         raise HTTPException(status_code=404, detail="Approval not found")
 
 
-@router.get("", response_model=list[ApprovalResponse])
+_LIST_RESPONSES = {
+    200: {
+        # Documentation only: the handler streams JSON itself, so FastAPI never validates it.
+        "model": list[ApprovalResponse] | list[ApprovalSummary],
+        "description": "ApprovalResponse items (ApprovalSummary with view=summary), newest first",
+        "headers": {
+            "X-Next-Cursor": {"description": "Pass as `after` for the next page; absent on the last page", "schema": {"type": "string"}},
+        },
+    },
+}
+
+
+@router.get("", response_class=StreamingResponse, responses=_LIST_RESPONSES)
 async def list_approvals(
+    request: Request,
     status: str | None = None,
+    limit: int | None = Query(None, ge=1, le=settings.approvals_page_max_limit),
+    after: str | None = None,
+    view: Literal["full", "summary"] = "full",
+    list_all: bool = Query(False, alias="all"),
     db=Depends(get_db),
 ):
-    """List approvals; optional filter by status (pending, approved, denied)."""
+    """
+    List approvals newest first, one page per call; optional filter by status (pending,
+    approved, denied). `limit` defaults to APPROVALS_PAGE_DEFAULT_LIMIT: pass the X-Next-Cursor
+    response header as `after` for the next page (absent on the last page). all=true instead
+    streams every matching approval and cannot be combined with limit or after.
+    view=summary leaves out payload.
+    """
     query = {} if status is None else {"status": status}
-    cursor = db[APPROVALS_COLLECTION].find(query).sort("created_at", -1)
-    docs = await cursor.to_list(length=None)
-    return [_doc_to_approval_response(d) for d in docs]
+    collection = db[APPROVALS_COLLECTION]
+    if list_all:
+        if limit is not None or after is not None:
+            raise HTTPException(status_code=400, detail="all=true cannot be combined with limit or after")
+        page, next_cursor = query, None
+    else:
+        limit = limit or settings.approvals_page_default_limit
+        try:
+            page, next_cursor = await page_query(collection, query, limit, after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    projection = {"payload": 0} if view == "summary" else None
+    cursor = collection.find(page, projection).sort(NEWEST_FIRST).batch_size(min(limit or 1000, 1000))
+    serialize = _doc_to_approval_summary if view == "summary" else _doc_to_approval_response
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(after=next_cursor)}>; rel="next"'
+    return StreamingResponse(_json_array(cursor, serialize), media_type="application/json", headers=headers)
+
+
+async def _sse_events(request: Request, statuses: set[str] | None) -> AsyncIterator[bytes]:
+    notifier = get_notifier()
+    sub = notifier.subscribe()
+    try:
+        yield b": connected\n\n"
+        while not sub.overflowed:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), settings.approval_events_keepalive_seconds)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield b": keepalive\n\n"
+                continue
+            if statuses is None or event["status"] in statuses:
+                yield f"event: approval\ndata: {json.dumps(event)}\n\n".encode()
+        # Too slow to keep up; the client should reconnect and re-list pending approvals.
+        yield b"event: overflow\ndata: {}\n\n"
+    finally:
+        notifier.unsubscribe(sub)
+
+
+@router.get("/events")
+async def approval_events(request: Request, status: str | None = None):
+    """
+    Server-sent events: one `approval` event (ApprovalStatus JSON) per resolution. With the
+    change-stream notifier that covers every worker. When it falls back to polling,
+    only resolutions made on this worker are sent, plus other workers' resolutions of ids
+    someone on this worker is waiting for, up to APPROVAL_WAIT_POLL_INTERVAL_SECONDS late.
+    status: optional comma-separated filter (approved, denied).
+    """
+    statuses = set(status.split(",")) if status else None
+    return StreamingResponse(
+        _sse_events(request, statuses),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _bulk_resolve(body: BulkResolveBody, status: str, db) -> BulkResolveResponse:
+    if body.ids is not None:
+        if len(body.ids) > settings.bulk_resolve_max_ids:
+            raise HTTPException(status_code=413, detail=f"At most {settings.bulk_resolve_max_ids} ids per request")
+        outcomes, resolved = await resolve_approvals(db, status, body.resolved_by or "api", ids=body.ids)
+    else:
+        query: dict = {}
+        if body.agent_id is not None:
+            query["agent_id"] = body.agent_id
+        if body.action_type is not None:
+            query["action_type"] = body.action_type
+        if body.created_before is not None:
+            query["created_at"] = {"$lt": body.created_before}
+        if not query:
+            raise HTTPException(status_code=422, detail="Provide ids or at least one of agent_id, action_type, created_before")
+        # Same cap as for ids, all or nothing: pin the matches first so approvals created meanwhile are left alone.
+        limit = settings.bulk_resolve_max_ids
+        cursor = db[APPROVALS_COLLECTION].find({**query, "status": "pending"}, {"_id": 1}).limit(limit + 1)
+        matches = await cursor.to_list(length=None)
+        if len(matches) > limit:
+            raise HTTPException(
+                status_code=413,
+                detail=f"More than {limit} pending approvals match; narrow the filter (e.g. created_before) or pass ids",
+            )
+        query["_id"] = {"$in": [d["_id"] for d in matches]}
+        outcomes, resolved = await resolve_approvals(db, status, body.resolved_by or "api", query=query)
+    notifier = get_notifier()
+    for doc in resolved:
+        notifier.publish(doc)
+    return BulkResolveResponse(status=status, resolved=len(resolved), items=outcomes)
+
+
+@router.post("/bulk/approve", response_model=BulkResolveResponse)
+async def bulk_approve(body: BulkResolveBody, db=Depends(get_db)):
+    """Approve many pending approvals with one update; per-id outcomes in `items`."""
+    return await _bulk_resolve(body, "approved", db)
+
+
+@router.post("/bulk/deny", response_model=BulkResolveResponse)
+async def bulk_deny(body: BulkResolveBody, db=Depends(get_db)):
+    """Deny many pending approvals with one update; per-id outcomes in `items`."""
+    return await _bulk_resolve(body, "denied", db)
 
 
 @router.get("/{approval_id}", response_model=ApprovalResponse)
@@ -60,6 +232,20 @@ async def get_approval(
     return _doc_to_approval_response(doc)
 
 
+@router.get("/{approval_id}/wait", response_model=ApprovalStatus)
+async def wait_for_approval(
+    approval_id: str,
+    timeout: float = Query(30.0, ge=0, le=settings.approval_wait_max_seconds),
+    db=Depends(get_db),
+):
+    """Long poll: returns as soon as the approval is resolved, or its pending state after `timeout` seconds."""
+    oid = _parse_oid(approval_id)
+    event = await get_notifier().wait(db, oid, timeout)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Approval not found")
+    return event
+
+
 @router.post("/{approval_id}/approve", response_model=ApprovalResponse)
 async def approve(
     approval_id: str,
@@ -79,6 +265,7 @@ async def approve(
         if not existing:
             raise HTTPException(status_code=404, detail="Approval not found")
         raise HTTPException(status_code=400, detail=f"Approval already {existing['status']}")
+    get_notifier().publish(doc)
     return _doc_to_approval_response(doc)
 
 
@@ -101,4 +288,5 @@ async def deny(
         if not existing:
             raise HTTPException(status_code=404, detail="Approval not found")
         raise HTTPException(status_code=400, detail=f"Approval already {existing['status']}")
+    get_notifier().publish(doc)
     return _doc_to_approval_response(doc)
@@ -1,17 +1,152 @@
 """Evaluate action: policy engine + LLM (if unknown) + approval/rewrite."""
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from collections import deque
+from collections.abc import AsyncIterator
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.config import settings
 from app.db import get_db
-from app.models import Action, EvaluateResponse
-from app.pipeline import run_pipeline
+from app.models import Action, BatchEvaluateItem, EvaluateResponse
+from app.pipeline import run_pipeline, run_pipeline_batch
+from app.policy.store import get_snapshot
 
 router = APIRouter(tags=["decide"])
 
 
+def _deadline_header(x_deadline_ms: float | None = Header(None, gt=0, description="Shorter LLM deadline for this request")) -> float | None:
+    return x_deadline_ms / 1000 if x_deadline_ms is not None else None
+
+
 @router.post("/evaluate", response_model=EvaluateResponse)
 async def evaluate_action_endpoint(
     action: Action,
     db=Depends(get_db),
+    deadline_seconds: float | None = Depends(_deadline_header),
+    explain: bool = Query(False, description="Include the deciding policy rule and how many rules were tried"),
 ):
     """Full pipeline: policy -> LLM if unknown -> decision. Uses shared run_pipeline."""
-    return await run_pipeline(db, action)
+    return await run_pipeline(db, action, deadline_seconds=deadline_seconds, explain=explain)
+
+
+@router.post("/evaluate/batch", response_model=list[BatchEvaluateItem])
+async def evaluate_batch_endpoint(
+    actions: list[Action],
+    db=Depends(get_db),
+    deadline_seconds: float | None = Depends(_deadline_header),
+):
+    """Evaluate a list of actions in one request. Results are in input order, with per-item errors."""
+    if len(actions) > settings.batch_max_actions:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_actions} actions per batch")
+    return await run_pipeline_batch(db, actions, deadline_seconds=deadline_seconds)
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body generator reads the request body itself.
+
+    The stock response listens for http.disconnect on older ASGI servers, which would compete
+    with request.stream() for receive() messages; a disconnect still surfaces as a send error.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[tuple[int, bytes | None]]:
+    """Yield (line_number, line) from the body as it arrives; line is None if it exceeds the size limit."""
+    max_bytes = settings.ndjson_max_line_bytes
+    buffer = bytearray()
+    line_no = 0
+    oversized = False
+    async for chunk in request.stream():
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not oversized:
+                    buffer += chunk[start:]
+                    oversized = len(buffer) > max_bytes
+                break
+            line_no += 1
+            if not oversized:
+                buffer += chunk[start:end]
+            if oversized or len(buffer) > max_bytes:
+                yield line_no, None
+            elif buffer.strip():
+                yield line_no, bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+    if oversized or buffer.strip():
+        yield line_no + 1, None if oversized else bytes(buffer)
+
+
+async def _evaluate_line(db, policy, line_no: int, line: bytes | None) -> bytes:
+    if line is None:
+        out = {"line": line_no, "error": f"line exceeds {settings.ndjson_max_line_bytes} bytes"}
+        return json.dumps(out).encode() + b"\n"
+    try:
+        action = Action.model_validate_json(line)
+    except ValidationError as e:
+        out = {"line": line_no, "error": f"invalid action: {e!s}"[:500]}
+        return json.dumps(out).encode() + b"\n"
+    try:
+        response = await run_pipeline(db, action, policy, source="ndjson")
+    except Exception as e:
+        out = {"line": line_no, "action_id": action.action_id, "error": f"{type(e).__name__}: {e!s}"[:500]}
+        return json.dumps(out).encode() + b"\n"
+    return response.model_dump_json().encode() + b"\n"
+
+
+async def _evaluate_ndjson(db, request: Request, ordered: bool, window: int) -> AsyncIterator[bytes]:
+    policy = (await get_snapshot(db)).policy
+    in_flight: deque[asyncio.Task] | set[asyncio.Task] = deque() if ordered else set()
+    try:
+        async for line_no, line in _ndjson_lines(request):
+            task = asyncio.create_task(_evaluate_line(db, policy, line_no, line))
+            if ordered:
+                in_flight.append(task)
+                # Emit whatever is already finished at the head, then block only if the window is full.
+                while in_flight and (in_flight[0].done() or len(in_flight) >= window):
+                    yield await in_flight.popleft()
+            else:
+                in_flight.add(task)
+                if len(in_flight) >= window:
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for finished in done:
+                        in_flight.remove(finished)
+                        yield finished.result()
+        if ordered:
+            while in_flight:
+                yield await in_flight.popleft()
+        else:
+            for finished in asyncio.as_completed(in_flight):
+                yield await finished
+            in_flight.clear()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+@router.post("/evaluate/stream")
+async def evaluate_stream_endpoint(
+    request: Request,
+    ordered: bool = Query(True, description="Return results in input order; false streams them as they finish"),
+    window: int | None = Query(None, ge=1, description="Max actions evaluated concurrently"),
+    db=Depends(get_db),
+):
+    """
+    NDJSON in, NDJSON out: one Action per request line, one EvaluateResponse per response line
+    (or {"line", "error"} for lines that fail). The body is parsed as it arrives and at most
+    `window` actions are in flight. Out-of-order results are matched by action_id.
+    """
+    window = min(window or settings.ndjson_max_in_flight, settings.ndjson_max_in_flight)
+    return _DuplexStreamingResponse(
+        _evaluate_ndjson(db, request, ordered, window),
+        media_type="application/x-ndjson",
+    )
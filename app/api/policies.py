@@ -1,14 +1,27 @@
 """FastAPI CRUD for policy rules (MongoDB)."""
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pymongo import ReturnDocument
 
 from app.db import POLICIES_COLLECTION, get_db
-from app.models import PolicyCreate, PolicyResponse
+from app.models import PolicyCreate, PolicyResponse, PolicyRuleStats, PolicySnapshotInfo, PolicyStats
+from app.policy.compiler import validate_definition
+from app.policy.engine import profile_by_policy
+from app.policy.store import current_snapshot, notify_policies_changed, sync_mode
 
 router = APIRouter(prefix="/policies", tags=["policies"])
 
 
+def _parse_oid(policy_id: str) -> ObjectId:
+    try:
+        return ObjectId(policy_id)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Policy not found")
+
+
 def _doc_to_policy_response(doc: dict) -> PolicyResponse:
     return PolicyResponse(
         id=str(doc["_id"]),
@@ -29,6 +42,9 @@ async def list_policies(db=Depends(get_db)):
 
 @router.post("", response_model=PolicyResponse, status_code=201)
 async def create_policy(body: PolicyCreate, db=Depends(get_db)):
+    errors = validate_definition(body.definition)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
     now = datetime.now(timezone.utc)
     doc = {
         "name": body.name,
@@ -39,4 +55,73 @@ async def create_policy(body: PolicyCreate, db=Depends(get_db)):
     }
     result = await db[POLICIES_COLLECTION].insert_one(doc)
     doc["_id"] = result.inserted_id
+    await notify_policies_changed(db)
     return _doc_to_policy_response(doc)
+
+
+@router.put("/{policy_id}", response_model=PolicyResponse)
+async def update_policy(policy_id: str, body: PolicyCreate, db=Depends(get_db)):
+    """Replace a policy's name, kind and definition; its version goes up by one."""
+    oid = _parse_oid(policy_id)
+    errors = validate_definition(body.definition)
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    doc = await db[POLICIES_COLLECTION].find_one_and_update(
+        {"_id": oid},
+        {"$set": {"name": body.name, "kind": body.kind, "definition": body.definition}, "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    await notify_policies_changed(db)
+    return _doc_to_policy_response(doc)
+
+
+@router.delete("/{policy_id}", status_code=204)
+async def delete_policy(policy_id: str, db=Depends(get_db)):
+    oid = _parse_oid(policy_id)
+    result = await db[POLICIES_COLLECTION].delete_one({"_id": oid})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    await notify_policies_changed(db)
+    return Response(status_code=204)
+
+
+@router.get("/snapshot", response_model=PolicySnapshotInfo)
+async def policy_snapshot():
+    """Version and refresh time of this worker's in-memory policy snapshot."""
+    snapshot = current_snapshot()
+    return PolicySnapshotInfo(
+        version=snapshot.version if snapshot else 0,
+        refreshed_at=snapshot.refreshed_at if snapshot else None,
+        rule_count=len(snapshot.policy) if snapshot else 0,
+        sync_mode=sync_mode(),
+    )
+
+
+@router.get("/{policy_id}/stats", response_model=PolicyStats)
+async def policy_stats(policy_id: str, db=Depends(get_db)):
+    """
+    Per-rule profile counters of this worker's snapshot for one policy document
+    (settings.policy_profile_enabled). Counters restart whenever the snapshot is rebuilt.
+    """
+    oid = _parse_oid(policy_id)
+    if await db[POLICIES_COLLECTION].find_one({"_id": oid}, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    snapshot = current_snapshot()
+    profile = snapshot.policy.profile if snapshot else None
+    if profile is None:
+        return PolicyStats(policy_id=policy_id, profiling=False)
+    group = profile_by_policy(snapshot.policy).get(policy_id, {})
+    return PolicyStats(
+        policy_id=policy_id,
+        profiling=True,
+        sample_rate=profile.sample_rate,
+        since=profile.since,
+        evaluations=profile.evaluations,
+        sampled=profile.sampled,
+        matches=group.get("matches", 0),
+        sampled_tries=group.get("sampled_tries", 0),
+        sampled_match_ns=group.get("sampled_match_ns", 0),
+        rules=[PolicyRuleStats(**rule) for rule in group.get("rules", [])],
+    )
@@ -0,0 +1,173 @@
+"""Persists and resolves approvals. Identical pending actions share one request; recent resolutions are reused."""
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.config import settings
+from app.db import APPROVALS_COLLECTION
+from app.metrics import counter
+from app.models import EvaluateResponse
+
+RESOLVED = ("approved", "denied")
+_DUPLICATE_KEY = 11000
+# Maintained by the upsert itself rather than copied from the first action.
+_UPSERT_FIELDS = frozenset({"fingerprint", "status", "occurrences", "last_seen_at"})
+_RESOLUTION_PROJECTION = {"fingerprint": 1, "status": 1, "resolved_by": 1}
+
+_approvals = counter("guardian_approvals_total", "needs_approval decisions by outcome", ["outcome"])
+
+
+def _apply_resolution(response: EvaluateResponse, resolved: dict[str, Any]) -> None:
+    status = resolved["status"]
+    response.decision = "allowed" if status == "approved" else "blocked"
+    response.reason = f"reused approval {resolved['_id']} ({status} by {resolved.get('resolved_by') or 'unknown'})"
+    response.approval_id = str(resolved["_id"])
+    _approvals.inc("reused")
+
+
+async def _recent_resolutions(collection, fingerprints: list[str]) -> dict[str, dict[str, Any]]:
+    """Latest approval resolved within settings.approval_reuse_window_seconds, per fingerprint."""
+    window = settings.approval_reuse_window_seconds
+    if window <= 0 or not fingerprints:
+        return {}
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=window)
+    query = {"fingerprint": {"$in": fingerprints}, "status": {"$in": list(RESOLVED)}, "resolved_at": {"$gte": cutoff}}
+    docs = await collection.find(query, _RESOLUTION_PROJECTION).sort("resolved_at", -1).to_list(length=None)
+    latest: dict[str, dict[str, Any]] = {}
+    for doc in docs:
+        latest.setdefault(doc["fingerprint"], doc)
+    return latest
+
+
+def _upsert(doc: dict[str, Any], occurrences: int = 1) -> tuple[dict[str, Any], dict[str, Any]]:
+    """(filter, update) attaching `doc` to the pending request with its fingerprint, creating it if needed."""
+    return (
+        {"fingerprint": doc["fingerprint"], "status": "pending"},
+        {
+            "$setOnInsert": {k: v for k, v in doc.items() if k not in _UPSERT_FIELDS},
+            "$inc": {"occurrences": occurrences},
+            "$set": {"last_seen_at": doc["last_seen_at"]},
+        },
+    )
+
+
+async def save_approval(db, response: EvaluateResponse, doc: dict[str, Any]) -> None:
+    """
+    Persist one approval document from pipeline.decide and fill in response.approval_id.
+    If the same agent's identical action was resolved recently, the response takes that
+    resolution instead and nothing is written.
+    """
+    collection = db[APPROVALS_COLLECTION]
+    resolved = (await _recent_resolutions(collection, [doc["fingerprint"]])).get(doc["fingerprint"])
+    if resolved is not None:
+        _apply_resolution(response, resolved)
+        return
+    query, update = _upsert(doc)
+    try:
+        saved = await collection.find_one_and_update(
+            query, update, projection={"occurrences": 1}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent upsert inserted the pending request first (unique partial index); attach to it.
+        saved = await collection.find_one_and_update(
+            query, update, projection={"occurrences": 1}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    response.approval_id = str(saved["_id"])
+    _approvals.inc("created" if saved.get("occurrences", 1) == 1 else "attached")
+
+
+async def save_approvals(db, pending: list[tuple[EvaluateResponse, dict[str, Any]]]) -> None:
+    """
+    Batch form of save_approval: one resolution lookup, one unordered bulk upsert (one
+    operation per distinct fingerprint) and one id lookup, whatever the batch size.
+    """
+    collection = db[APPROVALS_COLLECTION]
+    by_fingerprint: dict[str, list[tuple[EvaluateResponse, dict[str, Any]]]] = {}
+    for response, doc in pending:
+        by_fingerprint.setdefault(doc["fingerprint"], []).append((response, doc))
+    resolved = await _recent_resolutions(collection, list(by_fingerprint))
+
+    fingerprints: list[str] = []
+    operations: list[UpdateOne] = []
+    for fingerprint, entries in by_fingerprint.items():
+        if fingerprint in resolved:
+            for response, _ in entries:
+                _apply_resolution(response, resolved[fingerprint])
+            continue
+        query, update = _upsert(entries[-1][1], len(entries))
+        fingerprints.append(fingerprint)
+        operations.append(UpdateOne(query, update, upsert=True))
+    if not operations:
+        return
+
+    created = 0
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        created = result.upserted_count
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != _DUPLICATE_KEY for err in errors):
+            raise
+        # Lost an insert race on the unique partial index: the pending request exists now.
+        created = e.details.get("nUpserted", 0)
+        await collection.bulk_write([operations[err["index"]] for err in errors], ordered=False)
+
+    docs = await collection.find(
+        {"fingerprint": {"$in": fingerprints}, "status": "pending"}, {"fingerprint": 1}
+    ).to_list(length=None)
+    ids = {doc["fingerprint"]: str(doc["_id"]) for doc in docs}
+    for fingerprint in fingerprints:
+        for response, _ in by_fingerprint[fingerprint]:
+            response.approval_id = ids.get(fingerprint)  # None only if resolved in the meantime
+    _approvals.inc("created", amount=created)
+    _approvals.inc("attached", amount=sum(len(by_fingerprint[f]) for f in fingerprints) - created)
+
+
+async def resolve_approvals(
+    db,
+    status: str,
+    resolved_by: str,
+    ids: list[str] | None = None,
+    query: dict[str, Any] | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Resolve pending approvals (status: approved | denied) by id list or by query, with one
+    update_many tagged with a fresh resolution_batch, then classify with one find.
+    Returns (per-id outcomes, resolved documents for notification). Outcomes are
+    {"id", "outcome": resolved | already_resolved | not_found, "status"}; for a query only
+    the approvals this call resolved are listed.
+    """
+    collection = db[APPROVALS_COLLECTION]
+    batch = ObjectId()
+    now = datetime.now(timezone.utc)
+    if ids is not None:
+        oids = [ObjectId(i) for i in dict.fromkeys(ids) if ObjectId.is_valid(i)]
+        target: dict[str, Any] = {"_id": {"$in": oids}}
+    else:
+        target = dict(query or {})
+    update = {"$set": {"status": status, "resolved_at": now, "resolved_by": resolved_by, "resolution_batch": batch}}
+    await collection.update_many({**target, "status": "pending"}, update)
+
+    resolved_doc = {"status": status, "resolved_at": now, "resolved_by": resolved_by}
+    if ids is None:
+        docs = await collection.find({"resolution_batch": batch}, {"_id": 1}).to_list(length=None)
+        outcomes = [{"id": str(d["_id"]), "outcome": "resolved", "status": status} for d in docs]
+        return outcomes, [{"_id": d["_id"], **resolved_doc} for d in docs]
+
+    docs = await collection.find(target, {"status": 1, "resolution_batch": 1}).to_list(length=None)
+    found = {str(d["_id"]): d for d in docs}
+    outcomes: list[dict[str, Any]] = []
+    resolved: list[dict[str, Any]] = []
+    for approval_id in dict.fromkeys(ids):
+        doc = found.get(approval_id)
+        if doc is None:
+            outcomes.append({"id": approval_id, "outcome": "not_found", "status": None})
+        elif doc.get("resolution_batch") == batch:
+            outcomes.append({"id": approval_id, "outcome": "resolved", "status": status})
+            resolved.append({"_id": doc["_id"], **resolved_doc})
+        else:
+            outcomes.append({"id": approval_id, "outcome": "already_resolved", "status": doc.get("status")})
+    return outcomes, resolved
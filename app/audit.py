@@ -0,0 +1,223 @@
+"""Write-behind decision audit log: bounded in-memory buffer, batched insert_many by size or time."""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.config import settings
+from app.db import AUDIT_COLLECTION
+from app.models import Action, EvaluateResponse
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "block", "spill")
+
+
+def audit_doc(action: Action, response: EvaluateResponse, source: str) -> dict[str, Any]:
+    """One decision_audit document. payload only with settings.audit_include_payload."""
+    doc = {
+        "ts": datetime.now(timezone.utc),
+        "source": source,
+        "action_id": action.action_id,
+        "agent_id": action.agent_id,
+        "action_type": action.type,
+        "resource": action.resource or "",
+        "policy_decision": response.policy_decision,
+        "decision": response.decision,
+        "reason": response.reason,
+        "score": response.score,
+        "approval_id": response.approval_id,
+    }
+    if settings.audit_include_payload:
+        doc["payload"] = action.payload
+        if response.rewritten_payload is not None:
+            doc["rewritten_payload"] = response.rewritten_payload
+    return doc
+
+
+class AuditSink:
+    """
+    Decisions are appended to a bounded buffer and written by one background task with
+    insert_many(ordered=False), whenever batch_size documents are waiting or every
+    flush_interval seconds. When the buffer is full, `overflow` decides:
+    drop_oldest (default), block (the caller waits for space) or spill (append to a local
+    NDJSON file in MongoDB extended JSON, loadable with mongoimport). Spill writes run in a
+    worker thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow: str = "drop_oldest",
+        spill_path: str = "",
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown audit overflow policy {overflow!r}; expected one of {', '.join(OVERFLOW_POLICIES)}")
+        self.collection = collection
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self._buffer: deque[dict[str, Any]] = deque()
+        self._ready = asyncio.Event()  # a full batch is waiting
+        self._space = asyncio.Event()  # the buffer has room (block policy)
+        self._space.set()
+        self._task: asyncio.Task | None = None
+        self._to_spill: list[dict[str, Any]] = []
+        self._spill_task: asyncio.Task | None = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed_batches = 0
+
+    async def record(self, doc: dict[str, Any]) -> None:
+        """Queue one audit document. Only suspends under the block policy with a full buffer."""
+        while len(self._buffer) >= self.max_queue:
+            if self.overflow == "drop_oldest":
+                self._buffer.popleft()
+                self.dropped += 1
+            elif self.overflow == "spill":
+                self._queue_spill([doc])
+                return
+            else:
+                self._space.clear()
+                self._ready.set()  # wake the flusher now rather than at the next interval
+                await self._space.wait()
+        self._buffer.append(doc)
+        if len(self._buffer) >= self.batch_size:
+            self._ready.set()
+
+    def _queue_spill(self, docs: list[dict[str, Any]]) -> None:
+        self._to_spill.extend(docs)
+        if self._spill_task is None or self._spill_task.done():
+            self._spill_task = asyncio.create_task(self._write_spill())
+
+    async def _write_spill(self) -> None:
+        while self._to_spill:
+            docs, self._to_spill = self._to_spill, []
+            spilled = await asyncio.to_thread(self._spill, docs)
+            self.spilled += spilled
+            self.dropped += len(docs) - spilled
+
+    def _spill(self, docs: list[dict[str, Any]]) -> int:
+        """
+        Append docs to the spill file; returns how many were written (all or none). Blocking:
+        runs in a worker thread via _write_spill, which applies the counts on the event loop.
+        """
+        if not self.spill_path:
+            return 0
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.writelines(json_util.dumps(doc) + "\n" for doc in docs)
+        except OSError as e:
+            logger.warning("audit spill to %s failed: %s", self.spill_path, e)
+            return 0
+        return len(docs)
+
+    async def flush(self) -> None:
+        """Write everything buffered so far, one insert_many per batch_size documents."""
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            self._space.set()
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                self.written += len(batch)
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                self.written += len(batch) - failed
+                self.dropped += failed
+                self.failed_batches += 1
+            except PyMongoError as e:
+                # MongoDB unavailable: keep the decisions on disk if we can; they are not retried in memory.
+                logger.warning("audit flush of %d decisions failed: %s", len(batch), e)
+                self.failed_batches += 1
+                self._queue_spill(batch)
+                return
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("audit flush failed")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Let the background task finish its current batch, then write whatever is still buffered."""
+        if self._task is not None:
+            self._stopping = True
+            self._ready.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer:  # the final flush failed
+            self._queue_spill(list(self._buffer))
+            self._buffer.clear()
+        if self._spill_task is not None:
+            await self._spill_task
+            self._spill_task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "spill_queued": len(self._to_spill),
+            "failed_batches": self.failed_batches,
+            "overflow": self.overflow,
+        }
+
+
+_sink: AuditSink | None = None
+
+
+def get_audit_sink() -> AuditSink | None:
+    """The running sink, or None when auditing is disabled or outside the app lifespan."""
+    return _sink
+
+
+async def record_decision(action: Action, response: EvaluateResponse, source: str) -> None:
+    """Queue a decision for the audit log (no-op without a running sink)."""
+    if _sink is not None:
+        await _sink.record(audit_doc(action, response, source))
+
+
+async def start_audit(db) -> None:
+    """Start the audit sink. Call once at app startup, after init_db."""
+    global _sink
+    if not settings.audit_enabled:
+        return
+    _sink = AuditSink(
+        db[AUDIT_COLLECTION],
+        max_queue=settings.audit_queue_size,
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_interval_seconds,
+        overflow=settings.audit_overflow,
+        spill_path=settings.audit_spill_path,
+    )
+    _sink.start()
+
+
+async def stop_audit() -> None:
+    """Flush buffered decisions and stop. Call at app shutdown, before close_db."""
+    global _sink
+    if _sink is not None:
+        await _sink.stop()
+        _sink = None
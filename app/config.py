@@ -1,4 +1,6 @@
 """Loads env/settings. Single source of truth for configuration."""
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,9 +14,148 @@ class Settings(BaseSettings):
     mongodb_url: str = "mongodb://localhost:27017"
     mongodb_db_name: str = "guardian"
 
+    # Redis Streams ingestion (disabled when redis_url is empty)
+    redis_url: str = ""
+    stream_consumer_in_app: bool = True  # run the consumer inside the API process lifespan
+    stream_actions: str = "guardian:actions"
+    stream_results: str = "guardian:decisions"
+    stream_results_maxlen: int = 1_000_000
+    stream_group: str = "guardian"
+    stream_consumer_name: str = ""  # default: <hostname>-<pid>
+    stream_batch_size: int = 64
+    stream_block_ms: int = 1000
+    stream_max_in_flight: int = 256
+    stream_claim_idle_ms: int = 60_000
+    stream_claim_interval_seconds: float = 30.0
+    # Entries reclaimed after this many failed deliveries go to stream_dead_letter (and are acked); 0 = retry forever
+    stream_max_deliveries: int = 5
+    stream_dead_letter: str = "guardian:actions:dead"
+
+    # Policy snapshot sync (change stream first, version polling as fallback)
+    policy_change_stream: bool = True
+    policy_poll_interval_seconds: float = 5.0
+    # After the change stream fails or ends, poll for this long before retrying it; doubles per failure up to the max
+    # (app/db.py run_with_change_stream)
+    policy_change_stream_retry_seconds: float = 10.0
+    policy_change_stream_retry_max_seconds: float = 300.0
+    # Policy matching backend: linear | indexed | combined (see app/policy/engine.py)
+    policy_match_backend: str = "indexed"
+    # Per-rule profiling (app/policy/engine.py RuleProfile): every evaluation counts the deciding rule; one in
+    # 1/sample_rate is matched rule by rule and timed. Counters restart with each snapshot; GET /policies/{id}/stats.
+    policy_profile_enabled: bool = False
+    policy_profile_sample_rate: float = 0.01
+
     # LLM (Step 7+)
     openai_api_key: str = ""
+    openai_base_url: str = ""  # empty = OpenAI default; point at a proxy or local stub
     llm_model: str = "gpt-4o-mini"
+    # two_call: score, then a separate rewriter call for rewrite decisions. combined: one JSON-object request
+    # returns the verdict and the rewrite; falls back to two_call when the response fails validation.
+    llm_pipeline_mode: str = "two_call"
+    # Micro-batching (app/llm/batcher.py): concurrent scorer calls are sent together as one multi-action
+    # request after llm_batch_window_ms or once llm_batch_max_items are waiting
+    llm_batch_enabled: bool = False
+    llm_batch_window_ms: float = 5.0
+    llm_batch_max_items: int = 16
+    scorer_payload_budget_bytes: int = 1024  # payload digest size in scorer prompts (app/llm/summarize.py)
+
+    # Local pre-scorer (app/llm/detectors.py): secret/PII patterns, entropy and path heuristics
+    # decide before the LLM when confident; anything below the approval threshold goes to the LLM
+    prescore_enabled: bool = True
+    prescore_block_threshold: float = 0.9
+    prescore_approval_threshold: float = 0.7
+    prescore_entropy_bits: float = 4.2  # per char, for 24-128 char alphanumeric tokens; 0 = off
+    # Below prescore_approval_threshold: a random-looking token alone is left to the LLM, not forced to approval
+    prescore_entropy_score: float = 0.6
+    prescore_max_scan_chars: int = 262_144
+
+    # Rewrite path (app/llm/redact.py): keys and values are redacted locally; only string fields the
+    # rules are unsure about (uncertain key words, high-entropy tokens) are sent to the LLM
+    redact_keys: list[str] = [
+        "password", "passwd", "pass", "pwd", "secret", "client_secret", "token", "access_token",
+        "refresh_token", "id_token", "api_key", "apikey", "private_key", "authorization", "cookie",
+        "set_cookie", "ssn", "credit_card", "card_number", "cvv",
+    ]  # exact key names (case-insensitive, camelCase/kebab-case normalized); the whole value is replaced
+    redact_uncertain_key_words: list[str] = [
+        "secret", "token", "password", "passwd", "auth", "credential", "credentials", "private",
+        "session", "cookie", "signature", "phone", "address", "dob", "birth",
+    ]  # a word of the key name; string values under such keys are uncertain
+    redact_patterns: dict[str, str] = {}  # extra value regexes, name -> pattern; matches become [NAME]
+    redact_max_scan_chars: int = 262_144  # strings past this budget are redacted unscanned
+    redact_llm_max_chars: int = 4000  # uncertain text sent to the LLM per action; the rest is redacted locally
+
+    # Shared LLM HTTP client (one connection pool per worker)
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry_seconds: float = 30.0
+    llm_timeout_seconds: float = 30.0
+    llm_connect_timeout_seconds: float = 5.0
+    llm_max_retries: int = 2
+
+    # Adaptive LLM concurrency (app/llm/limiter.py): AIMD between min and max, halved when calls are slower
+    # than the target or fail. Calls that would wait past the request deadline are shed and the action gets
+    # llm_overload_decision with an "overloaded:" reason.
+    llm_limiter_enabled: bool = True
+    llm_limit_initial: int = 16
+    llm_limit_min: int = 2
+    llm_limit_max: int = 100  # keep <= llm_max_connections
+    llm_limit_target_latency_ms: float = 5000.0
+    llm_queue_max: int = 1000
+    llm_overload_decision: Literal["needs_approval", "block"] = "needs_approval"
+    # Deadline for the LLM part of each run_pipeline call (queueing included); 0 = none.
+    # /evaluate and /evaluate/batch callers may shorten it with an X-Deadline-Ms header.
+    pipeline_deadline_ms: float = 15_000.0
+
+    # Decision audit log (write-behind to decision_audit)
+    audit_enabled: bool = True
+    audit_queue_size: int = 10_000
+    audit_batch_size: int = 500
+    audit_flush_interval_seconds: float = 1.0
+    audit_overflow: str = "drop_oldest"  # drop_oldest | block | spill
+    audit_spill_path: str = "audit-spill.ndjson"  # spill target; also used when a flush fails
+    audit_retention_days: float = 30.0  # TTL on decision_audit.ts; 0 = keep forever
+    audit_include_payload: bool = False
+
+    # GET /approvals keyset pages (unpaged only with all=true)
+    approvals_page_default_limit: int = 100
+    approvals_page_max_limit: int = 1000
+
+    # needs_approval for an action (same agent, type, resource, payload) resolved this recently
+    # reuses that resolution instead of opening a new request; 0 = never reuse
+    approval_reuse_window_seconds: float = 300.0
+
+    # POST /approvals/bulk/{approve,deny}: ids per request, and pending approvals a filter may match
+    bulk_resolve_max_ids: int = 1000
+
+    # GET /approvals/{id}/wait and /approvals/events (change stream first, batched polling as fallback)
+    approval_wait_max_seconds: float = 60.0
+    approval_wait_poll_interval_seconds: float = 2.0
+    # Change stream retry backoff, as for policy_change_stream_retry_*
+    approval_change_stream_retry_seconds: float = 10.0
+    approval_change_stream_retry_max_seconds: float = 300.0
+    approval_events_queue_size: int = 1000
+    approval_events_keepalive_seconds: float = 15.0
+
+    # POST /evaluate/batch
+    batch_max_actions: int = 500
+    batch_max_concurrency: int = 16
+
+    # POST /evaluate/stream (NDJSON)
+    ndjson_max_in_flight: int = 64
+    ndjson_max_line_bytes: int = 1_048_576
+
+    # Coalesce concurrent identical scorer/rewriter calls onto one LLM request
+    llm_single_flight_enabled: bool = True
+
+    # Scorer decision cache (keyed by action fingerprint; cleared on policy/model change)
+    score_cache_enabled: bool = True
+    score_cache_max_entries: int = 10000
+    score_cache_ttl_seconds: float = 300.0
+    # Per-decision TTL overrides; 0 disables caching that decision. Scorer errors are never cached.
+    score_cache_decision_ttls: dict[str, float] = {"block": 3600.0, "needs_approval": 60.0}
+
+    # Metrics (GET /metrics). Log the per-stage breakdown of pipeline runs slower than this; 0 = off.
+    slow_pipeline_log_ms: float = 0.0
 
 
 settings = Settings()
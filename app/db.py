@@ -1,13 +1,20 @@
 """MongoDB connection and database. Async via Motor."""
-from collections.abc import AsyncGenerator
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, Awaitable, Callable
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Collection names
 POLICIES_COLLECTION = "policies"
 APPROVALS_COLLECTION = "approval_requests"
+POLICY_META_COLLECTION = "policy_meta"
+AUDIT_COLLECTION = "decision_audit"
 
 _client: AsyncIOMotorClient | None = None
 
@@ -42,8 +49,81 @@ async def init_db() -> None:
     """Create indexes. Safe to call every startup."""
     db = get_database()
     await db[POLICIES_COLLECTION].create_index("name")
-    await db[APPROVALS_COLLECTION].create_index("status")
-    await db[APPROVALS_COLLECTION].create_index("created_at")
+    # Keyset pagination (app/pagination.py): newest first, optionally filtered by status
+    await db[APPROVALS_COLLECTION].create_index([("status", 1), ("created_at", -1), ("_id", -1)])
+    await db[APPROVALS_COLLECTION].create_index([("created_at", -1), ("_id", -1)])
+    # At most one pending request per action fingerprint (app/approval_store.py). Documents
+    # written before fingerprints existed are left out of the constraint.
+    await db[APPROVALS_COLLECTION].create_index(
+        "fingerprint",
+        unique=True,
+        partialFilterExpression={"status": "pending", "fingerprint": {"$exists": True}},
+        name="fingerprint_pending_unique",
+    )
+    await db[APPROVALS_COLLECTION].create_index([("fingerprint", 1), ("resolved_at", -1)])
+    await db[APPROVALS_COLLECTION].create_index("resolution_batch", sparse=True)  # bulk approve/deny
+    await _ensure_audit_ttl(db, int(settings.audit_retention_days * 86400))
+    await db[AUDIT_COLLECTION].create_index([("agent_id", 1), ("ts", -1)])
+
+
+async def _ensure_audit_ttl(db, retention: int) -> None:
+    """
+    Audit log (app/audit.py): ts_1 expires records after `retention` seconds, or never when 0.
+    An existing index built with another AUDIT_RETENTION_DAYS is updated in place with collMod
+    (create_index would fail with IndexOptionsConflict); dropping retention to 0 rebuilds it.
+    """
+    collection = db[AUDIT_COLLECTION]
+    existing = (await collection.index_information()).get("ts_1")
+    current = existing.get("expireAfterSeconds") if existing else None
+    if existing is None:
+        if retention > 0:
+            await collection.create_index("ts", expireAfterSeconds=retention)
+        else:
+            await collection.create_index("ts")
+        return
+    if retention > 0 and current != retention:
+        try:
+            await db.command("collMod", AUDIT_COLLECTION, index={"keyPattern": {"ts": 1}, "expireAfterSeconds": retention})
+        except PyMongoError as e:
+            logger.warning("could not set the decision_audit TTL to %ds (still %s): %s", retention, current, e)
+            return
+        logger.info("decision_audit TTL changed from %s to %ds", current, retention)
+    elif retention <= 0 and current is not None:
+        await collection.drop_index("ts_1")
+        await collection.create_index("ts")
+        logger.info("decision_audit TTL removed (was %ds)", current)
+
+
+async def run_with_change_stream(
+    watch: Callable[[], Awaitable[None]],
+    poll: Callable[[], Awaitable[None]],
+    retry: float,
+    retry_max: float,
+    *,
+    streaming: Callable[[], bool],
+    name: str,
+    fallback: str,
+) -> None:
+    """
+    Follow a change stream with watch() until cancelled. Whenever it fails or ends, run poll()
+    for `retry` seconds and try the stream again; the wait doubles up to `retry_max` while it
+    keeps failing. streaming() says whether the last watch() got the stream open, which starts
+    the backoff over. name and fallback only word the log lines.
+    """
+    delay = retry
+    while True:
+        try:
+            await watch()
+            logger.info("%s change stream ended; %s", name, fallback)
+        except PyMongoError as e:
+            logger.info("%s change stream unavailable (%s); %s", name, e, fallback)
+        if streaming():
+            delay = retry
+        try:
+            await asyncio.wait_for(poll(), delay)
+        except asyncio.TimeoutError:
+            pass
+        delay = min(delay * 2, retry_max)
 
 
 async def check_db() -> bool:
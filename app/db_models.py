@@ -1,4 +1,4 @@
 """MongoDB collection names and helpers. No ORM; documents are dicts."""
-from app.db import APPROVALS_COLLECTION, POLICIES_COLLECTION
+from app.db import APPROVALS_COLLECTION, AUDIT_COLLECTION, POLICIES_COLLECTION, POLICY_META_COLLECTION
 
-__all__ = ["POLICIES_COLLECTION", "APPROVALS_COLLECTION"]
+__all__ = ["POLICIES_COLLECTION", "APPROVALS_COLLECTION", "POLICY_META_COLLECTION", "AUDIT_COLLECTION"]
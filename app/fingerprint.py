@@ -0,0 +1,14 @@
+"""Canonical action fingerprints: identical (type, resource, payload) hash the same regardless of key order."""
+import hashlib
+import json
+
+from app.models import Action
+
+
+def action_fingerprint(action: Action, include_agent: bool = False) -> str:
+    """sha256 hex of the normalized action. action_id and timestamp are never part of it."""
+    doc = {"type": action.type, "resource": action.resource or "", "payload": action.payload}
+    if include_agent:
+        doc["agent_id"] = action.agent_id
+    data = json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
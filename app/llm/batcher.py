@@ -0,0 +1,179 @@
+"""Micro-batching scorer: concurrent scoring requests share one multi-action LLM call returning a JSON array."""
+import asyncio
+import logging
+from typing import Any
+
+from app.config import settings
+from app.llm.client import get_llm_client, load_json_reply, track_llm_call
+from app.llm.limiter import ABANDONED, Overloaded, no_deadline, within_deadline
+from app.llm.summarize import summarize_payload
+from app.metrics import counter, histogram
+from app.models import Action
+
+logger = logging.getLogger(__name__)
+
+BATCH_SYSTEM = """You are a risk scorer for agent actions. You are given numbered actions (type, resource, payload digest; long text is elided with its size and a hash of its start). Output a JSON array only, one object per action, with:
+- "index": the action's number
+- "score": number in [0, 1] (0=no risk, 1=high risk)
+- "decision": one of "allow", "block", "needs_approval", "rewrite"
+- "reason": short explanation
+
+Rules: Block or needs_approval for sensitive paths (/etc/, .env, keys), external sends, PII. Allow only clearly safe actions. Use rewrite when the action can be made safe by redacting or restricting. Score each action on its own."""
+
+_DECISIONS = ("allow", "block", "needs_approval", "rewrite")
+
+_batch_size = histogram(
+    "guardian_llm_batch_size", "Actions per batched scorer call", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+_item_failures = counter("guardian_llm_batch_item_failures_total", "Batched verdicts missing or invalid", ["reason"])
+
+
+class BatchItemError(ValueError):
+    """No valid verdict for one action of a batch; score_action turns it into needs_approval."""
+
+
+def _verdict(item: Any) -> tuple[float, str, str]:
+    if not isinstance(item, dict):
+        raise BatchItemError("verdict is not an object")
+    score, decision = item.get("score"), item.get("decision")
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 1:
+        raise BatchItemError(f"invalid score {score!r}")
+    if not isinstance(decision, str) or decision.lower() not in _DECISIONS:
+        raise BatchItemError(f"invalid decision {decision!r}")
+    return float(score), decision.lower(), str(item.get("reason", ""))[:500]
+
+
+class _Batch:
+    __slots__ = ("items", "task")
+
+    def __init__(self):
+        self.items: list[tuple[Action, asyncio.Future]] = []
+        self.task: asyncio.Task | None = None
+
+
+class ScoreBatcher:
+    """
+    score() queues an action and waits. The queue is sent as one LLM request window seconds
+    after its first action arrives, or as soon as it holds max_items. Verdicts are matched to
+    actions by "index" (by position when absent). An action without a valid verdict gets
+    BatchItemError; a failed request fails every action of the batch. The request runs without
+    a deadline; each caller stops waiting at its own (Overloaded), and the request is cancelled
+    once every caller of its batch has gone.
+    """
+
+    def __init__(self, window: float, max_items: int):
+        self.window = window
+        self.max_items = max(1, max_items)
+        self._pending = _Batch()
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.item_failures = 0
+
+    async def score(self, action: Action) -> tuple[float, str, str]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending
+        batch.items.append((action, future))
+        if len(batch.items) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        timed_out = False
+        try:
+            return await within_deadline(future)
+        except Overloaded:
+            timed_out = True
+            raise
+        finally:
+            task = batch.task
+            if task is not None and not task.done() and all(f.done() for _, f in batch.items):
+                task.cancel(ABANDONED if timed_out else None)  # every caller has gone
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, _Batch()
+        items = [(action, future) for action, future in batch.items if not future.done()]
+        if items:
+            with no_deadline():
+                batch.task = asyncio.create_task(self._run(items))
+            self._tasks.add(batch.task)
+            batch.task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Action, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        _batch_size.observe(len(batch))
+        try:
+            verdicts = await self._call([action for action, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            item = verdicts.get(i)
+            try:
+                if item is None:
+                    raise BatchItemError("no verdict for this action")
+                future.set_result(_verdict(item))
+            except BatchItemError as e:
+                self.item_failures += 1
+                _item_failures.inc("missing" if item is None else "invalid")
+                future.set_exception(e)
+
+    async def _call(self, actions: list[Action]) -> dict[int, Any]:
+        """One LLM round trip. Returns verdicts by action number; raises if the reply is not a JSON array."""
+        client = get_llm_client()
+        parts = [
+            f"#{i}\nAction type: {action.type}\nResource: {action.resource or '(none)'}\n"
+            f"Payload (summary): {summarize_payload(action.payload) if action.payload else '{}'}"
+            for i, action in enumerate(actions)
+        ]
+        user_content = "\n\n".join(parts) + f"\n\nOutput a JSON array of {len(actions)} verdicts."
+        async with track_llm_call("batch"):
+            resp = await client.chat.completions.create(
+                model=settings.llm_model,
+                messages=[
+                    {"role": "system", "content": BATCH_SYSTEM},
+                    {"role": "user", "content": user_content},
+                ],
+                max_tokens=100 + 120 * len(actions),
+            )
+        data = load_json_reply(resp.choices[0].message.content or "")
+        if isinstance(data, dict) and len(data) == 1:
+            data = next(iter(data.values()))  # {"verdicts": [...]}
+        if not isinstance(data, list):
+            raise ValueError("batched scorer reply is not a JSON array")
+        verdicts: dict[int, Any] = {}
+        for position, item in enumerate(data):
+            index = item.get("index") if isinstance(item, dict) else None
+            if isinstance(index, bool) or not isinstance(index, int):
+                index = position
+            verdicts.setdefault(index, item)
+        return verdicts
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": len(self._pending.items),
+            "in_flight_batches": len(self._tasks),
+            "batches": self.batches,
+            "items": self.items,
+            "item_failures": self.item_failures,
+        }
+
+
+_batcher: ScoreBatcher | None = None
+
+
+def get_score_batcher() -> ScoreBatcher:
+    """The process-wide batcher, created on first use from settings."""
+    global _batcher
+    if _batcher is None:
+        _batcher = ScoreBatcher(settings.llm_batch_window_ms / 1000, settings.llm_batch_max_items)
+    return _batcher
@@ -0,0 +1,81 @@
+"""Bounded LRU/TTL cache of LLM scoring results keyed by action fingerprint."""
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+
+class DecisionCache:
+    """
+    Maps fingerprint -> (score, decision, reason). Entries expire after a per-decision TTL and
+    the least recently used entry is evicted when full. Everything is dropped when the
+    generation (e.g. policy snapshot version + model) changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        default_ttl: float,
+        decision_ttls: dict[str, float] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.decision_ttls = dict(decision_ttls or {})
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, tuple[float, str, str]]] = OrderedDict()
+        self._generation: Hashable = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync_generation(self, generation: Hashable) -> None:
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key: str, generation: Hashable) -> tuple[float, str, str] | None:
+        self._sync_generation(generation)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: tuple[float, str, str], generation: Hashable) -> None:
+        """Store a result. Ignored if its TTL is <= 0 or it was computed under an older generation."""
+        if generation != self._generation:
+            return
+        ttl = self.decision_ttls.get(value[1], self.default_ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
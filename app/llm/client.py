@@ -0,0 +1,86 @@
+"""Shared AsyncOpenAI client with a pooled HTTP connection. Created in lifespan, reused by scorer and rewriter."""
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, Timeout
+
+from app.config import settings
+from app.llm.limiter import get_llm_limiter
+from app.metrics import gauge, histogram
+
+_client: AsyncOpenAI | None = None
+
+_in_flight = gauge("guardian_llm_in_flight", "LLM requests currently awaiting a response", ["call"])
+_call_seconds = histogram("guardian_llm_call_seconds", "LLM round-trip time, including retries", ["call", "outcome"])
+
+
+def _build_client() -> AsyncOpenAI:
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+        ),
+    )
+    return AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url or None,
+        timeout=Timeout(settings.llm_timeout_seconds, connect=settings.llm_connect_timeout_seconds),
+        max_retries=settings.llm_max_retries,
+        http_client=http_client,
+    )
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """Return the shared client. Created lazily when used outside the app lifespan (e.g. scripts)."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+async def start_llm() -> None:
+    """Create the shared client (and its connection pool). Call once at app startup."""
+    global _client
+    if settings.openai_api_key and _client is None:
+        _client = _build_client()
+
+
+async def close_llm() -> None:
+    """Close the shared client and its connections. Call at app shutdown."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+@asynccontextmanager
+async def track_llm_call(call: str) -> AsyncIterator[None]:
+    """
+    Run one LLM round trip (call: scorer | rewriter | combined | batch) under the adaptive
+    concurrency limit and the request deadline (see limiter.py; raises Overloaded when shed),
+    counting it in the in-flight gauge and latency histogram.
+    """
+    async with (get_llm_limiter().slot() if settings.llm_limiter_enabled else nullcontext()):
+        _in_flight.inc(call)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            _in_flight.dec(call)
+            _call_seconds.observe(time.perf_counter() - started, call, outcome)
+
+
+def load_json_reply(text: str) -> Any:
+    """Parse JSON from an LLM reply (may be wrapped in markdown). Raises ValueError."""
+    text = text.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        text = "\n".join(l for l in lines if l.strip() != "```" and not l.strip().startswith("```json"))
+    return json.loads(text)
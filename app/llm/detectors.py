@@ -0,0 +1,172 @@
+"""Deterministic local pre-scorer: secret/PII patterns, entropy and path heuristics. Runs before the LLM scorer."""
+import math
+import re
+from collections import Counter
+from typing import Any, NamedTuple
+
+from app.config import settings
+from app.models import Action
+
+# name, regex, score, literals. A pattern's regex only runs on strings containing one of its
+# literals (None: a run of digits), so ordinary text costs a few substring checks.
+SECRET_PATTERNS = (
+    ("private_key", r"-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY-----", 0.99, ("PRIVATE KEY",)),
+    ("aws_access_key", r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b", 0.95, ("AKIA", "ASIA")),
+    ("github_token", r"\b(?:gh[pousr]_[A-Za-z0-9]{36,}|github_pat_[A-Za-z0-9_]{40,})\b", 0.95, ("gh", "github_pat_")),
+    ("slack_token", r"\bxox[abposr]-[A-Za-z0-9-]{10,}", 0.95, ("xox",)),
+    ("openai_key", r"\bsk-(?:proj-)?[A-Za-z0-9_-]{20,}", 0.95, ("sk-",)),
+    ("google_api_key", r"\bAIza[0-9A-Za-z_-]{35}\b", 0.9, ("AIza",)),
+    ("jwt", r"\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}", 0.8, ("eyJ",)),
+    ("credit_card", r"\b(?:\d[ -]?){12,18}\d\b", 0.8, None),
+    ("us_ssn", r"\b(?!000|666|9\d\d)\d{3}-(?!00)\d{2}-(?!0000)\d{4}\b", 0.75, None),
+)
+_COMPILED = tuple((name, re.compile(regex), score, literals) for name, regex, score, literals in SECRET_PATTERNS)
+DIGIT_RUN = re.compile(r"\d\d\d")
+# Any literal or digit run: strings without one skip the per-pattern checks entirely.
+_TRIGGER = re.compile("|".join(re.escape(lit) for *_, literals in SECRET_PATTERNS if literals for lit in literals) + r"|\d\d\d")
+_MIN_LENGTH = 11  # shortest possible match (us_ssn)
+
+# Standalone base64/hex-ish tokens; long blobs (e.g. encoded files) are deliberately out of range.
+TOKEN = re.compile(r"(?<![A-Za-z0-9+/_=-])(?=[A-Za-z_+/=-]*\d)(?=[0-9_+/=-]*[A-Za-z])[A-Za-z0-9+/_-]{24,128}={0,2}(?![A-Za-z0-9+/_=-])")
+
+# Resource heuristics, checked against action.resource.
+_PATHS = (
+    ("ssh_private_key", re.compile(r"(?:^|/)id_(?:rsa|dsa|ecdsa|ed25519)(?:$|[^.]|\.(?!pub$))"), 0.95),
+    ("shadow_file", re.compile(r"^/etc/(?:shadow|gshadow|sudoers)(?:$|/|\.d/)"), 0.95),
+    ("cloud_credentials", re.compile(r"(?:^|/)\.(?:aws/credentials|docker/config\.json|kube/config|git-credentials|pgpass|netrc|npmrc|pypirc)$"), 0.9),
+    ("dotenv", re.compile(r"(?:^|/)\.env(?:\.[\w-]+)?$"), 0.9),
+    ("key_file", re.compile(r"\.(?:pem|key|p12|pfx|jks|keystore)$", re.IGNORECASE), 0.85),
+    ("ssh_dir", re.compile(r"(?:^|/)\.ssh/"), 0.8),
+)
+_ANY_PATH = re.compile("|".join(f"(?:{regex.pattern})" for _, regex, _ in _PATHS), re.IGNORECASE)
+
+
+class Finding(NamedTuple):
+    name: str
+    score: float
+    where: str  # "resource" or a payload path such as payload.headers.authorization
+
+
+def shannon_entropy(value: str) -> float:
+    """Bits per character."""
+    length = len(value)
+    return -sum(n / length * math.log2(n / length) for n in Counter(value).values())
+
+
+def luhn(digits: str) -> bool:
+    """Luhn checksum of a string of digits (card numbers)."""
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = ord(ch) - 48
+        if i % 2:
+            d = d * 2 - 9 if d > 4 else d * 2
+        total += d
+    return total % 10 == 0
+
+
+# Issuer prefixes (IIN) and lengths of the major card brands: Visa, Mastercard, Amex, Discover.
+_CARD_BRANDS = re.compile(
+    r"4(?:\d{12}|\d{15}|\d{18})"
+    r"|(?:5[1-5]\d{2}|222[1-9]|22[3-9]\d|2[3-6]\d{2}|27[01]\d|2720)\d{12}"
+    r"|3[47]\d{13}"
+    r"|(?:6011|65\d{2})\d{12,15}"
+)
+
+
+def card_number(digits: str) -> bool:
+    """Whether a string of digits is a plausible card number: a known brand's prefix and length, and Luhn-valid."""
+    return _CARD_BRANDS.fullmatch(digits) is not None and luhn(digits)
+
+
+def scan_string(value: str, where: str) -> Finding | None:
+    """Highest-scoring finding in one string, or None."""
+    if len(value) < _MIN_LENGTH:
+        return None
+    best: Finding | None = None
+    has_digits: bool | None = None
+    for name, regex, score, literals in _COMPILED if _TRIGGER.search(value) else ():
+        if best is not None and score <= best.score:
+            continue
+        if literals is None:
+            if has_digits is None:
+                has_digits = DIGIT_RUN.search(value) is not None
+            if not has_digits:
+                continue
+        elif literals[0] not in value and (len(literals) == 1 or literals[1] not in value):
+            continue
+        for m in regex.finditer(value):
+            if name == "credit_card" and not card_number(re.sub(r"[ -]", "", m.group())):
+                continue
+            best = Finding(name, score, where)
+            break
+    min_bits = settings.prescore_entropy_bits
+    if min_bits > 0 and len(value) >= 24 and (best is None or best.score < settings.prescore_entropy_score):
+        for m in TOKEN.finditer(value):
+            if shannon_entropy(m.group()) >= min_bits:
+                return Finding("high_entropy_token", settings.prescore_entropy_score, where)
+    return best
+
+
+def scan_resource(resource: str) -> Finding | None:
+    """Highest-scoring path heuristic matching the resource (_PATHS is ordered by score)."""
+    if not resource or _ANY_PATH.search(resource) is None:
+        return None
+    for name, regex, score in _PATHS:
+        if regex.search(resource):
+            return Finding(name, score, "resource")
+    return None
+
+
+def format_path(path: tuple | None) -> str:
+    """Render a payload path of nested (parent, key) pairs, e.g. payload.headers.authorization or payload.items[0]."""
+    parts: list[str] = []
+    while path is not None:
+        path, key = path
+        parts.append(f"[{key}]" if isinstance(key, int) else f".{key}")
+    return "payload" + "".join(reversed(parts))
+
+
+def scan_payload(payload: Any, stop_at: float = 1.0) -> Finding | None:
+    """
+    Walk the payload iteratively and scan each string value in place (nothing is serialized).
+    Stops early at a finding scoring >= stop_at, or after settings.prescore_max_scan_chars.
+    """
+    best: Finding | None = None
+    budget = settings.prescore_max_scan_chars
+    # Paths are linked (parent, key) pairs, formatted only for the reported finding.
+    stack: list[tuple[Any, tuple | None]] = [(payload, None)]
+    while stack and budget > 0:
+        value, path = stack.pop()
+        if isinstance(value, str):
+            text = value[:budget]
+            budget -= len(text)
+            finding = scan_string(text, "")
+            if finding is not None and (best is None or finding.score > best.score):
+                best = finding._replace(where=format_path(path))
+                if best.score >= stop_at:
+                    return best
+        elif isinstance(value, dict):
+            stack.extend((v, (path, k)) for k, v in reversed(value.items()))
+        elif isinstance(value, (list, tuple)):
+            stack.extend((v, (path, i)) for i, v in reversed(list(enumerate(value))))
+    return best
+
+
+def prescore(action: Action) -> tuple[float, str, str] | None:
+    """
+    (score, decision, reason) when a finding is confident enough to skip the LLM:
+    block at settings.prescore_block_threshold, needs_approval at
+    settings.prescore_approval_threshold. None passes the action on to the LLM scorer.
+    Reasons name the detector and location, never the matched text.
+    """
+    block_at = settings.prescore_block_threshold
+    approval_at = settings.prescore_approval_threshold
+    best = scan_resource(action.resource or "")
+    if best is None or best.score < block_at:
+        found = scan_payload(action.payload, stop_at=block_at) if action.payload else None
+        if found is not None and (best is None or found.score > best.score):
+            best = found
+    if best is None or best.score < approval_at:
+        return None
+    decision = "block" if best.score >= block_at else "needs_approval"
+    return best.score, decision, f"prescorer: {best.name} in {best.where[:100]}"
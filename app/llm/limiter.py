@@ -0,0 +1,203 @@
+"""Adaptive (AIMD) concurrency limit on LLM calls, with per-request deadlines and load shedding."""
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from app.config import settings
+from app.metrics import counter
+
+T = TypeVar("T")
+
+_deadline: ContextVar[float | None] = ContextVar("llm_deadline", default=None)
+
+# Cancellation message for a shared LLM call whose waiters all ran out of time (see slot).
+ABANDONED = "abandoned: every waiter's deadline passed"
+
+_shed = counter("guardian_llm_shed_total", "LLM calls refused or abandoned under overload", ["reason"])
+
+
+class Overloaded(Exception):
+    """An LLM call was shed: the queue is full, or the request's deadline would pass first."""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """
+    Bound LLM queueing and calls in this context (and tasks started from it) to `seconds` from
+    now. None or <= 0 adds no deadline; a nested deadline never extends an outer one.
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """
+    Clear the deadline in this context. For work shared by callers with different deadlines
+    (single-flight, batching): each caller bounds its own wait with within_deadline instead.
+    """
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline (possibly negative), or None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+async def within_deadline(aw: Awaitable[T]) -> T:
+    """Await aw until the current deadline. Raises Overloaded("deadline_exceeded") if it passes first."""
+    left = remaining()
+    if left is None:
+        return await aw
+    timeout = asyncio.timeout(left)
+    try:
+        async with timeout:
+            return await aw
+    except TimeoutError:
+        if not timeout.expired():
+            raise
+        raise get_llm_limiter()._reject("deadline_exceeded", "deadline passed while waiting for a shared LLM call") from None
+
+
+class AdaptiveLimiter:
+    """
+    At most `limit` LLM calls run at once; the rest wait in FIFO order. The limit grows by
+    about one per limit's worth of calls that finish within target_latency, and halves (at
+    most once per typical call duration) when a call is slower, fails or runs out of time.
+    A caller is shed (Overloaded) instead of queued when the queue is full or its expected
+    wait, judged from recent call latency, would pass its deadline.
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, target_latency: float, max_queue: int):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.target_latency = target_latency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._queue: deque[asyncio.Future] = deque()
+        self._latency: float | None = None  # EWMA of call duration, seconds
+        self._last_decrease = 0.0
+        self.shed: dict[str, int] = {"queue_full": 0, "deadline": 0, "deadline_exceeded": 0}
+
+    def _reject(self, reason: str, detail: str) -> Overloaded:
+        self.shed[reason] += 1
+        _shed.inc(reason)
+        return Overloaded(reason, detail)
+
+    async def _acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._queue:
+            self.in_flight += 1
+            return
+        if len(self._queue) >= self.max_queue:
+            raise self._reject("queue_full", f"{len(self._queue)} LLM calls already queued")
+        left = remaining()
+        if left is not None and self._latency is not None:
+            expected = self._latency * (len(self._queue) + 1) / int(self.limit)
+            if expected > left:
+                raise self._reject("deadline", f"expected LLM queue wait {expected:.2f}s exceeds the {max(left, 0):.2f}s left")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(future)
+        try:
+            async with asyncio.timeout(left):
+                await future
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                self._release()  # granted a slot just as we gave up
+            else:
+                future.cancel()
+                try:
+                    self._queue.remove(future)  # so that max_queue counts live waiters only
+                except ValueError:
+                    pass  # already popped by _release
+            if isinstance(e, TimeoutError):
+                raise self._reject("deadline", "deadline passed while queued for an LLM call") from None
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        while self._queue and self.in_flight < int(self.limit):
+            future = self._queue.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _observe(self, latency: float, ok: bool) -> None:
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if ok and latency <= self.target_latency:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            return
+        now = time.monotonic()
+        if now - self._last_decrease >= self._latency:
+            self.limit = max(self.min_limit, self.limit * 0.5)
+            self._last_decrease = now
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one slot for an LLM call, bounded by the current deadline. Raises Overloaded."""
+        await self._acquire()
+        started = time.monotonic()
+        ok = False
+        try:
+            try:
+                async with asyncio.timeout(remaining()):
+                    yield
+            except TimeoutError:
+                raise self._reject("deadline_exceeded", "deadline passed during the LLM call") from None
+            ok = True
+        except asyncio.CancelledError as e:
+            # Abandoned at its waiters' deadlines counts as too slow; any other cancellation
+            # (the caller went away) says nothing about the provider.
+            ok = False if e.args == (ABANDONED,) else None
+            raise
+        finally:
+            if ok is not None:
+                self._observe(time.monotonic() - started, ok)
+            self._release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "latency_ewma_ms": round(self._latency * 1000, 1) if self._latency is not None else None,
+            **{f"shed_{reason}": n for reason, n in self.shed.items()},
+        }
+
+
+_limiter: AdaptiveLimiter | None = None
+
+
+def get_llm_limiter() -> AdaptiveLimiter:
+    """The process-wide limiter, created on first use from settings."""
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveLimiter(
+            initial=settings.llm_limit_initial,
+            min_limit=settings.llm_limit_min,
+            max_limit=settings.llm_limit_max,
+            target_latency=settings.llm_limit_target_latency_ms / 1000,
+            max_queue=settings.llm_queue_max,
+        )
+    return _limiter
@@ -0,0 +1,206 @@
+"""Local payload redaction for the rewrite path: key rules, value patterns, structural sharing and a scan budget."""
+import re
+from functools import lru_cache
+from typing import Any
+
+from app.config import settings
+from app.llm.detectors import DIGIT_RUN, SECRET_PATTERNS, TOKEN, card_number, format_path, shannon_entropy
+
+REDACTED = "[REDACTED]"
+
+# Secret patterns are shared with the pre-scorer; a private key is redacted through its END line.
+_PLACEHOLDERS = {"credit_card": "[CARD]", "us_ssn": "[SSN]"}
+_OVERRIDES = {"private_key": r"-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY-----(?:.*?-----END (?:[A-Z0-9]+ )*PRIVATE KEY-----|.*)"}
+_EMAIL = ("email", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b", "[EMAIL]", ("@",))
+_MIN_LENGTH = 6  # shortest email, a@b.co
+_WORDS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# Integers are card numbers only under a key with one of these words; elsewhere they are IDs and timestamps.
+_CARD_KEY_WORDS = frozenset({"card", "pan", "cc"})
+
+
+def key_words(key: str) -> list[str]:
+    """Lowercase words of a key name, e.g. "X-Api-Key" -> ["x", "api", "key"], "apiKey" -> ["api", "key"]."""
+    return [w.lower() for w in _WORDS.findall(key)]
+
+
+class _Rules:
+    """Compiled settings: key classification (memoized per key name) and value patterns."""
+
+    def __init__(self, keys: tuple[str, ...], words: tuple[str, ...], extra: tuple[tuple[str, str], ...]):
+        self.keys = frozenset(keys)
+        self.words = frozenset(words)
+        self.values: list[tuple[str, re.Pattern, str, tuple[str, ...] | None]] = [
+            (name, re.compile(_OVERRIDES.get(name, regex), re.DOTALL), _PLACEHOLDERS.get(name, "[SECRET]"), literals)
+            for name, regex, _, literals in SECRET_PATTERNS
+        ]
+        self.values.append((_EMAIL[0], re.compile(_EMAIL[1]), _EMAIL[2], _EMAIL[3]))
+        self.values.extend((name, re.compile(regex), f"[{name.upper()}]", ()) for name, regex in extra)
+        # Strings without any literal or digit run skip the built-in patterns (extra ones always run).
+        literals = [re.escape(lit) for *_, lits in self.values if lits for lit in lits]
+        self._trigger = re.compile("|".join(literals + [r"\d\d\d"]))
+        self._extra = bool(extra)
+        self._key_cache: dict[str, str | None] = {}
+
+    def classify(self, key: str) -> str | None:
+        """"redact", "uncertain" or None for a dict key. Keys are split into lowercase words."""
+        rule = self._key_cache.get(key, "")
+        if rule != "":
+            return rule
+        words = key_words(key)
+        # Entries match the key's trailing words, so X-Api-Key and stripe_api_key hit api_key.
+        if any("_".join(words[i:]) in self.keys for i in range(len(words))):
+            rule = "redact"
+        elif self.words.intersection(words):
+            rule = "uncertain"
+        else:
+            rule = None
+        if len(self._key_cache) < 4096:
+            self._key_cache[key] = rule
+        return rule
+
+    def scrub(self, text: str) -> tuple[str, bool]:
+        """(text with every value-pattern match replaced, whether it holds a high-entropy token)."""
+        if len(text) < _MIN_LENGTH and not self._extra:
+            return text, False
+        values = self.values if self._extra or self._trigger.search(text) else ()
+        for name, regex, placeholder, literals in values:
+            if literals is None:
+                if DIGIT_RUN.search(text) is None:
+                    continue
+            elif literals:
+                for lit in literals:
+                    if lit in text:
+                        break
+                else:
+                    continue
+            if name == "credit_card":
+                text = regex.sub(lambda m: placeholder if card_number(re.sub(r"[ -]", "", m.group())) else m.group(), text)
+            else:
+                text = regex.sub(placeholder, text)
+        min_bits = settings.prescore_entropy_bits
+        suspicious = min_bits > 0 and len(text) >= 24 and any(
+            shannon_entropy(m.group()) >= min_bits for m in TOKEN.finditer(text)
+        )
+        return text, suspicious
+
+
+@lru_cache(maxsize=4)
+def _compile(keys: tuple[str, ...], words: tuple[str, ...], extra: tuple[tuple[str, str], ...]) -> _Rules:
+    return _Rules(keys, words, extra)
+
+
+def _rules() -> _Rules:
+    return _compile(
+        tuple(k.lower().replace("-", "_") for k in settings.redact_keys),
+        tuple(w.lower() for w in settings.redact_uncertain_key_words),
+        tuple(sorted(settings.redact_patterns.items())),
+    )
+
+
+def _keys(path: tuple | None) -> tuple:
+    keys: list[Any] = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    return tuple(reversed(keys))
+
+
+class Redaction:
+    """
+    Result of redact_payload. `edits` are applied on top of the source payload by apply(),
+    which copies only the containers on the way to an edited value; everything else is
+    shared with the source. `uncertain` holds (label, text) pairs for the LLM.
+    """
+    __slots__ = ("source", "edits", "uncertain", "_uncertain_paths")
+
+    def __init__(self, source: Any):
+        self.source = source
+        self.edits: list[tuple[tuple, Any]] = []
+        self.uncertain: list[tuple[str, str]] = []
+        self._uncertain_paths: list[tuple] = []
+
+    def apply(self, resolved: dict[str, str] | None = None) -> Any:
+        """
+        The redacted payload. Uncertain fields take their value from `resolved` (label -> text)
+        and are redacted when missing from it.
+        """
+        edits = self.edits
+        if self.uncertain:
+            resolved = resolved or {}
+            edits = edits + [
+                (path, resolved[label] if isinstance(resolved.get(label), str) else REDACTED)
+                for (label, _), path in zip(self.uncertain, self._uncertain_paths)
+            ]
+        if not edits:
+            return self.source
+        copies: dict[tuple, Any] = {(): _shallow_copy(self.source)}
+        for keys, value in edits:
+            node, original = copies[()], self.source
+            for depth in range(1, len(keys)):
+                original = original[keys[depth - 1]]
+                child = copies.get(keys[:depth])
+                if child is None:
+                    child = copies[keys[:depth]] = _shallow_copy(original)
+                    node[keys[depth - 1]] = child
+                node = child
+            node[keys[-1]] = value
+        return copies[()]
+
+
+def _shallow_copy(value: Any) -> Any:
+    return dict(value) if isinstance(value, dict) else list(value)
+
+
+def redact_payload(payload: dict[str, Any]) -> Redaction:
+    """
+    Walk the payload iteratively. Values under redact_keys are replaced whole, pattern matches
+    inside strings (secrets, cards, SSNs, emails, redact_patterns) are replaced in place, and
+    integers that are card numbers become [CARD] under a card-like key (card, pan, cc). Strings under an uncertain key word
+    or holding a high-entropy token are marked uncertain, up to settings.redact_llm_max_chars of
+    text; past that they are redacted. Strings beyond settings.redact_max_scan_chars are
+    redacted without being scanned.
+    """
+    rules = _rules()
+    result = Redaction(payload)
+    scan_budget = settings.redact_max_scan_chars
+    llm_budget = settings.redact_llm_max_chars
+    # Paths are linked (parent, key) pairs, unpacked only for values that change.
+    stack: list[tuple[Any, tuple | None, bool]] = [(payload, None, False)]
+    while stack:
+        value, path, uncertain_key = stack.pop()
+        if isinstance(value, str):
+            if len(value) > scan_budget:
+                scan_budget = 0
+                result.edits.append((_keys(path), REDACTED))
+                continue
+            scan_budget -= len(value)
+            text, suspicious = rules.scrub(value)
+            if uncertain_key or suspicious:
+                if len(text) <= llm_budget:
+                    llm_budget -= len(text)
+                    result.uncertain.append((format_path(path), text))
+                    result._uncertain_paths.append(_keys(path))
+                else:
+                    result.edits.append((_keys(path), REDACTED))
+            elif text != value:
+                result.edits.append((_keys(path), text))
+        elif isinstance(value, dict):
+            for k, v in reversed(value.items()):
+                rule = rules.classify(k) if isinstance(k, str) else None
+                if rule == "redact":
+                    result.edits.append((_keys((path, k)), REDACTED))
+                elif _card_integer(k, v):
+                    result.edits.append((_keys((path, k)), "[CARD]"))
+                else:
+                    stack.append((v, (path, k), rule == "uncertain"))
+        elif isinstance(value, (list, tuple)):
+            stack.extend((v, (path, i), uncertain_key) for i, v in reversed(list(enumerate(value))))
+    return result
+
+
+def _card_integer(key: Any, value: Any) -> bool:
+    return (
+        isinstance(value, int) and not isinstance(value, bool) and 10**12 <= value < 10**20
+        and isinstance(key, str) and not _CARD_KEY_WORDS.isdisjoint(key_words(key))
+        and card_number(str(value))
+    )
@@ -1,26 +1,70 @@
-"""Calls LLM to produce a safe version of the action payload; returns rewritten payload for the allow path."""
+"""Produces a safe version of the action payload for the rewrite path: local redaction first, the LLM only for uncertain fields."""
 import json
 from typing import Any
 
-from openai import AsyncOpenAI
-
 from app.config import settings
+from app.fingerprint import action_fingerprint
+from app.llm.client import get_llm_client, load_json_reply, track_llm_call
+from app.llm.redact import Redaction, redact_payload
+from app.llm.singleflight import SingleFlight
+from app.metrics import counter
 from app.models import Action
 
-REWRITE_SYSTEM = """You are a safety rewriter. Given an action with type, resource, and payload, output a JSON object that is a safe version of the payload: redact PII (replace with placeholders like [REDACTED]), remove or restrict sensitive fields, keep the structure valid. Return only the new JSON object, no explanation."""
+REWRITE_SYSTEM = """You are a safety rewriter. Given an action's type and resource and a JSON object mapping payload field paths to their text, output a JSON object with the same keys whose values are safe versions of that text: redact PII and secrets (replace with placeholders like [REDACTED]), keep harmless text unchanged. Return only the JSON object, no explanation."""
+
+
+_flights = SingleFlight()
+
+_rewrites = counter(
+    "guardian_rewrites_total",
+    "Rewritten payloads by how uncertain fields were resolved (local: none were uncertain)",
+    ["mode"],
+)
+
+
+def rewrite_flights() -> SingleFlight:
+    """The rewriter's single-flight group (for stats)."""
+    return _flights
+
+
+def apply_rewrite(redaction: Redaction, resolved: dict[str, Any] | None, mode: str) -> dict[str, Any]:
+    """
+    The rewritten payload, counted by how uncertain fields were resolved: mode is llm,
+    combined (by the scorer's combined call) or fallback (redacted locally).
+    """
+    _rewrites.inc(mode if redaction.uncertain else "local")
+    return redaction.apply(resolved)
 
 
 async def rewrite_action(action: Action) -> dict[str, Any]:
-    """Returns a rewritten (safe) payload. If LLM fails or is not configured, returns a minimal safe payload."""
-    if not settings.openai_api_key:
-        return _minimal_safe_payload(action.payload)
+    """
+    Returns a rewritten (safe) payload. Keys, secrets and PII are redacted locally (see
+    redact.redact_payload), sharing unchanged subtrees with action.payload; only the fields it
+    marks uncertain are sent to the LLM. Without an LLM, or if it fails, they are redacted.
+    """
+    redaction = redact_payload(action.payload or {})
+    if not redaction.uncertain or not settings.openai_api_key:
+        return apply_rewrite(redaction, None, "fallback")
+    fields = dict(redaction.uncertain)
+    try:
+        if settings.llm_single_flight_enabled:
+            key = (action_fingerprint(action), settings.llm_model)
+            resolved = await _flights.do(key, lambda: _call_rewriter(action, fields))
+        else:
+            resolved = await _call_rewriter(action, fields)
+    except Exception:
+        return apply_rewrite(redaction, None, "fallback")
+    return apply_rewrite(redaction, resolved, "llm")
+
 
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
+async def _call_rewriter(action: Action, fields: dict[str, str]) -> dict[str, Any]:
+    """One LLM round trip for the uncertain fields (path label -> text). Raises on transport or parse errors."""
+    client = get_llm_client()
     user_content = (
         f"Action type: {action.type}\nResource: {action.resource or '(none)'}\n"
-        f"Payload to make safe: {json.dumps(action.payload)}"
+        f"Fields to make safe: {json.dumps(fields)}"
     )
-    try:
+    async with track_llm_call("rewriter"):
         resp = await client.chat.completions.create(
             model=settings.llm_model,
             messages=[
@@ -29,24 +73,7 @@ async def rewrite_action(action: Action) -> dict[str, Any]:
             ],
             max_tokens=1000,
         )
-        text = (resp.choices[0].message.content or "{}").strip()
-        if text.startswith("```"):
-            lines = text.split("\n")
-            text = "\n".join(l for l in lines if l.strip() != "```" and not l.strip().startswith("```json"))
-        return json.loads(text)
-    except Exception:
-        return _minimal_safe_payload(action.payload)
-
-
-def _minimal_safe_payload(payload: dict[str, Any]) -> dict[str, Any]:
-    """Strip known sensitive keys; return copy."""
-    sensitive_keys = {"password", "secret", "token", "api_key", "ssn", "authorization"}
-    out = {}
-    for k, v in (payload or {}).items():
-        if k.lower() in sensitive_keys:
-            out[k] = "[REDACTED]"
-        elif isinstance(v, dict):
-            out[k] = _minimal_safe_payload(v)
-        else:
-            out[k] = v
-    return out if out else {}
+    resolved = load_json_reply(resp.choices[0].message.content or "{}")
+    if not isinstance(resolved, dict):
+        raise ValueError("rewriter did not return a JSON object")
+    return resolved
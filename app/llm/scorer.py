@@ -2,13 +2,23 @@
 import json
 from typing import Any
 
-from openai import AsyncOpenAI
-
 from app.config import settings
+from app.fingerprint import action_fingerprint
+from app.llm.batcher import get_score_batcher
+from app.llm.cache import DecisionCache
+from app.llm.client import get_llm_client, load_json_reply, track_llm_call
+from app.llm.detectors import prescore
+from app.llm.limiter import Overloaded
+from app.llm.redact import redact_payload
+from app.llm.rewrite import apply_rewrite
+from app.llm.singleflight import SingleFlight
+from app.llm.summarize import summarize_payload
+from app.metrics import counter
 from app.models import Action
+from app.policy.store import current_snapshot
 
 # Decision: allow | block | needs_approval | rewrite
-SCORER_SYSTEM = """You are a risk scorer for agent actions. Given an action (type, resource, payload summary), output JSON only with:
+SCORER_SYSTEM = """You are a risk scorer for agent actions. Given an action (type, resource, payload digest; long text is elided with its size and a hash of its start), output JSON only with:
 - "score": number in [0, 1] (0=no risk, 1=high risk)
 - "decision": one of "allow", "block", "needs_approval", "rewrite"
 - "reason": short explanation
@@ -16,43 +26,199 @@ SCORER_SYSTEM = """You are a risk scorer for agent actions. Given an action (typ
 Rules: Block or needs_approval for sensitive paths (/etc/, .env, keys), external sends, PII. Allow only clearly safe actions. Use rewrite when the action can be made safe by redacting or restricting."""
 
 
+COMBINED_SYSTEM = SCORER_SYSTEM + """
+
+When the input lists payload fields to make safe and your decision is "rewrite", also output:
+- "rewrites": object with the same keys as those fields, each mapped to a safe version of its text (redact PII and secrets with placeholders like [REDACTED], keep harmless text unchanged)"""
+
+DECISIONS = ("allow", "block", "needs_approval", "rewrite")
+
+
+class InvalidOutput(ValueError):
+    """A combined score+rewrite response that failed validation."""
+
+
+_cache = DecisionCache(
+    max_entries=settings.score_cache_max_entries,
+    default_ttl=settings.score_cache_ttl_seconds,
+    decision_ttls=settings.score_cache_decision_ttls,
+)
+
+
+_flights = SingleFlight()
+
+_combined_fallbacks = counter(
+    "guardian_llm_combined_fallbacks_total",
+    "Combined score+rewrite responses that failed validation and were answered by two calls",
+)
+
+
+def score_cache() -> DecisionCache:
+    """The process-wide scorer cache (for stats)."""
+    return _cache
+
+
+def score_flights() -> SingleFlight:
+    """The scorer's single-flight group (for stats)."""
+    return _flights
+
+
+def _cache_generation() -> tuple[int, str]:
+    snapshot = current_snapshot()
+    return (snapshot.version if snapshot else 0, settings.llm_model)
+
+
 async def score_action(action: Action) -> tuple[float, str, str]:
     """
     Returns (score, decision, reason). decision is one of allow, block, needs_approval, rewrite.
+    Obvious cases (secrets, key files; see detectors.prescore) are decided locally first.
+    Repeated identical actions are answered from the decision cache; concurrent identical
+    actions share one LLM call. With settings.llm_batch_enabled, concurrent distinct actions
+    are scored together in one request (see batcher.ScoreBatcher).
     """
+    if settings.prescore_enabled:
+        local = prescore(action)
+        if local is not None:
+            return local
     if not settings.openai_api_key:
         # No key: treat as low risk allow for testing
         return 0.0, "allow", "no LLM configured"
+    key = action_fingerprint(action)
+    generation = _cache_generation()
+    use_cache = settings.score_cache_enabled
+    if use_cache:
+        cached = _cache.get(key, generation)
+        if cached is not None:
+            return cached
+    call = (lambda: get_score_batcher().score(action)) if settings.llm_batch_enabled else (lambda: _call_scorer(action))
+    try:
+        if settings.llm_single_flight_enabled:
+            result = await _flights.do((key, generation), call)
+        else:
+            result = await call()
+    except Overloaded as e:
+        return _overloaded(e)
+    except Exception as e:
+        # On error, default to needs_approval so we don't allow blindly (never cached)
+        return 0.8, "needs_approval", f"scorer error: {e!s}"[:200]
+    if use_cache:
+        _cache.put(key, result, generation)
+    return result
+
+
+def _overloaded(e: Overloaded) -> tuple[float, str, str]:
+    """The configured overload verdict (never cached), with a reason distinct from scorer errors."""
+    return 0.8, settings.llm_overload_decision, f"overloaded: {e!s}"[:200]
+
 
-    client = AsyncOpenAI(api_key=settings.openai_api_key)
-    payload_summary = json.dumps(action.payload)[:500] if action.payload else "{}"
-    user_content = (
+async def _call_scorer(action: Action) -> tuple[float, str, str]:
+    """One LLM round trip. Raises on transport or parse errors."""
+    client = get_llm_client()
+    user_content = _user_content(action) + "Output JSON with score, decision, reason only."
+    async with track_llm_call("scorer"):
+        resp = await client.chat.completions.create(
+            model=settings.llm_model,
+            messages=[
+                {"role": "system", "content": SCORER_SYSTEM},
+                {"role": "user", "content": user_content},
+            ],
+            max_tokens=300,
+        )
+    data = load_json_reply(resp.choices[0].message.content or "{}")
+    score = float(data.get("score", 0.0))
+    decision = str(data.get("decision", "allow")).lower()
+    if decision not in DECISIONS:
+        decision = "allow"
+    reason = str(data.get("reason", ""))[:500]
+    return score, decision, reason
+
+
+def _user_content(action: Action) -> str:
+    payload_summary = summarize_payload(action.payload) if action.payload else "{}"
+    return (
         f"Action type: {action.type}\nResource: {action.resource or '(none)'}\n"
         f"Payload (summary): {payload_summary}\n"
-        "Output JSON with score, decision, reason only."
     )
+
+
+async def score_and_rewrite(action: Action) -> tuple[tuple[float, str, str], dict[str, Any] | None]:
+    """
+    settings.llm_pipeline_mode == "combined": one LLM request returns the verdict and, for
+    rewrite, safe text for the payload fields the local redactor is unsure about. Returns
+    (verdict as in score_action, rewritten payload). The payload is None when the caller still
+    has to call rewrite_action for a rewrite verdict: the verdict was local or cached, or the
+    combined response failed validation and the verdict came from score_action instead.
+    """
+    if settings.prescore_enabled:
+        local = prescore(action)
+        if local is not None:
+            return local, None
+    if not settings.openai_api_key:
+        return (0.0, "allow", "no LLM configured"), None
+    key = action_fingerprint(action)
+    generation = _cache_generation()
+    use_cache = settings.score_cache_enabled
+    if use_cache:
+        cached = _cache.get(key, generation)
+        if cached is not None:
+            return cached, None
+    redaction = redact_payload(action.payload or {})
+    fields = dict(redaction.uncertain)
     try:
+        if settings.llm_single_flight_enabled:
+            verdict, resolved = await _flights.do((key, generation, "combined"), lambda: _call_combined(action, fields))
+        else:
+            verdict, resolved = await _call_combined(action, fields)
+    except InvalidOutput:
+        _combined_fallbacks.inc()
+        return await score_action(action), None
+    except Overloaded as e:
+        return _overloaded(e), None
+    except Exception as e:
+        return (0.8, "needs_approval", f"scorer error: {e!s}"[:200]), None
+    if use_cache:
+        _cache.put(key, verdict, generation)
+    if verdict[1] != "rewrite":
+        return verdict, None
+    return verdict, apply_rewrite(redaction, resolved, "combined")
+
+
+async def _call_combined(action: Action, fields: dict[str, str]) -> tuple[tuple[float, str, str], dict[str, str] | None]:
+    """One LLM round trip with a JSON-object response. Raises InvalidOutput if it fails validation."""
+    client = get_llm_client()
+    user_content = _user_content(action)
+    if fields:
+        user_content += (
+            f"Payload fields to make safe if the decision is rewrite: {json.dumps(fields)}\n"
+            "Output JSON with score, decision, reason, and rewrites when the decision is rewrite."
+        )
+    else:
+        user_content += "Output JSON with score, decision, reason only."
+    async with track_llm_call("combined"):
         resp = await client.chat.completions.create(
             model=settings.llm_model,
             messages=[
-                {"role": "system", "content": SCORER_SYSTEM},
+                {"role": "system", "content": COMBINED_SYSTEM},
                 {"role": "user", "content": user_content},
             ],
-            max_tokens=300,
+            response_format={"type": "json_object"},
+            max_tokens=1300 if fields else 300,
         )
-        text = resp.choices[0].message.content or "{}"
-        # Parse JSON from response (may be wrapped in markdown)
-        text = text.strip()
-        if text.startswith("```"):
-            lines = text.split("\n")
-            text = "\n".join(l for l in lines if l.strip() != "```" and not l.strip().startswith("```json"))
-        data = json.loads(text)
-        score = float(data.get("score", 0.0))
-        decision = str(data.get("decision", "allow")).lower()
-        if decision not in ("allow", "block", "needs_approval", "rewrite"):
-            decision = "allow"
-        reason = str(data.get("reason", ""))[:500]
-        return score, decision, reason
-    except Exception as e:
-        # On error, default to needs_approval so we don't allow blindly
-        return 0.8, "needs_approval", f"scorer error: {e!s}"[:200]
+    try:
+        data = load_json_reply(resp.choices[0].message.content or "")
+    except ValueError as e:
+        raise InvalidOutput(f"not JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise InvalidOutput("not a JSON object")
+    score, decision, reason = data.get("score"), data.get("decision"), data.get("reason", "")
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 1:
+        raise InvalidOutput(f"invalid score {score!r}")
+    if not isinstance(decision, str) or decision.lower() not in DECISIONS:
+        raise InvalidOutput(f"invalid decision {decision!r}")
+    verdict = (float(score), decision.lower(), str(reason)[:500])
+    if verdict[1] != "rewrite" or not fields:
+        return verdict, None
+    rewrites = data.get("rewrites")
+    if not isinstance(rewrites, dict) or not all(isinstance(v, str) for v in rewrites.values()):
+        raise InvalidOutput("rewrite decision without a rewrites object of strings")
+    return verdict, rewrites
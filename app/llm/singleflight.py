@@ -0,0 +1,61 @@
+"""Single-flight: concurrent calls with the same key share one in-flight task and its result or exception."""
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+from app.llm.limiter import ABANDONED, Overloaded, no_deadline, within_deadline
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    The first caller for a key (the leader) starts fn() as a task; callers arriving while it
+    runs await the same task. The task runs without a request deadline; each waiter gives up
+    at its own (Overloaded, see limiter.within_deadline). A cancelled or timed-out waiter only
+    detaches itself; the shared task is cancelled when its last waiter goes away.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            with no_deadline():
+                call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        timed_out = False
+        try:
+            return await within_deadline(asyncio.shield(call.task))
+        except Overloaded:
+            timed_out = True
+            raise
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every waiter was cancelled or timed out: nobody wants the result any more.
+                self._forget(key, call)
+                call.task.cancel(ABANDONED if timed_out else None)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict[str, Any]:
+        return {"in_flight": len(self._calls), "executions": self.executions, "coalesced": self.coalesced}
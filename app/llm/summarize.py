@@ -0,0 +1,172 @@
+"""Byte-budgeted payload digest for scorer prompts: security-relevant fields first, bulk text elided with size and prefix hash."""
+import hashlib
+import heapq
+import json
+from itertools import islice
+from typing import Any
+
+from app.config import settings
+from app.llm.redact import key_words
+
+# Key words whose values (and everything under them) are kept before other fields.
+_SECURITY_KEY_WORDS = frozenset({
+    "to", "cc", "bcc", "from", "recipient", "recipients", "reply", "sender", "email", "url", "uri", "href",
+    "link", "endpoint", "webhook", "host", "domain", "ip", "path", "file", "filename", "dir", "directory",
+    "dest", "destination", "target", "command", "cmd", "args", "query", "sql", "script", "key", "token",
+    "secret", "password", "auth", "authorization", "credential", "credentials", "method", "permission",
+    "permissions", "role", "scope", "amount", "account",
+})
+_SENSITIVE_PREFIXES = ("http://", "https://", "/", "~/", "s3://", "gs://", "ftp://", "sftp://", "ssh://", "file:", "git@")
+_SCALAR_MAX = 200  # strings up to this many characters are kept whole
+_HEAD = 80  # characters of an elided string shown in its marker
+_HASH_PREFIX = 4096  # elided strings are hashed on this prefix, so hashing cost is bounded too
+_KEY_MAX = 64
+_MAX_DEPTH = 32
+# Children taken per container: lists are often long runs of similar items, so a few show their shape.
+_MAX_DICT_KEYS = 64
+_MAX_LIST_ITEMS = 3
+_MAX_RELEVANT_LIST_ITEMS = 32  # e.g. every recipient
+_MARKER_RESERVE = 64  # held back for "+N more" markers
+_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+class _Container:
+    __slots__ = ("is_dict", "size", "items")
+
+    def __init__(self, is_dict: bool, size: int):
+        self.is_dict = is_dict
+        self.size = size
+        self.items: list[tuple[Any, Any]] = []  # (key or index, rendered value)
+
+
+def _cost(value: Any) -> int:
+    encoded = _ENCODER.encode(value)
+    return len(encoded) if encoded.isascii() else len(encoded.encode("utf-8"))
+
+
+def _security_key(key: Any) -> bool:
+    return isinstance(key, str) and not _SECURITY_KEY_WORDS.isdisjoint(key_words(key[:_KEY_MAX]))
+
+
+def _looks_sensitive(value: str) -> bool:
+    return value.startswith(_SENSITIVE_PREFIXES) or (len(value) <= 320 and "@" in value)
+
+
+def _elide(value: str, head: int = _HEAD) -> str:
+    """Size, hash of a bounded prefix and the first words of a long string, cut at a word boundary."""
+    digest = hashlib.blake2b(value[:_HASH_PREFIX].encode("utf-8", "replace"), digest_size=8).hexdigest()
+    shown = value[:head]
+    if head and len(value) > head and " " in shown:
+        shown = shown.rsplit(" ", 1)[0]
+    return f"[{len(value)} chars, prefix hash {digest}] {shown}…" if shown else f"[{len(value)} chars, prefix hash {digest}]"
+
+
+def _summarize_scalar(value: Any, budget: int) -> str:
+    if isinstance(value, str) and len(value) > _SCALAR_MAX:
+        candidates = (_elide(value), _elide(value, head=0))
+    else:
+        candidates = (value,)
+    for candidate in candidates:
+        text = json.dumps(candidate, ensure_ascii=False, default=str)
+        if len(text.encode("utf-8")) <= budget:
+            return text
+    # Too small even for the elision marker: a cut prefix.
+    text = value if isinstance(value, str) else str(value)
+    keep = min(len(text), budget)
+    while keep > 0:
+        cut = json.dumps(text[:keep] + "…", ensure_ascii=False)
+        if len(cut.encode("utf-8")) <= budget:
+            return cut
+        keep = min(keep - 1, keep * budget // len(cut.encode("utf-8")))
+    return '""'
+
+
+def _render(container: _Container) -> Any:
+    if container.is_dict:
+        return {str(k)[:_KEY_MAX]: _render(v) if isinstance(v, _Container) else v for k, v in container.items}
+    return [_render(v) if isinstance(v, _Container) else v for _, v in sorted(container.items, key=lambda kv: kv[0])]
+
+
+def summarize_payload(payload: Any, budget: int | None = None) -> str:
+    """
+    Compact JSON digest of the payload in at most `budget` bytes of UTF-8
+    (default settings.scorer_payload_budget_bytes). Fields under security-relevant keys
+    (recipients, URLs, paths, commands, credentials...) and URL/path/email-looking strings go
+    first, then other fields breadth-first, then long text. Strings over 200 characters become
+    "[<len> chars, prefix hash <h>] <first words>…", where the hash covers the first 4096
+    characters, and containers that did not fit end with a "+N more" marker. At most budget/4
+    values are visited, so the cost does not grow with the payload. The smallest digest is
+    2 bytes (an empty container or string), whatever the budget.
+    """
+    budget = settings.scorer_payload_budget_bytes if budget is None else budget
+    if not isinstance(payload, (dict, list, tuple)):
+        return _summarize_scalar(payload, budget)
+    root = _Container(isinstance(payload, dict), len(payload))
+    containers = [root]
+    reserve = min(_MARKER_RESERVE, budget // 8)
+    remaining = budget - 2 - reserve
+    visits = max(budget // 4, 1)
+    heap: list[tuple[tuple[int, int, int], _Container, Any, Any, bool]] = []
+    seq = 0
+
+    def expand(container: _Container, value: Any, depth: int, relevant: bool) -> None:
+        nonlocal visits, seq
+        if isinstance(value, dict):
+            cap = _MAX_DICT_KEYS
+        else:
+            cap = _MAX_RELEVANT_LIST_ITEMS if relevant else _MAX_LIST_ITEMS
+        take = min(len(value), visits, cap)
+        visits -= take
+        children = value.items() if isinstance(value, dict) else enumerate(value)
+        for key, child in islice(children, take):
+            child_relevant = relevant or (container.is_dict and _security_key(key))
+            if child_relevant or (isinstance(child, str) and _looks_sensitive(child)):
+                rank = 0
+            elif isinstance(child, str) and len(child) > _SCALAR_MAX:
+                rank = 2
+            else:
+                rank = 1
+            seq += 1
+            heapq.heappush(heap, ((rank, depth, seq), container, key, child, child_relevant))
+
+    expand(root, payload, 1, False)
+    while heap and remaining > 4:
+        (_, depth, _), parent, key, value, relevant = heapq.heappop(heap)
+        key_cost = (_cost(str(key)[:_KEY_MAX]) + 1 if parent.is_dict else 0) + 1  # key, colon, comma
+        if isinstance(value, (dict, list, tuple)):
+            if depth >= _MAX_DEPTH:
+                value = f"[{'object' if isinstance(value, dict) else 'array'} of {len(value)}]"
+            elif key_cost + 2 <= remaining:
+                child = _Container(isinstance(value, dict), len(value))
+                parent.items.append((key, child))
+                containers.append(child)
+                remaining -= key_cost + 2
+                expand(child, value, depth + 1, relevant)
+                continue
+            else:
+                continue
+        if isinstance(value, str):
+            rendered = value if len(value) <= _SCALAR_MAX else _elide(value)
+            cost = key_cost + _cost(rendered)
+            if cost > remaining and len(value) > 16:
+                rendered = _elide(value, head=0)
+                cost = key_cost + _cost(rendered)
+        else:
+            rendered = value if value is None or isinstance(value, (bool, int, float)) else str(value)[:_SCALAR_MAX]
+            cost = key_cost + _cost(rendered)
+        if cost <= remaining:
+            parent.items.append((key, rendered))
+            remaining -= cost
+
+    remaining += reserve
+    for container in containers:
+        elided = container.size - len(container.items)
+        if elided <= 0:
+            continue
+        marker = f"+{elided} more"
+        cost = _cost(marker) + 1 + (_cost("…") + 1 if container.is_dict else 0)
+        if cost > remaining:
+            break
+        container.items.append(("…" if container.is_dict else float("inf"), marker))
+        remaining -= cost
+    return json.dumps(_render(root), ensure_ascii=False, separators=(",", ":"))
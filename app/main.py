@@ -1,27 +1,68 @@
-"""FastAPI app. Lifespan: MongoDB only (Redis/stream consumer omitted until deployment)."""
+"""FastAPI app. Lifespan: MongoDB, policy snapshot sync, approval notifier, audit sink, shared LLM client, Redis stream consumer (if REDIS_URL is set)."""
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse, RedirectResponse, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response
 
 from app.api.approvals import router as approvals_router
 from app.api.decide import router as decide_router
 from app.api.policies import router as policies_router
+from app.audit import get_audit_sink, start_audit, stop_audit
 from app.ui.router import router as ui_router
 from app.config import settings
-from app.db import check_db, close_db, init_db, start_db
+from app.db import check_db, close_db, get_database, init_db, start_db
+from app.llm.batcher import get_score_batcher
+from app.llm.client import close_llm, start_llm
+from app.llm.limiter import get_llm_limiter
+from app.llm.rewrite import rewrite_flights
+from app.llm.scorer import score_cache, score_flights
+from app.metrics import registry, stats_collector
+from app.notify import get_notifier, start_approval_notifier, stop_approval_notifier
+from app.policy.store import start_policy_sync, stop_policy_sync
+from app.stream.consumer import get_consumer, start_stream_consumer, stop_stream_consumer
+
+logger = logging.getLogger(__name__)
+
+registry.register_collector(stats_collector("guardian_score_cache", lambda: score_cache().stats(), "Scorer decision cache"))
+registry.register_collector(stats_collector("guardian_score_single_flight", lambda: score_flights().stats(), "Scorer single-flight"))
+registry.register_collector(stats_collector("guardian_rewrite_single_flight", lambda: rewrite_flights().stats(), "Rewriter single-flight"))
+registry.register_collector(
+    stats_collector("guardian_llm_limiter", lambda: get_llm_limiter().stats() if settings.llm_limiter_enabled else None, "Adaptive LLM concurrency limiter")
+)
+registry.register_collector(
+    stats_collector("guardian_score_batcher", lambda: get_score_batcher().stats() if settings.llm_batch_enabled else None, "Scorer micro-batcher")
+)
+registry.register_collector(
+    stats_collector("guardian_audit", lambda: s.stats() if (s := get_audit_sink()) else None, "Decision audit sink")
+)
+registry.register_collector(stats_collector("guardian_approval_notifier", lambda: get_notifier().stats(), "Approval wait notifier"))
+registry.register_collector(
+    stats_collector("guardian_stream_consumer", lambda: c.stats() if (c := get_consumer()) else None, "Redis stream consumer")
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await start_db()
     try:
         await init_db()
-    except Exception:
+    except Exception as e:
         # MongoDB may be down (e.g. local dev); app still starts, /health reports 503
-        pass
+        logger.warning("index setup failed: %s", e)
+    await start_policy_sync(get_database())
+    await start_approval_notifier(get_database())
+    await start_audit(get_database())
+    await start_llm()
+    await start_stream_consumer(get_database())
     try:
         yield
     finally:
+        await stop_stream_consumer()
+        await stop_audit()
+        await close_llm()
+        await stop_approval_notifier()
+        await stop_policy_sync()
         await close_db()
 
 
@@ -69,4 +110,25 @@ async def health():
             content={"status": "unhealthy", "db": "down"},
             status_code=503,
         )
-    return {"status": "ok", "db": "up"}
\ No newline at end of file
+    return {"status": "ok", "db": "up"}
+
+
+@app.get("/status")
+async def status():
+    """Runtime counters for this worker (no I/O)."""
+    return {
+        "score_cache": score_cache().stats(),
+        "score_single_flight": score_flights().stats(),
+        "rewrite_single_flight": rewrite_flights().stats(),
+        "llm_limiter": get_llm_limiter().stats() if settings.llm_limiter_enabled else None,
+        "score_batcher": get_score_batcher().stats() if settings.llm_batch_enabled else None,
+        "approval_notifier": get_notifier().stats(),
+        "audit": sink.stats() if (sink := get_audit_sink()) else None,
+        "stream_consumer": consumer.stats() if (consumer := get_consumer()) else None,
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Prometheus text exposition for this worker (no I/O)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
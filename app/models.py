@@ -2,7 +2,7 @@
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, SerializerFunctionWrapHandler, model_serializer
 
 
 # --- Approvals API ---
@@ -19,15 +19,64 @@ class ApprovalResponse(BaseModel):
     resolved_at: datetime | None
     resolved_by: str | None
     created_at: datetime
+    occurrences: int = 1  # identical actions from the same agent attached to this request
+    last_seen_at: datetime | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class ApprovalSummary(BaseModel):
+    """ApprovalResponse without the payload, for listings (GET /approvals?view=summary)."""
+    id: str
+    action_id: str
+    agent_id: str
+    action_type: str
+    resource: str
+    risk_score: float
+    reason: str
+    status: str
+    resolved_at: datetime | None
+    resolved_by: str | None
+    created_at: datetime
+    occurrences: int = 1  # identical actions from the same agent attached to this request
+    last_seen_at: datetime | None = None
+
+
+class ApprovalStatus(BaseModel):
+    """Resolution state returned by GET /approvals/{id}/wait and sent on /approvals/events."""
+    id: str
+    status: str
+    resolved_at: datetime | None = None
+    resolved_by: str | None = None
+
+
 class ApproveDenyBody(BaseModel):
     comment: str | None = None
     resolved_by: str | None = None
 
 
+class BulkResolveBody(BaseModel):
+    """Either ids, or at least one filter field (matched against pending approvals only)."""
+    ids: list[str] | None = None
+    agent_id: str | None = None
+    action_type: str | None = None
+    created_before: datetime | None = None
+    comment: str | None = None
+    resolved_by: str | None = None
+
+
+class BulkResolveItem(BaseModel):
+    id: str
+    outcome: str  # resolved | already_resolved | not_found
+    status: str | None = None  # status after the call (None if not found)
+
+
+class BulkResolveResponse(BaseModel):
+    status: str  # approved | denied
+    resolved: int
+    items: list[BulkResolveItem]
+
+
 # --- Policy API ---
 class PolicyCreate(BaseModel):
     name: str
@@ -46,6 +95,45 @@ class PolicyResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PolicySnapshotInfo(BaseModel):
+    """In-memory policy snapshot held by this worker."""
+    version: int
+    refreshed_at: datetime | None
+    rule_count: int
+    sync_mode: str  # stopped | change_stream | polling
+
+
+class PolicyRuleRef(BaseModel):
+    """A compiled rule, located in its policy document."""
+    policy_id: str | None  # None for rules not loaded from the policies collection
+    position: int  # index in the policy's definition.rules
+    effect: str
+    match: dict[str, Any]
+
+
+class PolicyRuleStats(PolicyRuleRef):
+    """Profile counters of one rule (settings.policy_profile_enabled)."""
+    matches: int  # evaluations this rule decided
+    sampled_tries: int  # sampled evaluations that tried this rule
+    sampled_match_ns: int  # time spent matching it in those
+    estimated_tries: int  # sampled_tries scaled to all evaluations
+    mean_match_ns: int | None = None
+
+
+class PolicyStats(BaseModel):
+    """GET /policies/{id}/stats: per-rule counters since the snapshot was built."""
+    policy_id: str
+    profiling: bool
+    sample_rate: float = 0.0
+    since: datetime | None = None
+    evaluations: int = 0  # evaluations against the whole snapshot
+    sampled: int = 0
+    matches: int = 0  # evaluations decided by a rule of this policy
+    sampled_tries: int = 0
+    sampled_match_ns: int = 0
+    rules: list[PolicyRuleStats] = Field(default_factory=list)
+
+
 # --- Action / Decision ---
 class Action(BaseModel):
     """Action proposed by a supervised agent."""
@@ -67,6 +155,13 @@ class Decision(BaseModel):
     approval_id: str | None = None
 
 
+class PolicyExplanation(BaseModel):
+    """Which rule decided the policy stage, and how many rules were tried to find it."""
+    rule: PolicyRuleRef | None = None  # None: no rule matched (policy_decision unknown)
+    rules_tried: int
+    rule_count: int  # rules in the snapshot
+
+
 class EvaluateResponse(BaseModel):
     """Response for POST /actions/evaluate (full pipeline)."""
     action_id: str
@@ -76,3 +171,20 @@ class EvaluateResponse(BaseModel):
     score: float = 0.0
     rewritten_payload: dict[str, Any] | None = None
     approval_id: str | None = None
+    explain: PolicyExplanation | None = None  # POST /evaluate?explain=true
+
+    @model_serializer(mode="wrap")
+    def _omit_explain(self, handler: SerializerFunctionWrapHandler):
+        # Only explain requests carry the field, so other responses keep their wire format.
+        data = handler(self)
+        if data.get("explain") is None:
+            data.pop("explain", None)
+        return data
+
+
+class BatchEvaluateItem(BaseModel):
+    """One entry of POST /evaluate/batch, in input order. Exactly one of result / error is set."""
+    index: int
+    action_id: str
+    result: EvaluateResponse | None = None
+    error: str | None = None
@@ -0,0 +1,221 @@
+"""Approval resolution fan-out to long-poll waiters and SSE subscribers. Fed by approve/deny handlers and a change stream."""
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.db import APPROVALS_COLLECTION, run_with_change_stream
+
+logger = logging.getLogger(__name__)
+
+_STATUS_PROJECTION = {"status": 1, "resolved_at": 1, "resolved_by": 1}
+_RECENT_EVENTS = 4096
+
+
+def status_event(doc: dict[str, Any]) -> dict[str, Any]:
+    """The approval fields waiters and subscribers receive."""
+    resolved_at = doc.get("resolved_at")
+    return {
+        "id": str(doc["_id"]),
+        "status": doc.get("status"),
+        "resolved_at": resolved_at.isoformat() if isinstance(resolved_at, datetime) else resolved_at,
+        "resolved_by": doc.get("resolved_by"),
+    }
+
+
+class Subscription:
+    """One SSE client. Dropped (overflowed=True) if it falls more than queue_size events behind."""
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+
+class ApprovalNotifier:
+    """
+    Per-worker registry of approval waiters. A resolution wakes every waiter on that id and
+    every subscriber with no DB access; the initial status check of concurrent waiters is
+    batched into one $in query.
+    """
+
+    def __init__(self):
+        self._waiters: dict[str, set[asyncio.Future]] = {}
+        self._subscriptions: set[Subscription] = set()
+        self._lookups: dict[ObjectId, asyncio.Future] = {}
+        self._lookup_task: asyncio.Task | None = None
+        # Handlers and the change stream both publish the same resolution; deliver it once.
+        self._recent: OrderedDict[tuple[str, str], None] = OrderedDict()
+        self.published = 0
+        self.lookup_queries = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, doc: dict[str, Any]) -> None:
+        """Deliver a resolved approval document (needs _id and status) to waiters and subscribers."""
+        event = status_event(doc)
+        if event["status"] == "pending":
+            return
+        key = (event["id"], event["status"])
+        if key in self._recent:
+            return
+        self._recent[key] = None
+        if len(self._recent) > _RECENT_EVENTS:
+            self._recent.popitem(last=False)
+        self.published += 1
+        for future in self._waiters.pop(event["id"], ()):
+            if not future.done():
+                future.set_result(event)
+        for sub in list(self._subscriptions):
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                sub.overflowed = True
+                self._subscriptions.discard(sub)
+                self.dropped_subscribers += 1
+
+    async def wait(self, db, oid: ObjectId, timeout: float) -> dict[str, Any] | None:
+        """
+        Return the approval's status event once it is resolved, or its pending state after
+        `timeout` seconds. None if the approval does not exist.
+        """
+        approval_id = str(oid)
+        future = asyncio.get_running_loop().create_future()
+        # Register before the lookup so a resolution between the two is not missed.
+        self._waiters.setdefault(approval_id, set()).add(future)
+        try:
+            current = await self._lookup(db, oid)
+            if current is None:
+                return None
+            if current.get("status") != "pending":
+                return status_event(current)
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return status_event(current)
+        finally:
+            waiters = self._waiters.get(approval_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[approval_id]
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(settings.approval_events_queue_size)
+        self._subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscriptions.discard(sub)
+
+    def waiting_ids(self) -> list[str]:
+        return list(self._waiters)
+
+    async def _lookup(self, db, oid: ObjectId) -> dict[str, Any] | None:
+        future = self._lookups.get(oid)
+        if future is None:
+            future = self._lookups[oid] = asyncio.get_running_loop().create_future()
+        if self._lookup_task is None:
+            self._lookup_task = asyncio.create_task(self._run_lookups(db))
+        return await asyncio.shield(future)
+
+    async def _run_lookups(self, db) -> None:
+        await asyncio.sleep(0)  # let waiters arriving in the same tick join this query
+        batch, self._lookups, self._lookup_task = self._lookups, {}, None
+        self.lookup_queries += 1
+        try:
+            docs = await db[APPROVALS_COLLECTION].find({"_id": {"$in": list(batch)}}, _STATUS_PROJECTION).to_list(length=None)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        found = {doc["_id"]: doc for doc in docs}
+        for oid, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(oid))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "waiting_ids": len(self._waiters),
+            "waiters": sum(len(w) for w in self._waiters.values()),
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "lookup_queries": self.lookup_queries,
+            "dropped_subscribers": self.dropped_subscribers,
+            "sync_mode": _sync_mode,
+        }
+
+
+_notifier = ApprovalNotifier()
+_sync_task: asyncio.Task | None = None
+_sync_mode = "stopped"
+
+
+def get_notifier() -> ApprovalNotifier:
+    return _notifier
+
+
+async def _watch_changes(db) -> None:
+    global _sync_mode
+    pipeline = [{"$match": {"operationType": {"$in": ["update", "replace"]}, "fullDocument.status": {"$ne": "pending"}}}]
+    async with db[APPROVALS_COLLECTION].watch(pipeline=pipeline, full_document="updateLookup") as stream:
+        _sync_mode = "change_stream"
+        async for change in stream:
+            if change.get("fullDocument"):
+                _notifier.publish(change["fullDocument"])
+
+
+async def _poll_waiters(db) -> None:
+    """Without change streams, resolutions made by other workers are found by one $in query per interval."""
+    global _sync_mode
+    _sync_mode = "polling"
+    while True:
+        await asyncio.sleep(settings.approval_wait_poll_interval_seconds)
+        ids = [ObjectId(i) for i in _notifier.waiting_ids()]
+        if not ids:
+            continue
+        try:
+            docs = await db[APPROVALS_COLLECTION].find(
+                {"_id": {"$in": ids}, "status": {"$ne": "pending"}}, _STATUS_PROJECTION
+            ).to_list(length=None)
+        except PyMongoError as e:
+            logger.warning("approval wait poll failed: %s", e)
+            continue
+        for doc in docs:
+            _notifier.publish(doc)
+
+
+async def _sync_loop(db) -> None:
+    await run_with_change_stream(
+        lambda: _watch_changes(db),
+        lambda: _poll_waiters(db),
+        settings.approval_change_stream_retry_seconds,
+        settings.approval_change_stream_retry_max_seconds,
+        streaming=lambda: _sync_mode == "change_stream",
+        name="approvals",
+        fallback="polling for waited approvals",
+    )
+
+
+async def start_approval_notifier(db) -> None:
+    """Start feeding the notifier from MongoDB. Call once at app startup."""
+    global _sync_task
+    _sync_task = asyncio.create_task(_sync_loop(db))
+
+
+async def stop_approval_notifier() -> None:
+    """Cancel the background task. Call at app shutdown."""
+    global _sync_task, _sync_mode
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+    _sync_mode = "stopped"
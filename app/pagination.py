@@ -0,0 +1,58 @@
+"""Keyset pagination over (created_at, _id), newest first. Cursors are opaque URL-safe tokens."""
+import base64
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Matches the compound indexes created in init_db.
+NEWEST_FIRST = [("created_at", -1), ("_id", -1)]
+_KEY_PROJECTION = {"_id": 1, "created_at": 1}
+
+
+def encode_cursor(created_at: datetime, oid: ObjectId) -> str:
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)  # Motor returns naive UTC
+    millis = int(created_at.timestamp() * 1000)  # BSON dates are millisecond precision
+    return base64.urlsafe_b64encode(f"{millis}.{oid}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[datetime, ObjectId]:
+    """Raises ValueError for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        millis, oid = raw.split(".", 1)
+        return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc), ObjectId(oid)
+    except (ValueError, UnicodeDecodeError, InvalidId) as e:
+        raise ValueError(f"invalid cursor {token!r}") from e
+
+
+def _before(created_at: datetime, oid: ObjectId) -> dict[str, Any]:
+    return {"$or": [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "_id": {"$lt": oid}}]}
+
+
+def _at_or_after(created_at: datetime, oid: ObjectId) -> dict[str, Any]:
+    return {"$or": [{"created_at": {"$gt": created_at}}, {"created_at": created_at, "_id": {"$gte": oid}}]}
+
+
+async def page_query(collection, query: dict[str, Any], limit: int, after: str | None) -> tuple[dict[str, Any], str | None]:
+    """
+    Resolve one page to a key range. Returns (range query, next cursor or None).
+
+    A covered probe reads only the keys at the page boundary, so the page itself can be
+    streamed with a plain range scan and the next cursor is known before the first byte is sent.
+    """
+    clauses = [query] if query else []
+    if after:
+        clauses.append(_before(*decode_cursor(after)))
+    start = {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else {})
+    boundary = await (
+        collection.find(start, _KEY_PROJECTION).sort(NEWEST_FIRST).skip(limit - 1).limit(2).to_list(length=2)
+    )
+    if not boundary:
+        return start, None  # fewer than `limit` documents remain: the page is everything left
+    last = boundary[0]
+    page = {"$and": clauses + [_at_or_after(last["created_at"], last["_id"])]}
+    next_cursor = encode_cursor(last["created_at"], last["_id"]) if len(boundary) > 1 else None
+    return page, next_cursor
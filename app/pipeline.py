@@ -1,36 +1,137 @@
-"""Single pipeline: policy -> LLM (if unknown) -> decision. Used by API (and stream consumer later)."""
+"""Single pipeline: policy -> LLM (if unknown) -> decision. Shared by the API and the Redis stream consumer."""
+import asyncio
+import logging
+import time
 from datetime import datetime, timezone
+from typing import Any
 
-from app.db import APPROVALS_COLLECTION
+from app.approval_store import save_approval, save_approvals
+from app.audit import record_decision
+from app.config import settings
+from app.fingerprint import action_fingerprint
+from app.llm.limiter import deadline
 from app.llm.rewrite import rewrite_action
-from app.llm.scorer import score_action
-from app.models import Action, EvaluateResponse
-from app.policy.store import evaluate_action
+from app.llm.scorer import score_action, score_and_rewrite
+from app.metrics import counter, histogram
+from app.models import Action, BatchEvaluateItem, EvaluateResponse, PolicyExplanation, PolicyRuleRef
+from app.policy.compiler import CompiledPolicy
+from app.policy.engine import evaluate, explain as explain_policy
+from app.policy.store import get_snapshot
 
+logger = logging.getLogger(__name__)
 
-async def run_pipeline(db, action: Action) -> EvaluateResponse:
+# Stages: snapshot, policy, score, rewrite, approval_insert. Paths: see _path().
+_stage_seconds = histogram("guardian_pipeline_stage_seconds", "Time spent in each pipeline stage", ["stage"])
+_pipeline_seconds = histogram("guardian_pipeline_seconds", "End-to-end pipeline time per call", ["entry"])
+_decisions = counter("guardian_decisions_total", "Pipeline decisions by path", ["path"])
+
+
+class StageTimer:
+    """Stage durations for one pipeline run. Each stage is also observed in the stage histogram."""
+    __slots__ = ("started", "stages")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def record(self, stage: str, since: float) -> float:
+        """Record the time from `since` to now against `stage`; returns now for chaining."""
+        now = time.perf_counter()
+        elapsed = now - since
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+        _stage_seconds.observe(elapsed, stage)
+        return now
+
+    def finish(self, entry: str, detail: str) -> None:
+        total = time.perf_counter() - self.started
+        _pipeline_seconds.observe(total, entry)
+        threshold = settings.slow_pipeline_log_ms
+        if threshold and total * 1000 >= threshold:
+            breakdown = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.stages.items())
+            logger.warning("slow pipeline (%s) %s: %.1fms [%s]", entry, detail, total * 1000, breakdown)
+
+
+def _path(response: EvaluateResponse) -> str:
     """
-    Full pipeline: policy engine -> if unknown then LLM scorer -> return decision.
-    For needs_approval we persist to approval_requests and return approval_id.
+    Decision path label: policy_allow | policy_deny | prescore_<block|needs_approval> |
+    llm_<allow|block|needs_approval|rewrite> | llm_overload | scorer_error | approval_reused,
+    or other for a decision outside those. Call once the approval is saved: a reused
+    resolution replaces the decision.
     """
-    policy_decision = await evaluate_action(db, action)
+    if response.policy_decision != "unknown":
+        return "policy_allow" if response.decision == "allowed" else "policy_deny"
+    if response.reason.startswith("reused approval"):
+        return "approval_reused"
+    if response.reason.startswith("scorer error"):
+        return "scorer_error"
+    if response.reason.startswith("overloaded:"):
+        return "llm_overload"
+    if response.reason.startswith("prescorer:"):
+        return "prescore_block" if response.decision == "blocked" else "prescore_needs_approval"
+    return {
+        "allowed": "llm_allow",
+        "blocked": "llm_block",
+        "needs_approval": "llm_needs_approval",
+        "rewritten": "llm_rewrite",
+    }.get(response.decision, "other")
+
 
+async def decide(
+    action: Action,
+    policy: CompiledPolicy,
+    timer: StageTimer | None = None,
+    explain: bool = False,
+) -> tuple[EvaluateResponse, dict[str, Any] | None]:
+    """
+    Policy engine -> if unknown then LLM scorer (and rewriter; one combined call with
+    settings.llm_pipeline_mode == "combined") -> decision. No DB writes.
+    For needs_approval also returns the approval_requests document to persist; the caller
+    saves it (app.approval_store) and fills in response.approval_id. Stage times go to `timer` if given.
+    explain=True fills response.explain with the deciding rule and the number of rules tried.
+    """
+    timer = timer or StageTimer()
+    started = time.perf_counter()
+    explanation = None
+    if explain:
+        policy_decision, rule, tried = explain_policy(action, policy)
+        ref = None
+        if rule is not None:
+            ref = PolicyRuleRef(policy_id=rule.policy_id, position=rule.position, effect=rule.effect, match=rule.match_spec())
+        explanation = PolicyExplanation(rule=ref, rules_tried=tried, rule_count=len(policy))
+    else:
+        policy_decision = evaluate(action, policy)
+    response, approval_doc = await _decide(action, policy_decision, timer, timer.record("policy", started))
+    response.explain = explanation
+    return response, approval_doc
+
+
+async def _decide(
+    action: Action,
+    policy_decision: str,
+    timer: StageTimer,
+    started: float,
+) -> tuple[EvaluateResponse, dict[str, Any] | None]:
     if policy_decision == "allowed":
         return EvaluateResponse(
             action_id=action.action_id,
             policy_decision=policy_decision,
             decision="allowed",
             reason="policy allow",
-        )
+        ), None
     if policy_decision == "denied":
         return EvaluateResponse(
             action_id=action.action_id,
             policy_decision=policy_decision,
             decision="blocked",
             reason="policy deny",
-        )
+        ), None
 
-    score, llm_decision, reason = await score_action(action)
+    rewritten = None
+    if settings.llm_pipeline_mode == "combined":
+        (score, llm_decision, reason), rewritten = await score_and_rewrite(action)
+    else:
+        score, llm_decision, reason = await score_action(action)
+    started = timer.record("score", started)
 
     if llm_decision == "allow":
         return EvaluateResponse(
@@ -39,7 +140,7 @@ async def run_pipeline(db, action: Action) -> EvaluateResponse:
             decision="allowed",
             reason=reason,
             score=score,
-        )
+        ), None
     if llm_decision == "block":
         return EvaluateResponse(
             action_id=action.action_id,
@@ -47,7 +148,7 @@ async def run_pipeline(db, action: Action) -> EvaluateResponse:
             decision="blocked",
             reason=reason,
             score=score,
-        )
+        ), None
     if llm_decision == "needs_approval":
         now = datetime.now(timezone.utc)
         doc = {
@@ -60,17 +161,20 @@ async def run_pipeline(db, action: Action) -> EvaluateResponse:
             "reason": reason,
             "status": "pending",
             "created_at": now,
+            # Dedupe key: the same agent repeating the same action attaches to one request.
+            "fingerprint": action_fingerprint(action, include_agent=True),
+            "last_seen_at": now,
         }
-        result = await db[APPROVALS_COLLECTION].insert_one(doc)
         return EvaluateResponse(
             action_id=action.action_id,
             policy_decision=policy_decision,
             decision="needs_approval",
             reason=reason,
             score=score,
-            approval_id=str(result.inserted_id),
-        )
-    rewritten = await rewrite_action(action)
+        ), doc
+    if rewritten is None:
+        rewritten = await rewrite_action(action)
+        timer.record("rewrite", started)
     return EvaluateResponse(
         action_id=action.action_id,
         policy_decision=policy_decision,
@@ -78,4 +182,98 @@ async def run_pipeline(db, action: Action) -> EvaluateResponse:
         reason=reason,
         score=score,
         rewritten_payload=rewritten,
-    )
+    ), None
+
+
+def _deadline_seconds(requested: float | None) -> float | None:
+    """The requested deadline, never longer than settings.pipeline_deadline_ms (0: no default)."""
+    default = settings.pipeline_deadline_ms / 1000 if settings.pipeline_deadline_ms > 0 else None
+    if requested is None or requested <= 0:
+        return default
+    return requested if default is None else min(requested, default)
+
+
+async def run_pipeline(
+    db,
+    action: Action,
+    policy: CompiledPolicy | None = None,
+    source: str = "api",
+    deadline_seconds: float | None = None,
+    explain: bool = False,
+) -> EvaluateResponse:
+    """
+    Full pipeline: policy engine -> if unknown then LLM scorer -> return decision.
+    For needs_approval we persist to approval_requests (deduplicated by action fingerprint)
+    and return approval_id; a recent resolution of the same action is reused instead.
+    policy defaults to the current in-memory snapshot. Every decision is queued for the audit
+    log (app/audit.py), labelled with `source` (api, ui, ndjson, stream). LLM calls are bounded
+    by `deadline_seconds` (default settings.pipeline_deadline_ms); see app/llm/limiter.py.
+    explain=True adds the deciding policy rule to the response (see decide).
+    """
+    timer = StageTimer()
+    if policy is None:
+        policy = (await get_snapshot(db)).policy
+        timer.record("snapshot", timer.started)
+    with deadline(_deadline_seconds(deadline_seconds)):
+        response, approval_doc = await decide(action, policy, timer, explain)
+    if approval_doc is not None:
+        started = time.perf_counter()
+        await save_approval(db, response, approval_doc)
+        timer.record("approval_insert", started)
+    _decisions.inc(_path(response))
+    await record_decision(action, response, source)
+    timer.finish("single", f"action_id={action.action_id} decision={response.decision}")
+    return response
+
+
+async def run_pipeline_batch(
+    db,
+    actions: list[Action],
+    deadline_seconds: float | None = None,
+) -> list[BatchEvaluateItem]:
+    """
+    Evaluate many actions against one policy snapshot. Stages run concurrently (at most
+    settings.batch_max_concurrency at a time), approvals are written with one bulk upsert,
+    and results come back in input order with per-item errors. One deadline, as in
+    run_pipeline, covers the LLM calls of the whole batch.
+    """
+    timer = StageTimer()
+    policy = (await get_snapshot(db)).policy
+    timer.record("snapshot", timer.started)
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+
+    async def _bounded(action: Action):
+        async with semaphore:
+            # Shared timer: the slow log shows stage time summed over the batch.
+            return await decide(action, policy, timer)
+
+    with deadline(_deadline_seconds(deadline_seconds)):
+        outcomes = await asyncio.gather(*(_bounded(a) for a in actions), return_exceptions=True)
+
+    items: list[BatchEvaluateItem] = []
+    pending: list[tuple[EvaluateResponse, dict[str, Any], BatchEvaluateItem]] = []
+    for i, (action, outcome) in enumerate(zip(actions, outcomes)):
+        if isinstance(outcome, BaseException):
+            items.append(BatchEvaluateItem(index=i, action_id=action.action_id, error=f"{type(outcome).__name__}: {outcome!s}"[:500]))
+            continue
+        response, approval_doc = outcome
+        item = BatchEvaluateItem(index=i, action_id=action.action_id, result=response)
+        items.append(item)
+        if approval_doc is not None:
+            pending.append((response, approval_doc, item))
+
+    if pending:
+        started = time.perf_counter()
+        try:
+            await save_approvals(db, [(response, doc) for response, doc, _ in pending])
+        except Exception as e:
+            for _, _, item in pending:
+                item.result = None
+                item.error = f"approval insert failed: {e!s}"[:500]
+        timer.record("approval_insert", started)
+    for action, item in zip(actions, items):
+        if item.result is not None:
+            _decisions.inc(_path(item.result))
+            await record_decision(action, item.result, "batch")
+    timer.finish("batch", f"actions={len(actions)} approvals={len(pending)}")
+    return items
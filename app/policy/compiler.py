@@ -0,0 +1,223 @@
+"""Compiles JSON/DSL rules into matcher objects once. Validation happens here, not at evaluate time."""
+import fnmatch
+import re
+from collections.abc import Callable, Iterable, Sequence
+from functools import lru_cache
+from typing import Any
+
+from app.models import Action
+from app.policy.index import RuleIndex
+
+EFFECTS = ("allow", "deny")
+MATCH_KEYS = frozenset({"action_type", "resource_pattern", "payload_conditions"})
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+class PolicyCompileError(ValueError):
+    """Raised in strict mode when rules are invalid. `errors` holds one message per problem."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _never(_: str) -> bool:
+    return False
+
+
+class PatternMatcher:
+    """A compiled action_type / resource_pattern. kind: literal | glob | regex | invalid."""
+    __slots__ = ("source", "kind", "test", "regex")
+
+    def __init__(self, source: str, kind: str, test: Callable[[str], Any], regex: re.Pattern | None = None):
+        self.source = source
+        self.kind = kind
+        self.test = test  # truthy result means match
+        self.regex = regex  # compiled form for glob/regex kinds
+
+    def matches(self, value: str) -> bool:
+        return bool(self.test(value))
+
+
+@lru_cache(maxsize=4096)
+def compile_pattern(pattern: str) -> PatternMatcher:
+    """Compile a glob (`/tmp/*`), regex (`re:...`) or literal pattern. Invalid regexes never match."""
+    if pattern.startswith("re:"):
+        try:
+            regex = re.compile(pattern[3:])
+        except re.error:
+            return PatternMatcher(pattern, "invalid", _never)
+        return PatternMatcher(pattern, "regex", regex.search, regex)
+    if _GLOB_CHARS.isdisjoint(pattern):
+        return PatternMatcher(pattern, "literal", pattern.__eq__)
+    # Same translation fnmatch.fnmatchcase uses; normcase is a no-op on POSIX.
+    regex = re.compile(fnmatch.translate(pattern))
+    return PatternMatcher(pattern, "glob", regex.match, regex)
+
+
+class CompiledRule:
+    """
+    One rule ready for matching. `index` is its position in the original rule list;
+    `policy_id` / `position` locate it in its policy document when compiled from the store.
+    """
+    __slots__ = ("index", "effect", "decision", "action_type", "resource", "payload_conditions", "policy_id", "position")
+
+    def __init__(
+        self,
+        index: int,
+        effect: str,
+        action_type: PatternMatcher | None,
+        resource: PatternMatcher | None,
+        payload_conditions: tuple[tuple[str, Any], ...] | None,
+        policy_id: str | None = None,
+        position: int | None = None,
+    ):
+        self.index = index
+        self.effect = effect
+        self.decision = "allowed" if effect == "allow" else "denied"
+        self.action_type = action_type
+        self.resource = resource
+        self.payload_conditions = payload_conditions
+        self.policy_id = policy_id
+        self.position = index if position is None else position
+
+    def match_spec(self) -> dict[str, Any]:
+        """The rule's "match" object, rebuilt from the compiled form."""
+        spec: dict[str, Any] = {}
+        if self.action_type is not None:
+            spec["action_type"] = self.action_type.source
+        if self.resource is not None:
+            spec["resource_pattern"] = self.resource.source
+        if self.payload_conditions is not None:
+            spec["payload_conditions"] = dict(self.payload_conditions)
+        return spec
+
+    def matches(self, action: Action) -> bool:
+        if self.action_type is not None and not self.action_type.test(action.type):
+            return False
+        if self.resource is not None and not self.resource.test(action.resource or ""):
+            return False
+        if self.payload_conditions:
+            payload = action.payload
+            for key, expected in self.payload_conditions:
+                if payload.get(key) != expected:
+                    return False
+        return True
+
+
+class CompiledPolicy:
+    """Ordered, compiled rule set with a candidate index. First matching rule wins."""
+    __slots__ = ("rules", "source_count", "index", "matchers", "profile")
+
+    def __init__(self, rules: list[CompiledRule], source_count: int):
+        self.rules = tuple(rules)
+        self.source_count = source_count  # rules before dropping never-matching ones
+        self.index = RuleIndex(self.rules)
+        self.matchers: dict[str, Any] = {}  # per-backend matchers, built lazily by the engine
+        self.profile: Any = None  # engine.RuleProfile when profiling is enabled
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def first_match(self, action: Action) -> CompiledRule | None:
+        for rule in self.index.candidates(action.type, action.resource or ""):
+            if rule.matches(action):
+                return rule
+        return None
+
+
+def validate_rule(rule: Any) -> list[str]:
+    """Return problems with a single rule (empty if valid)."""
+    if not isinstance(rule, dict):
+        return ["rule must be an object"]
+    errors: list[str] = []
+    if rule.get("effect") not in EFFECTS:
+        errors.append(f"effect must be one of {', '.join(EFFECTS)}, got {rule.get('effect')!r}")
+    match_spec = rule.get("match") or {}
+    if not isinstance(match_spec, dict):
+        return errors + ["match must be an object"]
+    unknown = sorted(set(match_spec) - MATCH_KEYS)
+    if unknown:
+        errors.append(f"unknown match keys: {', '.join(unknown)}")
+    for key in ("action_type", "resource_pattern"):
+        if key not in match_spec:
+            continue
+        pattern = match_spec[key]
+        if not isinstance(pattern, str):
+            errors.append(f"{key} must be a string")
+        elif compile_pattern(pattern).kind == "invalid":
+            try:
+                re.compile(pattern[3:])
+            except re.error as e:
+                errors.append(f"{key} has invalid regex {pattern[3:]!r}: {e}")
+    if "payload_conditions" in match_spec and not isinstance(match_spec["payload_conditions"], dict):
+        errors.append("payload_conditions must be an object")
+    return errors
+
+
+def validate_definition(definition: Any) -> list[str]:
+    """Return problems with a policy definition, prefixed by rule position."""
+    if not isinstance(definition, dict):
+        return ["definition must be an object"]
+    rules = definition.get("rules", [])
+    if not isinstance(rules, list):
+        return ["rules must be a list"]
+    errors: list[str] = []
+    for i, rule in enumerate(rules):
+        errors.extend(f"rules[{i}]: {e}" for e in validate_rule(rule))
+    return errors
+
+
+def compile_rule(rule: Any, index: int, policy_id: str | None = None, position: int | None = None) -> CompiledRule | None:
+    """Compile one rule. Returns None for rules that can never match (the engine skips them)."""
+    if not isinstance(rule, dict) or rule.get("effect") not in EFFECTS:
+        return None
+    match_spec = rule.get("match") or {}
+    if not isinstance(match_spec, dict):
+        return None
+
+    matchers: list[PatternMatcher | None] = []
+    for key in ("action_type", "resource_pattern"):
+        if key not in match_spec:
+            matchers.append(None)
+            continue
+        pattern = match_spec[key]
+        if not isinstance(pattern, str):
+            return None
+        matcher = compile_pattern(pattern)
+        if matcher.kind == "invalid":
+            return None
+        matchers.append(matcher)
+
+    conditions = None
+    if "payload_conditions" in match_spec:
+        conds = match_spec["payload_conditions"]
+        if not isinstance(conds, dict):
+            return None
+        conditions = tuple(conds.items())
+
+    return CompiledRule(index, rule["effect"], matchers[0], matchers[1], conditions, policy_id, position)
+
+
+def compile_policy(
+    rules: Iterable[Any],
+    strict: bool = False,
+    origins: Sequence[tuple[str, int]] | None = None,
+) -> CompiledPolicy:
+    """
+    Compile rules in order. strict=True raises PolicyCompileError listing every invalid rule;
+    otherwise invalid rules are dropped, matching how evaluate has always skipped them.
+    origins: optional (policy_id, position in that policy) per rule, kept on the compiled rules.
+    """
+    rules = list(rules)
+    if strict:
+        errors = [f"rules[{i}]: {e}" for i, rule in enumerate(rules) for e in validate_rule(rule)]
+        if errors:
+            raise PolicyCompileError(errors)
+    compiled: list[CompiledRule] = []
+    for i, rule in enumerate(rules):
+        policy_id, position = origins[i] if origins is not None else (None, None)
+        if (c := compile_rule(rule, i, policy_id, position)) is not None:
+            compiled.append(c)
+    return CompiledPolicy(compiled, len(rules))
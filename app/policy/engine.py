@@ -1,52 +1,326 @@
 """Evaluates an action against JSON/DSL rules. Returns allowed/denied/unknown. No LLM, no I/O."""
-import fnmatch
+import marshal
 import re
+import time
+from datetime import datetime, timezone
 from typing import Any
 
+from app.config import settings
 from app.models import Action
+from app.policy.compiler import CompiledPolicy, CompiledRule, PatternMatcher, compile_pattern, compile_policy
 
 PolicyDecision = str  # "allowed" | "denied" | "unknown"
 
 # Rule shape: {"effect": "allow"|"deny", "match": {"action_type": "...", "resource_pattern": "...", ...}}
 # resource_pattern: glob (e.g. /etc/*) or regex (prefix with re:)
 
+# Matching backends (settings.policy_match_backend):
+#   linear   - try every rule in order
+#   indexed  - try only candidates from the action_type / resource prefix index (default)
+#   combined - per action type, merge consecutive resource patterns into one alternation regex
+BACKENDS = ("linear", "indexed", "combined")
+
 
 def _matches_pattern(pattern: str, value: str) -> bool:
-    if pattern.startswith("re:"):
-        try:
-            return bool(re.search(pattern[3:], value))
-        except re.error:
+    return compile_pattern(pattern).matches(value)
+
+
+class LinearMatcher:
+    __slots__ = ("rules",)
+
+    def __init__(self, policy: CompiledPolicy):
+        self.rules = policy.rules
+
+    def first_match(self, action: Action) -> CompiledRule | None:
+        for rule in self.rules:
+            if rule.matches(action):
+                return rule
+        return None
+
+
+# Numeric backreferences and conditionals depend on group numbers, which change when merged.
+_NUMBERED_GROUP_REF = re.compile(r"\\[1-9]|\\g<\d|\(\?\(\d")
+_MAX_ALTERNATIVES = 512
+_MAX_PLANS = 1024
+_MAX_RAW_POLICIES = 64
+
+# Raw rule lists passed to evaluate/explain, compiled once per distinct content. The key is the
+# marshal encoding, which tells 1 from 1.0 and True, and lists from tuples, as payload_conditions do.
+# Version 2 writes no back-references, so the key depends on content only, not on reference counts.
+_raw_policies: dict[bytes, CompiledPolicy] = {}
+
+
+def _compile_raw(rules: list[dict[str, Any]]) -> CompiledPolicy:
+    try:
+        key = marshal.dumps(rules, 2)
+    except ValueError:  # values marshal cannot encode: compile without caching
+        return compile_policy(rules)
+    policy = _raw_policies.get(key)
+    if policy is None:
+        if len(_raw_policies) >= _MAX_RAW_POLICIES:
+            _raw_policies.clear()
+        policy = _raw_policies[key] = compile_policy(rules)
+    return policy
+
+
+def _alternative(matcher: PatternMatcher | None) -> str | None:
+    """
+    Regex that re.match()es exactly the resources `matcher` accepts, or None if not mergeable.
+    Patterns with named groups (including fnmatch.translate output before Python 3.11) are not
+    merged: the names could clash across alternatives.
+    """
+    if matcher is None:
+        return ""
+    if matcher.kind == "literal":
+        return re.escape(matcher.source) + r"\Z"
+    if matcher.kind not in ("glob", "regex") or matcher.regex.groupindex:
+        return None
+    if matcher.kind == "glob":
+        source = matcher.regex.pattern
+    else:
+        compiled = matcher.regex
+        if compiled.flags & ~re.UNICODE or _NUMBERED_GROUP_REF.search(compiled.pattern):
+            return None  # global inline flags cannot be scoped into an alternation
+        if compiled.pattern.startswith(("^", r"\A")) and "|" not in compiled.pattern:
+            source = compiled.pattern  # anchored: re.search == re.match
+        else:
+            # re.search semantics: allow the match to start anywhere.
+            source = r"[\s\S]*?(?:" + compiled.pattern + ")"
+    return source
+
+
+class _Combined:
+    """One alternation regex over consecutive mergeable rules; the lowest matching alternative wins."""
+    __slots__ = ("regex", "by_group")
+
+    def __init__(self, regex: re.Pattern, by_group: dict[int, CompiledRule]):
+        self.regex = regex
+        self.by_group = by_group
+
+
+def _combine(rules: list[CompiledRule], alternatives: list[str]) -> list[Any]:
+    """Merge a run of rules; falls back to individual rules if the alternation does not compile."""
+    if len(rules) < 2:
+        return list(rules)
+    try:
+        regex = re.compile("|".join(f"(?P<r{i}>{alt})" for i, alt in enumerate(alternatives)))
+    except re.error:
+        return list(rules)
+    by_group = {regex.groupindex[f"r{i}"]: rule for i, rule in enumerate(rules)}
+    return [_Combined(regex, by_group)]
+
+
+class CombinedMatcher:
+    """
+    Multi-pattern backend. For each action type (planned lazily, then cached) the applicable
+    rules are split into runs of resource-only rules, each merged into a single regex so one
+    scan of action.resource yields the lowest-index match. Rules with payload conditions or
+    unmergeable patterns stay on the per-rule path, in order.
+    """
+    __slots__ = ("rules", "_plans")
+
+    def __init__(self, policy: CompiledPolicy):
+        self.rules = policy.rules
+        self._plans: dict[str, list[Any]] = {}
+
+    def _plan(self, action_type: str) -> list[Any]:
+        plan: list[Any] = []
+        run: list[CompiledRule] = []
+        alternatives: list[str] = []
+        for rule in self.rules:
+            if rule.action_type is not None and not rule.action_type.test(action_type):
+                continue
+            alt = None if rule.payload_conditions is not None else _alternative(rule.resource)
+            if alt is None or len(run) >= _MAX_ALTERNATIVES:
+                plan.extend(_combine(run, alternatives))
+                run, alternatives = [], []
+                if alt is None:
+                    plan.append(rule)
+                    continue
+            run.append(rule)
+            alternatives.append(alt)
+        plan.extend(_combine(run, alternatives))
+        if len(self._plans) >= _MAX_PLANS:
+            self._plans.clear()
+        self._plans[action_type] = plan
+        return plan
+
+    def first_match(self, action: Action) -> CompiledRule | None:
+        plan = self._plans.get(action.type)
+        if plan is None:
+            plan = self._plan(action.type)
+        resource = action.resource or ""
+        for step in plan:
+            if isinstance(step, _Combined):
+                m = step.regex.match(resource)
+                if m is not None:
+                    return step.by_group[m.lastindex]
+            elif step.matches(action):
+                return step
+        return None
+
+
+_MATCHER_FACTORIES = {
+    "linear": LinearMatcher,
+    "indexed": lambda policy: policy,  # CompiledPolicy.first_match uses its RuleIndex
+    "combined": CombinedMatcher,
+}
+
+
+def _matcher(policy: CompiledPolicy, backend: str):
+    matcher = policy.matchers.get(backend)
+    if matcher is None:
+        if backend not in _MATCHER_FACTORIES:
+            raise ValueError(f"unknown policy match backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+        matcher = policy.matchers[backend] = _MATCHER_FACTORIES[backend](policy)
+    return matcher
+
+
+class RuleProfile:
+    """
+    Per-rule counters for one CompiledPolicy, indexed by CompiledRule.index. Every evaluation
+    counts the rule that decided it (one list increment). One evaluation in every
+    1/sample_rate instead walks the rules one at a time, counting and timing each match
+    attempt: by the linear backend's order, or the index candidates for the other backends
+    (a combined regex scan cannot be attributed to single rules).
+    """
+    __slots__ = ("sample_rate", "evaluations", "sampled", "unmatched", "matches", "tries", "match_ns", "since", "_period", "_countdown")
+
+    def __init__(self, size: int, sample_rate: float):
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.evaluations = 0
+        self.sampled = 0
+        self.unmatched = 0
+        self.matches = [0] * size  # evaluations decided by the rule
+        self.tries = [0] * size  # sampled evaluations that tried the rule
+        self.match_ns = [0] * size  # time spent in those tries
+        self.since = datetime.now(timezone.utc)
+        self._period = round(1 / self.sample_rate) if self.sample_rate > 0 else 0
+        self._countdown = self._period
+
+    def sample(self) -> bool:
+        """Whether this evaluation should be walked and timed."""
+        if not self._period:
             return False
-    return fnmatch.fnmatch(value, pattern)
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        self._countdown = self._period
+        self.sampled += 1
+        return True
+
+    def hit(self, rule: CompiledRule | None) -> None:
+        self.evaluations += 1
+        if rule is None:
+            self.unmatched += 1
+        else:
+            self.matches[rule.index] += 1
 
 
-def evaluate(action: Action, rules: list[dict[str, Any]]) -> PolicyDecision:
+def enable_profiling(policy: CompiledPolicy, sample_rate: float) -> RuleProfile:
+    """Start counting evaluations of `policy`; see RuleProfile."""
+    policy.profile = RuleProfile(policy.source_count, sample_rate)
+    return policy.profile
+
+
+def _walk(action: Action, policy: CompiledPolicy, backend: str, profile: RuleProfile | None = None) -> tuple[CompiledRule | None, int]:
+    """First matching rule, tried one by one, and how many rules were tried. Times each try into `profile`."""
+    rules = policy.rules if backend == "linear" else policy.index.candidates(action.type, action.resource or "")
+    tried = 0
+    if profile is None:
+        for rule in rules:
+            tried += 1
+            if rule.matches(action):
+                return rule, tried
+        return None, tried
+    clock = time.perf_counter_ns
+    tries, match_ns = profile.tries, profile.match_ns
+    for rule in rules:
+        tried += 1
+        started = clock()
+        matched = rule.matches(action)
+        match_ns[rule.index] += clock() - started
+        tries[rule.index] += 1
+        if matched:
+            return rule, tried
+    return None, tried
+
+
+def evaluate(
+    action: Action,
+    rules: CompiledPolicy | list[dict[str, Any]],
+    backend: str | None = None,
+) -> PolicyDecision:
     """
     First matching rule wins. Default deny (unknown) if no rule matches.
-    rules: list of {"effect": "allow"|"deny", "match": {"action_type": "...", "resource_pattern": "..."}}
+    rules: a CompiledPolicy (preferred; see compiler.compile_policy) or a raw list of
+    {"effect": "allow"|"deny", "match": {"action_type": "...", "resource_pattern": "..."}},
+    which is compiled on first use and cached by content.
+    backend: one of BACKENDS; defaults to settings.policy_match_backend.
     """
-    for rule in rules:
-        effect = rule.get("effect")
-        match_spec = rule.get("match") or {}
-        if effect not in ("allow", "deny"):
-            continue
-        # match action_type
-        if "action_type" in match_spec:
-            if not _matches_pattern(match_spec["action_type"], action.type):
-                continue
-        # match resource
-        if "resource_pattern" in match_spec:
-            if not _matches_pattern(match_spec["resource_pattern"], action.resource or ""):
-                continue
-        # optional payload_conditions: simple key presence or value match
-        if "payload_conditions" in match_spec:
-            conds = match_spec["payload_conditions"]
-            if isinstance(conds, dict):
-                for key, expected in conds.items():
-                    if action.payload.get(key) != expected:
-                        break
-                else:
-                    return "allowed" if effect == "allow" else "denied"
-            continue
-        return "allowed" if effect == "allow" else "denied"
-    return "unknown"
+    policy = rules if isinstance(rules, CompiledPolicy) else _compile_raw(rules)
+    backend = backend or settings.policy_match_backend
+    matcher = _matcher(policy, backend)
+    profile = policy.profile
+    if profile is None:
+        rule = matcher.first_match(action)
+    else:
+        rule = _walk(action, policy, backend, profile)[0] if profile.sample() else matcher.first_match(action)
+        profile.hit(rule)
+    return rule.decision if rule is not None else "unknown"
+
+
+def explain(
+    action: Action,
+    rules: CompiledPolicy | list[dict[str, Any]],
+    backend: str | None = None,
+) -> tuple[PolicyDecision, CompiledRule | None, int]:
+    """
+    evaluate() plus the rule that decided (None: no rule matched) and how many rules were
+    tried for it: every rule up to the match for the linear backend, the index candidates
+    up to the match otherwise. Slower than evaluate; the decision is the same for every backend.
+    """
+    policy = rules if isinstance(rules, CompiledPolicy) else _compile_raw(rules)
+    backend = backend or settings.policy_match_backend
+    _matcher(policy, backend)  # rejects unknown backends
+    profile = policy.profile
+    if profile is None:
+        rule, tried = _walk(action, policy, backend)
+    else:
+        rule, tried = _walk(action, policy, backend, profile if profile.sample() else None)
+        profile.hit(rule)
+    return (rule.decision if rule is not None else "unknown"), rule, tried
+
+
+def profile_by_policy(policy: CompiledPolicy) -> dict[str | None, dict[str, Any]]:
+    """
+    Profile counters of `policy` grouped by policy document id (None for rules compiled without
+    one), each with totals and per-rule entries in document order. Empty without profiling.
+    """
+    profile: RuleProfile | None = policy.profile
+    if profile is None:
+        return {}
+    # Sampled tries scaled up to all evaluations.
+    scale = profile.evaluations / profile.sampled if profile.sampled else 0.0
+    grouped: dict[str | None, dict[str, Any]] = {}
+    for rule in policy.rules:
+        i = rule.index
+        tries, match_ns = profile.tries[i], profile.match_ns[i]
+        group = grouped.get(rule.policy_id)
+        if group is None:
+            group = grouped[rule.policy_id] = {"matches": 0, "sampled_tries": 0, "sampled_match_ns": 0, "rules": []}
+        group["matches"] += profile.matches[i]
+        group["sampled_tries"] += tries
+        group["sampled_match_ns"] += match_ns
+        group["rules"].append({
+            "policy_id": rule.policy_id,
+            "position": rule.position,
+            "effect": rule.effect,
+            "match": rule.match_spec(),
+            "matches": profile.matches[i],
+            "sampled_tries": tries,
+            "sampled_match_ns": match_ns,
+            "estimated_tries": round(tries * scale),
+            "mean_match_ns": round(match_ns / tries) if tries else None,
+        })
+    return grouped
@@ -0,0 +1,112 @@
+"""Random rule sets and actions, and the original rule-walking evaluate as an oracle, for checking the policy match backends.
+Used by tests/test_policy_backends.py and scripts/check_policy_backends.py."""
+import fnmatch
+import random
+import re
+
+from app.models import Action
+from app.policy.compiler import compile_policy
+from app.policy.engine import BACKENDS, evaluate
+
+ACTION_TYPES = ["read_file", "write_file", "http_request", "send_email", "exec"]
+SEGMENTS = ["etc", "tmp", "home", "var", "log", "id_rsa", "x.key", ".env", "a", "b", "P<x>", "(P<x>"]
+# Named groups, and escaped text that only looks like one.
+NAMED_GROUP_PATTERNS = [
+    r"re:\(?P<x>", r"re:^/\(?P<x>", r"re:(?P<x>/etc)", r"re:^(?P<d>/\w+)/(?P=d)?", r"re:(?P<x>P)<x>$", r"re:[(]?P<x>",
+]
+
+
+def reference_evaluate(action: Action, rules: list[dict]) -> str:
+    """The pre-compiler engine, kept verbatim as the oracle."""
+
+    def matches_pattern(pattern: str, value: str) -> bool:
+        if pattern.startswith("re:"):
+            try:
+                return bool(re.search(pattern[3:], value))
+            except re.error:
+                return False
+        return fnmatch.fnmatch(value, pattern)
+
+    for rule in rules:
+        effect = rule.get("effect")
+        match_spec = rule.get("match") or {}
+        if effect not in ("allow", "deny"):
+            continue
+        if "action_type" in match_spec:
+            if not matches_pattern(match_spec["action_type"], action.type):
+                continue
+        if "resource_pattern" in match_spec:
+            if not matches_pattern(match_spec["resource_pattern"], action.resource or ""):
+                continue
+        if "payload_conditions" in match_spec:
+            conds = match_spec["payload_conditions"]
+            if isinstance(conds, dict):
+                for key, expected in conds.items():
+                    if action.payload.get(key) != expected:
+                        break
+                else:
+                    return "allowed" if effect == "allow" else "denied"
+            continue
+        return "allowed" if effect == "allow" else "denied"
+    return "unknown"
+
+
+def _path(rng: random.Random) -> str:
+    return "/" + "/".join(rng.choice(SEGMENTS) for _ in range(rng.randint(0, 4)))
+
+
+def _resource_pattern(rng: random.Random) -> str:
+    path = _path(rng)
+    kind = rng.random()
+    if kind < 0.25:
+        return path
+    if kind < 0.55:
+        return path + rng.choice(["*", "/*", "?", "[ab]*", "/*/*", "*.key"])
+    if kind < 0.85:
+        body = re.escape(path) + rng.choice(["$", ".*", "", "(/.*)?$", "(?P<tail>/.*)?$", r"(a|b)\1", "("])
+        return "re:" + rng.choice(["^", "", r"\A", "(?i)"]) + body
+    if kind < 0.93:
+        return rng.choice(NAMED_GROUP_PATTERNS)
+    return rng.choice(["*", "/etc*", "/tmp/*", "re:key$", "re:.env", ""])
+
+
+def random_rule(rng: random.Random) -> dict:
+    match: dict = {}
+    if rng.random() < 0.7:
+        match["action_type"] = rng.choice(ACTION_TYPES + ["*", "read_*", "re:^send", "re:file$"])
+    if rng.random() < 0.8:
+        match["resource_pattern"] = _resource_pattern(rng)
+    if rng.random() < 0.15:
+        match["payload_conditions"] = rng.choice([{"a": 1}, {}, {"b": "x"}, "bad"])
+    return {"effect": rng.choice(["allow", "deny", "deny", "bogus"]), "match": match}
+
+
+def random_action(rng: random.Random) -> Action:
+    return Action(
+        action_id="check",
+        agent_id="check",
+        type=rng.choice(ACTION_TYPES + ["other"]),
+        resource=_path(rng) + rng.choice(["", "/x.key", "\n", ""]),
+        payload=rng.choice([{}, {"a": 1}, {"b": "x"}]),
+    )
+
+
+def first_mismatch(rng: random.Random, policies: int, max_rules: int, actions: int) -> tuple[int, dict | None]:
+    """
+    Evaluate `actions` random actions against each of `policies` random rule sets with every
+    backend. Returns (actions checked, None) or, at the first disagreement with the oracle,
+    (actions checked, details).
+    """
+    checked = 0
+    for _ in range(policies):
+        rules = [random_rule(rng) for _ in range(rng.randint(0, max_rules))]
+        policy = compile_policy(rules)
+        for _ in range(actions):
+            action = random_action(rng)
+            expected = reference_evaluate(action, rules)
+            for backend in BACKENDS:
+                got = evaluate(action, policy, backend=backend)
+                if got != expected:
+                    return checked, {"backend": backend, "expected": expected, "got": got, "action": action.model_dump(), "rules": rules}
+            checked += 1
+    return checked, None
@@ -0,0 +1,130 @@
+"""Candidate lookup for compiled rules: buckets by exact action_type plus a path-prefix trie on resources.
+
+The index only narrows the search; every candidate is still checked with rule.matches and
+candidates come back in original rule order, so "first matching rule wins" is unchanged.
+"""
+import heapq
+from collections.abc import Iterable
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.policy.compiler import CompiledRule, PatternMatcher
+
+_by_index = attrgetter("index")
+
+# Characters that end the literal prefix of a `re:` pattern anchored with ^.
+_REGEX_META = frozenset(".^$*+?{}[]|()")
+_REGEX_QUANTIFIERS = frozenset("*+?{")
+
+
+def _regex_literal_prefix(regex: str) -> str:
+    """Literal text every match of an anchored regex must start with ("" if unknown)."""
+    if regex.startswith("^"):
+        i = 1
+    elif regex.startswith("\\A"):
+        i = 2
+    else:
+        return ""
+    if "|" in regex:
+        return ""
+    out: list[str] = []
+    while i < len(regex):
+        ch = regex[i]
+        if ch == "\\":
+            nxt = regex[i + 1:i + 2]
+            if not nxt or nxt.isalnum():
+                break  # class escape (\d, \w, ...) or backreference
+            out.append(nxt)
+            i += 2
+        elif ch in _REGEX_META:
+            break
+        else:
+            out.append(ch)
+            i += 1
+        if i < len(regex) and regex[i] in _REGEX_QUANTIFIERS:
+            # The quantifier may make the previous character optional.
+            out.pop()
+            break
+    return "".join(out)
+
+
+def literal_prefix(matcher: "PatternMatcher | None") -> str:
+    """Literal text every resource matched by `matcher` starts with ("" if none)."""
+    if matcher is None:
+        return ""
+    if matcher.kind == "literal":
+        return matcher.source
+    if matcher.kind == "glob":
+        for i, ch in enumerate(matcher.source):
+            if ch in "*?[":
+                return matcher.source[:i]
+        return matcher.source
+    if matcher.kind == "regex":
+        return _regex_literal_prefix(matcher.source[3:])
+    return ""
+
+
+class _TrieNode:
+    __slots__ = ("children", "rules")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.rules: list[Any] = []
+
+
+class PrefixTrie:
+    """Rules keyed by the complete '/'-separated segments of their literal resource prefix."""
+    __slots__ = ("root",)
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, rule: "CompiledRule", prefix: str) -> None:
+        node = self.root
+        # The last segment is partial (it may be followed by anything), so it is not a key.
+        for segment in prefix.split("/")[:-1]:
+            node = node.children.setdefault(segment, _TrieNode())
+        node.rules.append(rule)
+
+    def lookup(self, resource: str, out: list[list[Any]]) -> None:
+        """Append the rule list of every node on the resource's path to `out`."""
+        node = self.root
+        if node.rules:
+            out.append(node.rules)
+        for segment in resource.split("/")[:-1]:
+            node = node.children.get(segment)
+            if node is None:
+                return
+            if node.rules:
+                out.append(node.rules)
+
+
+class RuleIndex:
+    """Hash buckets for exact action types, one wildcard bucket, each with a resource prefix trie."""
+    __slots__ = ("_by_type", "_any_type")
+
+    def __init__(self, rules: "tuple[CompiledRule, ...]"):
+        self._by_type: dict[str, PrefixTrie] = {}
+        self._any_type = PrefixTrie()
+        for rule in rules:
+            if rule.action_type is not None and rule.action_type.kind == "literal":
+                trie = self._by_type.get(rule.action_type.source)
+                if trie is None:
+                    trie = self._by_type[rule.action_type.source] = PrefixTrie()
+            else:
+                trie = self._any_type
+            trie.add(rule, literal_prefix(rule.resource))
+
+    def candidates(self, action_type: str, resource: str) -> "Iterable[CompiledRule]":
+        """Rules that may match, in original order. Each trie list is already in rule order, so several are merged lazily."""
+        lists: list[list[Any]] = []
+        trie = self._by_type.get(action_type)
+        if trie is not None:
+            trie.lookup(resource, lists)
+        self._any_type.lookup(resource, lists)
+        if not lists:
+            return []
+        if len(lists) == 1:
+            return lists[0]
+        return heapq.merge(*lists, key=_by_index)
@@ -1,26 +1,177 @@
-"""Loads policy definitions from MongoDB and feeds them to the engine."""
-from app.db import POLICIES_COLLECTION
-from app.models import Action
-from app.policy.engine import evaluate
+"""Loads policy definitions from MongoDB and feeds them to the engine.
 
+Rules live in a process-wide snapshot so the evaluate path does no I/O. The snapshot is
+refreshed after local writes, from a change stream on the policy collections, and by polling
+a version counter when change streams are unavailable (e.g. standalone mongod).
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
-def _rules_from_docs(docs: list[dict]) -> list[dict]:
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.config import settings
+from app.db import POLICIES_COLLECTION, POLICY_META_COLLECTION, run_with_change_stream
+from app.policy.compiler import CompiledPolicy, compile_policy
+from app.policy.engine import enable_profiling
+
+logger = logging.getLogger(__name__)
+
+# Single counter document bumped on every policy write; workers compare it to their snapshot.
+_VERSION_DOC_ID = "policies"
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """Immutable view of all compiled policy rules at a given version counter."""
+    policy: CompiledPolicy
+    version: int
+    refreshed_at: datetime
+
+
+_snapshot: PolicySnapshot | None = None
+_refresh_lock = asyncio.Lock()
+_sync_task: asyncio.Task | None = None
+_sync_mode = "stopped"  # stopped | change_stream | polling
+
+
+def _rules_from_docs(docs: list[dict]) -> tuple[list[dict], list[tuple[str, int]]]:
+    """All rules in order, and (policy id, position in that policy) for each."""
     rules: list[dict] = []
+    origins: list[tuple[str, int]] = []
     for doc in docs:
         defn = doc.get("definition") or {}
         if isinstance(defn, dict) and "rules" in defn:
             rules.extend(defn["rules"])
-    return rules
+            origins.extend((str(doc.get("_id")), i) for i in range(len(defn["rules"])))
+    return rules, origins
 
 
-async def get_rules(db) -> list[dict]:
-    """Load all policy rules from MongoDB."""
+async def _load_docs(db) -> list[dict]:
     cursor = db[POLICIES_COLLECTION].find({})
-    docs = await cursor.to_list(length=None)
-    return _rules_from_docs(docs)
+    return await cursor.to_list(length=None)
+
+
+async def _read_version(db) -> int:
+    doc = await db[POLICY_META_COLLECTION].find_one({"_id": _VERSION_DOC_ID})
+    return int(doc.get("version", 0)) if doc else 0
+
+
+async def bump_policy_version(db) -> int:
+    """Increment the shared policy version counter. Call after every policy write."""
+    doc = await db[POLICY_META_COLLECTION].find_one_and_update(
+        {"_id": _VERSION_DOC_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(doc["version"])
+
+
+async def refresh_snapshot(db) -> PolicySnapshot:
+    """Reload rules from MongoDB and swap in a new snapshot."""
+    global _snapshot
+    async with _refresh_lock:
+        # Read the counter before the documents: a concurrent write then shows up as a newer
+        # version on the next poll instead of being masked.
+        version = await _read_version(db)
+        rules, origins = _rules_from_docs(await _load_docs(db))
+        policy = compile_policy(rules, origins=origins)
+        if len(policy) < policy.source_count:
+            logger.warning("policy snapshot v%d: skipped %d invalid rules", version, policy.source_count - len(policy))
+        if settings.policy_profile_enabled:
+            enable_profiling(policy, settings.policy_profile_sample_rate)
+        _snapshot = PolicySnapshot(policy=policy, version=version, refreshed_at=datetime.now(timezone.utc))
+        return _snapshot
+
+
+async def get_snapshot(db) -> PolicySnapshot:
+    """Return the current snapshot, loading it on first use."""
+    if _snapshot is not None:
+        return _snapshot
+    return await refresh_snapshot(db)
+
+
+def current_snapshot() -> PolicySnapshot | None:
+    """Return the loaded snapshot without I/O (None before the first load)."""
+    return _snapshot
+
+
+def sync_mode() -> str:
+    """How this worker keeps its snapshot fresh: stopped, change_stream or polling."""
+    return _sync_mode
+
+
+async def notify_policies_changed(db) -> PolicySnapshot:
+    """Bump the version counter and refresh the local snapshot after a policy write."""
+    await bump_policy_version(db)
+    return await refresh_snapshot(db)
+
+
+async def _watch_changes(db) -> None:
+    """Follow the change stream until it fails or ends."""
+    global _sync_mode
+    watched = {"ns.coll": {"$in": [POLICIES_COLLECTION, POLICY_META_COLLECTION]}}
+    # Entering opens the cursor (the aggregate runs here), so a deployment without change
+    # streams raises before the mode changes.
+    async with db.watch(pipeline=[{"$match": watched}]) as stream:
+        # Anything written between the initial load and opening the stream is picked up here.
+        await refresh_snapshot(db)
+        _sync_mode = "change_stream"
+        async for _ in stream:
+            await refresh_snapshot(db)
+
+
+async def _poll_version(db) -> None:
+    global _sync_mode
+    _sync_mode = "polling"
+    while True:
+        await asyncio.sleep(settings.policy_poll_interval_seconds)
+        try:
+            version = await _read_version(db)
+            if _snapshot is None or version != _snapshot.version:
+                await refresh_snapshot(db)
+        except PyMongoError as e:
+            logger.warning("policy version poll failed: %s", e)
+
+
+async def _sync_loop(db) -> None:
+    if not settings.policy_change_stream:
+        await _poll_version(db)
+        return
+    await run_with_change_stream(
+        lambda: _watch_changes(db),
+        lambda: _poll_version(db),
+        settings.policy_change_stream_retry_seconds,
+        settings.policy_change_stream_retry_max_seconds,
+        streaming=lambda: _sync_mode == "change_stream",
+        name="policy",
+        fallback="polling version counter",
+    )
+
+
+async def start_policy_sync(db) -> None:
+    """Load the snapshot and start the background sync task. Call once at app startup."""
+    global _sync_task
+    try:
+        await refresh_snapshot(db)
+    except PyMongoError as e:
+        # MongoDB may be down at startup; the sync loop keeps retrying.
+        logger.warning("initial policy load failed: %s", e)
+    _sync_task = asyncio.create_task(_sync_loop(db))
+
 
+async def stop_policy_sync() -> None:
+    """Cancel the background sync task. Call at app shutdown."""
+    global _sync_task, _sync_mode
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+    _sync_mode = "stopped"
 
-async def evaluate_action(db, action: Action) -> str:
-    """Load rules from DB and evaluate action. Returns allowed | denied | unknown."""
-    rules = await get_rules(db)
-    return evaluate(action, rules)
@@ -0,0 +1 @@
+# Redis Streams ingestion
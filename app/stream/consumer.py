@@ -0,0 +1,282 @@
+"""Redis Streams consumer: reads actions with a consumer group and runs them through the shared pipeline.
+
+Each entry on the actions stream carries an `action` field with the Action as JSON. Decisions
+are appended to the results stream and the source entries are acked in bulk per batch. Entries
+left pending by a dead consumer are claimed after `claim_idle_ms`; an entry claimed after
+`max_deliveries` deliveries is moved to the dead-letter stream instead. Reads only ask for as many
+entries as there are free in-flight slots, so a slow LLM stage slows ingestion instead of
+piling up work in memory.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Any
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.models import Action
+from app.pipeline import run_pipeline
+from app.policy.store import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+_RETRY_SECONDS = 1.0  # pause after a failed Redis call in run()
+
+
+def default_consumer_name() -> str:
+    return settings.stream_consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class StreamConsumer:
+    """
+    Consumer-group worker over any client with the redis.asyncio stream API
+    (xgroup_create, xreadgroup, xautoclaim, xpending_range, xadd, xack, pipeline), e.g.
+    tests.fakes.FakeRedis.
+    """
+
+    def __init__(
+        self,
+        redis,
+        db,
+        *,
+        stream: str | None = None,
+        results_stream: str | None = None,
+        group: str | None = None,
+        consumer: str | None = None,
+        batch_size: int | None = None,
+        block_ms: int | None = None,
+        max_in_flight: int | None = None,
+        claim_idle_ms: int | None = None,
+        claim_interval_seconds: float | None = None,
+        dead_letter_stream: str | None = None,
+        max_deliveries: int | None = None,
+    ):
+        self.redis = redis
+        self.db = db
+        self.stream = stream or settings.stream_actions
+        self.results_stream = results_stream or settings.stream_results
+        self.group = group or settings.stream_group
+        self.consumer = consumer or default_consumer_name()
+        self.batch_size = batch_size or settings.stream_batch_size
+        self.block_ms = block_ms or settings.stream_block_ms
+        self.max_in_flight = max_in_flight or settings.stream_max_in_flight
+        self.claim_idle_ms = claim_idle_ms or settings.stream_claim_idle_ms
+        self.claim_interval_seconds = claim_interval_seconds or settings.stream_claim_interval_seconds
+        self.dead_letter_stream = dead_letter_stream or settings.stream_dead_letter
+        self.max_deliveries = settings.stream_max_deliveries if max_deliveries is None else max_deliveries
+        self._batches: set[asyncio.Task] = set()
+        self._in_flight = 0
+        self._last_claim = 0.0
+        self.processed = 0
+        self.failed = 0
+        self.claimed = 0
+        self.throttled = 0
+        self.dead_lettered = 0
+
+    async def ensure_group(self) -> None:
+        """Create the consumer group (and stream) if missing."""
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run(self) -> None:
+        """Read and dispatch batches until cancelled. Redis being down at startup is retried like a failed read."""
+        group_ready = False
+        while True:
+            await self._wait_for_capacity()
+            try:
+                if not group_ready:
+                    await self.ensure_group()
+                    group_ready = True
+                await self._read_once()
+            except Exception as e:
+                logger.warning("stream read failed (%s); retrying", e)
+                if "NOGROUP" in str(e):
+                    group_ready = False  # the stream or group was deleted: create it again
+                await asyncio.sleep(_RETRY_SECONDS)
+
+    async def _read_once(self) -> None:
+        if time.monotonic() - self._last_claim >= self.claim_interval_seconds:
+            self._last_claim = time.monotonic()
+            entries = await self._claim_stale()
+            if entries:
+                self.claimed += len(entries)
+                self._dispatch(entries)
+                return
+        count = min(self.batch_size, self.max_in_flight - self._in_flight)
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=count, block=self.block_ms
+        )
+        for _, entries in response or []:
+            if entries:
+                self._dispatch(entries)
+
+    async def run_once(self) -> int:
+        """Read and fully process at most one batch without blocking. Returns entries handled."""
+        await self.ensure_group()
+        response = await self.redis.xreadgroup(self.group, self.consumer, {self.stream: ">"}, count=self.batch_size)
+        entries = [e for _, batch in response or [] for e in batch]
+        if entries:
+            self._in_flight += len(entries)
+            await self._handle_batch(entries)
+        return len(entries)
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Wait for in-flight batches (e.g. at shutdown). Unfinished entries stay pending for reclaim."""
+        if self._batches:
+            await asyncio.wait(set(self._batches), timeout=timeout)
+
+    async def _wait_for_capacity(self) -> None:
+        # Backpressure: stop reading while the pipeline (mostly the LLM stage) is saturated.
+        while self._in_flight >= self.max_in_flight and self._batches:
+            self.throttled += 1
+            await asyncio.wait(set(self._batches), return_when=asyncio.FIRST_COMPLETED)
+
+    async def _claim_stale(self) -> list[tuple[str, dict]]:
+        claimed: list[tuple[str, dict]] = []
+        start = "0-0"
+        count = min(self.batch_size, self.max_in_flight - self._in_flight)
+        while len(claimed) < count:
+            response = await self.redis.xautoclaim(
+                self.stream, self.group, self.consumer, self.claim_idle_ms, start_id=start, count=count - len(claimed)
+            )
+            start, entries = response[0], response[1]
+            # Entries deleted from the stream come back with no fields; nothing to process.
+            claimed.extend(e for e in entries if e and e[1])
+            if start in ("0-0", b"0-0"):
+                break
+        return await self._dead_letter(claimed)
+
+    async def _dead_letter(self, entries: list[tuple[str, dict]]) -> list[tuple[str, dict]]:
+        """Move entries delivered more than max_deliveries times to the dead-letter stream; return the rest."""
+        if not self.max_deliveries or not entries:
+            return entries
+        pipe = self.redis.pipeline(transaction=False)
+        for entry_id, _ in entries:
+            pipe.xpending_range(self.stream, self.group, min=entry_id, max=entry_id, count=1)
+        pending = await pipe.execute()
+        keep: list[tuple[str, dict]] = []
+        dead: list[tuple[str, dict, int]] = []
+        for entry, info in zip(entries, pending):
+            deliveries = info[0]["times_delivered"] if info else 0
+            if deliveries > self.max_deliveries:
+                dead.append((*entry, deliveries))
+            else:
+                keep.append(entry)
+        if dead:
+            pipe = self.redis.pipeline(transaction=False)
+            for entry_id, fields, deliveries in dead:
+                logger.warning("stream entry %s failed %d deliveries; moved to %s", entry_id, deliveries - 1, self.dead_letter_stream)
+                pipe.xadd(
+                    self.dead_letter_stream,
+                    {**fields, "entry_id": entry_id, "deliveries": deliveries - 1},
+                    maxlen=settings.stream_results_maxlen,
+                    approximate=True,
+                )
+            pipe.xack(self.stream, self.group, *(entry_id for entry_id, _, _ in dead))
+            await pipe.execute()
+            self.dead_lettered += len(dead)
+        return keep
+
+    def _dispatch(self, entries: list[tuple[str, dict]]) -> None:
+        self._in_flight += len(entries)
+        task = asyncio.create_task(self._handle_batch(entries))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _handle_batch(self, entries: list[tuple[str, dict]]) -> None:
+        try:
+            policy = (await get_snapshot(self.db)).policy
+            outcomes = await asyncio.gather(*(self._handle_entry(e, policy) for e in entries))
+            results = [fields for fields in outcomes if fields is not None]
+            done_ids = [entry_id for (entry_id, _), fields in zip(entries, outcomes) if fields is not None]
+            if not done_ids:
+                return
+            pipe = self.redis.pipeline(transaction=False)
+            for fields in results:
+                pipe.xadd(self.results_stream, fields, maxlen=settings.stream_results_maxlen, approximate=True)
+            pipe.xack(self.stream, self.group, *done_ids)
+            await pipe.execute()
+            self.processed += len(done_ids)
+        except Exception:
+            logger.exception("stream batch of %d entries failed; left pending for reclaim", len(entries))
+        finally:
+            self._in_flight -= len(entries)
+
+    async def _handle_entry(self, entry: tuple[str, dict], policy) -> dict[str, Any] | None:
+        """Result fields for the results stream, or None to leave the entry pending (retry later)."""
+        entry_id, fields = entry
+        raw = fields.get("action") or fields.get(b"action")
+        try:
+            action = Action.model_validate_json(raw or "")
+        except ValidationError as e:
+            # Poison message: report and ack so it is not redelivered forever.
+            self.failed += 1
+            return {"entry_id": entry_id, "action_id": "", "error": f"invalid action: {e!s}"[:500]}
+        try:
+            response = await run_pipeline(self.db, action, policy, source="stream")
+        except Exception as e:
+            self.failed += 1
+            logger.warning("pipeline failed for stream entry %s: %s", entry_id, e)
+            return None
+        return {"entry_id": entry_id, "action_id": action.action_id, "result": response.model_dump_json()}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "consumer": self.consumer,
+            "in_flight": self._in_flight,
+            "batches_in_flight": len(self._batches),
+            "processed": self.processed,
+            "failed": self.failed,
+            "claimed": self.claimed,
+            "throttled": self.throttled,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+def connect_redis(url: str | None = None):
+    """Create a redis.asyncio client. redis is optional and only imported when streams are used."""
+    from redis.asyncio import Redis
+
+    return Redis.from_url(url or settings.redis_url, decode_responses=True)
+
+
+_consumer: StreamConsumer | None = None
+_task: asyncio.Task | None = None
+
+
+def get_consumer() -> StreamConsumer | None:
+    """The in-app consumer, if running."""
+    return _consumer
+
+
+async def start_stream_consumer(db) -> None:
+    """Start the in-app consumer when REDIS_URL is set and STREAM_CONSUMER_IN_APP is on."""
+    global _consumer, _task
+    if not settings.redis_url or not settings.stream_consumer_in_app:
+        return
+    _consumer = StreamConsumer(connect_redis(), db)
+    _task = asyncio.create_task(_consumer.run())
+
+
+async def stop_stream_consumer(timeout: float = 10.0) -> None:
+    """Stop reading, let in-flight batches finish (up to timeout) and close the Redis client."""
+    global _consumer, _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("stream consumer stopped with an error")
+        _task = None
+    if _consumer is not None:
+        await _consumer.drain(timeout)
+        await _consumer.redis.aclose()
+        _consumer = None
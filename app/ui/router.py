@@ -2,7 +2,7 @@
 import json
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, Form, Request
+from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 
@@ -10,9 +10,16 @@ from bson import ObjectId
 from bson.errors import InvalidId
 from pymongo import ReturnDocument
 
+from app.config import settings
 from app.db import APPROVALS_COLLECTION, POLICIES_COLLECTION, get_db
+from app.approval_store import resolve_approvals
 from app.models import Action
+from app.notify import get_notifier
+from app.pagination import NEWEST_FIRST, page_query
 from app.pipeline import run_pipeline
+from app.policy.compiler import validate_definition
+from app.policy.engine import profile_by_policy
+from app.policy.store import current_snapshot, notify_policies_changed
 
 router = APIRouter(prefix="/ui", tags=["ui"])
 
@@ -23,9 +30,9 @@ templates = Jinja2Templates(directory="app/ui/templates")
 async def evaluate_form(request: Request):
     """Render empty form."""
     return templates.TemplateResponse(
+        request,
         "evaluate.html",
         {
-            "request": request,
             "result": None,
             "error": None,
             "action_id": "",
@@ -52,9 +59,9 @@ async def evaluate_submit(
         payload_obj = json.loads(payload or "{}")
     except json.JSONDecodeError as e:
         return templates.TemplateResponse(
+            request,
             "evaluate.html",
             {
-                "request": request,
                 "result": None,
                 "error": f"Invalid JSON in payload: {e}",
                 "action_id": action_id,
@@ -73,13 +80,13 @@ async def evaluate_submit(
         payload=payload_obj,
     )
 
-    result = await run_pipeline(db, action)
+    result = await run_pipeline(db, action, source="ui")
     result_dict = result.model_dump(mode="json")
 
     return templates.TemplateResponse(
+        request,
         "evaluate.html",
         {
-            "request": request,
             "result": result_dict,
             "error": None,
             "action_id": action_id,
@@ -91,28 +98,52 @@ async def evaluate_submit(
     )
 
 
-@router.get("/policies")
-async def policies_form(request: Request, db=Depends(get_db)):
-    """List existing policies and show create form."""
+async def _policies_for_template(db) -> list[dict]:
     cursor = db[POLICIES_COLLECTION].find({}).sort("_id", 1)
     docs = await cursor.to_list(length=None)
+    snapshot = current_snapshot()
+    profiles = profile_by_policy(snapshot.policy) if snapshot else {}
     policies: list[dict] = []
     for doc in docs:
+        policy_id = str(doc.get("_id"))
         policies.append(
             {
-                "id": str(doc.get("_id")),
+                "id": policy_id,
                 "name": doc.get("name", ""),
                 "kind": doc.get("kind", ""),
                 "version": doc.get("version", 1),
                 "created_at": doc.get("created_at"),
+                "stats": profiles.get(policy_id),  # None unless profiling is enabled
             }
         )
+    return policies
+
+
+def _profile_for_template() -> dict | None:
+    snapshot = current_snapshot()
+    profile = snapshot.policy.profile if snapshot else None
+    if profile is None:
+        return None
+    return {
+        "since": profile.since,
+        "evaluations": profile.evaluations,
+        "sampled": profile.sampled,
+        "unmatched": profile.unmatched,
+        "sample_rate": profile.sample_rate,
+    }
+
+
+@router.get("/policies")
+async def policies_form(request: Request, db=Depends(get_db)):
+    """List existing policies and show create form."""
+    policies = await _policies_for_template(db)
 
     return templates.TemplateResponse(
+        request,
         "policies.html",
         {
-            "request": request,
             "policies": policies,
+            "profile": _profile_for_template(),
             "error": None,
             "name": "",
             "kind": "allowlist",
@@ -133,25 +164,18 @@ async def create_policy_form(
     try:
         definition_obj = json.loads(definition or "{}")
     except json.JSONDecodeError as e:
-        cursor = db[POLICIES_COLLECTION].find({}).sort("_id", 1)
-        docs = await cursor.to_list(length=None)
-        policies: list[dict] = []
-        for doc in docs:
-            policies.append(
-                {
-                    "id": str(doc.get("_id")),
-                    "name": doc.get("name", ""),
-                    "kind": doc.get("kind", ""),
-                    "version": doc.get("version", 1),
-                    "created_at": doc.get("created_at"),
-                }
-            )
+        error = f"Invalid JSON in definition: {e}"
+    else:
+        errors = validate_definition(definition_obj)
+        error = f"Invalid rules: {'; '.join(errors)}" if errors else None
+    if error:
         return templates.TemplateResponse(
+            request,
             "policies.html",
             {
-                "request": request,
-                "policies": policies,
-                "error": f"Invalid JSON in definition: {e}",
+                "policies": await _policies_for_template(db),
+                "profile": _profile_for_template(),
+                "error": error,
                 "name": name,
                 "kind": kind,
                 "definition": definition,
@@ -167,19 +191,24 @@ async def create_policy_form(
         "created_at": now,
     }
     await db[POLICIES_COLLECTION].insert_one(doc)
+    await notify_policies_changed(db)
 
     return RedirectResponse(url="/ui/policies", status_code=303)
 
 
-@router.get("/approvals")
-async def approvals_page(
-    request: Request,
-    status: str | None = None,
-    db=Depends(get_db),
-):
-    """List approvals with optional status filter."""
+_UI_STATUSES = ("pending", "approved", "denied", "all")
+
+
+async def _approvals_for_template(db, status: str | None, limit: int, after: str | None) -> tuple[list[dict], str | None]:
+    """One page of approvals (newest first) and the cursor of the next page."""
     query = {} if not status or status == "all" else {"status": status}
-    cursor = db[APPROVALS_COLLECTION].find(query).sort("created_at", -1)
+    collection = db[APPROVALS_COLLECTION]
+    try:
+        page, next_cursor = await page_query(collection, query, limit, after)
+    except ValueError:
+        # Stale or hand-edited cursor: start from the first page.
+        page, next_cursor = await page_query(collection, query, limit, None)
+    cursor = collection.find(page, {"payload": 0}).sort(NEWEST_FIRST)
     docs = await cursor.to_list(length=None)
     approvals: list[dict] = []
     for doc in docs:
@@ -196,19 +225,70 @@ async def approvals_page(
                 "created_at": doc.get("created_at"),
                 "resolved_at": doc.get("resolved_at"),
                 "resolved_by": doc.get("resolved_by"),
+                "occurrences": doc.get("occurrences", 1),
             }
         )
+    return approvals, next_cursor
+
+
+@router.get("/approvals")
+async def approvals_page(
+    request: Request,
+    status: str | None = None,
+    limit: int | None = Query(None, ge=1, le=settings.approvals_page_max_limit),
+    after: str | None = None,
+    db=Depends(get_db),
+):
+    """List one page of approvals (newest first) with optional status filter."""
+    approvals, next_cursor = await _approvals_for_template(db, status, limit or settings.approvals_page_default_limit, after)
 
     return templates.TemplateResponse(
+        request,
         "approvals.html",
         {
-            "request": request,
             "approvals": approvals,
             "status": status or "pending",
+            "error": None,
+            "next_url": str(request.url.include_query_params(after=next_cursor)) if next_cursor else None,
         },
     )
 
 
+@router.post("/approvals/bulk")
+async def bulk_resolve_approvals(
+    request: Request,
+    decision: str = Form(...),
+    ids: list[str] = Form([]),
+    status: str = Form("pending"),
+    db=Depends(get_db),
+):
+    """Approve or deny the checked approvals with one update, then go back to the same filter."""
+    status = status if status in _UI_STATUSES else "pending"
+    back = f"/ui/approvals?status={status}"
+    if decision not in ("approve", "deny") or not ids:
+        return RedirectResponse(url=back, status_code=303)
+    if len(ids) > settings.bulk_resolve_max_ids:
+        # Resolve all of the selection or none of it.
+        approvals, next_cursor = await _approvals_for_template(db, status, settings.approvals_page_default_limit, None)
+        return templates.TemplateResponse(
+            request,
+            "approvals.html",
+            {
+                "approvals": approvals,
+                "status": status,
+                "error": f"{len(ids)} approvals selected; select at most {settings.bulk_resolve_max_ids} at a time. Nothing was changed.",
+                "next_url": f"{back}&after={next_cursor}" if next_cursor else None,
+            },
+            status_code=413,
+        )
+    resolution = "approved" if decision == "approve" else "denied"
+    _, resolved = await resolve_approvals(db, resolution, "ui", ids=ids)
+    notifier = get_notifier()
+    for doc in resolved:
+        notifier.publish(doc)
+    return RedirectResponse(url=back, status_code=303)
+
+
 def _parse_oid_for_ui(approval_id: str) -> ObjectId:
     try:
         return ObjectId(approval_id)
@@ -229,7 +309,7 @@ async def approve_approval(
         return RedirectResponse(url="/ui/approvals", status_code=303)
 
     now = datetime.now(timezone.utc)
-    await db[APPROVALS_COLLECTION].find_one_and_update(
+    doc = await db[APPROVALS_COLLECTION].find_one_and_update(
         {"_id": oid, "status": "pending"},
         {
             "$set": {
@@ -240,6 +320,8 @@ async def approve_approval(
         },
         return_document=ReturnDocument.AFTER,
     )
+    if doc:
+        get_notifier().publish(doc)
     return RedirectResponse(url="/ui/approvals", status_code=303)
 
 
@@ -255,7 +337,7 @@ async def deny_approval(
         return RedirectResponse(url="/ui/approvals", status_code=303)
 
     now = datetime.now(timezone.utc)
-    await db[APPROVALS_COLLECTION].find_one_and_update(
+    doc = await db[APPROVALS_COLLECTION].find_one_and_update(
         {"_id": oid, "status": "pending"},
         {
             "$set": {
@@ -266,6 +348,8 @@ async def deny_approval(
         },
         return_document=ReturnDocument.AFTER,
     )
+    if doc:
+        get_notifier().publish(doc)
     return RedirectResponse(url="/ui/approvals", status_code=303)
 
 
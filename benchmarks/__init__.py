@@ -0,0 +1 @@
+# Benchmarks: python -m benchmarks.run --out results.json; python -m benchmarks.compare base.json results.json
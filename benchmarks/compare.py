@@ -0,0 +1,37 @@
+"""Compare two benchmark JSON files; exit 1 if any shared benchmark regressed beyond the threshold."""
+import argparse
+import json
+import sys
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p50_us", help="stat to compare (p50_us, p99_us, mean_us, ...)")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed relative slowdown (0.20 = 20%%)")
+    parser.add_argument("--min-us", type=float, default=1.0, help="ignore benchmarks faster than this in the baseline")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    with open(args.candidate, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    regressions = 0
+    for name in sorted(set(base) & set(new)):
+        before, after = base[name].get(args.metric), new[name].get(args.metric)
+        if before is None or after is None or before < args.min_us:
+            continue
+        change = (after - before) / before
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:70s} {before:12.2f} -> {after:12.2f} {change:+7.1%}{flag}")
+    print(f"{regressions} regression(s) over {args.threshold:.0%} on {args.metric}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
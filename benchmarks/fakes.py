@@ -0,0 +1,60 @@
+"""In-process stub for the LLM so benchmarks measure our code, not the network. Mongo and Redis fakes live in tests/fakes.py."""
+import asyncio
+import hashlib
+import json
+from types import SimpleNamespace
+from typing import Any
+
+
+def _fields(prompt: str) -> dict:
+    """The uncertain payload fields a rewriter or combined prompt asks about (the JSON after 'make safe')."""
+    for line in prompt.splitlines():
+        if "make safe" in line and ": {" in line:
+            return json.loads(line[line.index(": {") + 2:])
+    return {}
+
+
+class StubLLM:
+    """
+    Drop-in for the shared AsyncOpenAI client: chat.completions.create sleeps `latency` seconds
+    and answers deterministically from a hash of the prompt, so results are reproducible.
+    `decisions` is the pool the scorer verdict is drawn from. Batched scorer prompts get a JSON
+    array; with `malformed_every` = n, every n-th verdict in it is invalid.
+    """
+
+    def __init__(self, latency: float = 0.05, decisions: tuple[str, ...] = ("allow", "block", "needs_approval", "rewrite")):
+        self.latency = latency
+        self.decisions = decisions
+        self.malformed_every = 0
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model: str, messages: list[dict], **kwargs) -> Any:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        digest = hashlib.sha256(prompt.encode()).digest()
+        system = messages[0]["content"]
+        fields = _fields(prompt)
+        if "safety rewriter" in system:
+            content = json.dumps({label: "[REDACTED]" for label in fields})
+        elif "JSON array" in system:
+            actions = prompt.split("\n\nOutput a JSON array")[0].split("\n\n#")
+            content = json.dumps([self._verdict(part, i) for i, part in enumerate(actions)])
+        else:
+            decision = self.decisions[digest[0] % len(self.decisions)]
+            verdict = {"score": digest[1] / 255, "decision": decision, "reason": "stub"}
+            if decision == "rewrite" and fields and "rewrites" in system:
+                verdict["rewrites"] = {label: "[REDACTED]" for label in fields}
+            content = json.dumps(verdict)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def _verdict(self, part: str, index: int) -> dict:
+        digest = hashlib.sha256(part.encode()).digest()
+        if self.malformed_every and (index + 1) % self.malformed_every == 0:
+            return {"index": index, "score": "high"}
+        decision = self.decisions[digest[0] % len(self.decisions)]
+        return {"index": index, "score": digest[1] / 255, "decision": decision, "reason": "stub"}
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,51 @@
+"""Timing helpers shared by the benchmark suites. Results are plain dicts of microsecond stats."""
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+def _stats(samples_us: list[float], per_call: int = 1) -> dict[str, Any]:
+    samples_us = sorted(s / per_call for s in samples_us)
+    n = len(samples_us)
+    return {
+        "n": n * per_call,
+        "mean_us": round(statistics.fmean(samples_us), 3),
+        "p50_us": round(samples_us[n // 2], 3),
+        "p99_us": round(samples_us[min(n - 1, int(n * 0.99))], 3),
+        "min_us": round(samples_us[0], 3),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int = 30, number: int = 100) -> dict[str, Any]:
+    """Time fn() `number` times per sample, `repeat` samples, after one warm-up sample."""
+    for _ in range(number):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return _stats(samples, per_call=number)
+
+
+async def measure_latency(calls: list[Callable[[], Awaitable[Any]]], concurrency: int) -> dict[str, Any]:
+    """Run coroutine factories with bounded concurrency; per-call latency stats plus throughput."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def _one(call):
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one(c) for c in calls))
+    elapsed = time.perf_counter() - start
+    result = _stats(latencies)
+    result["concurrency"] = concurrency
+    result["throughput_per_s"] = round(len(calls) / elapsed, 1)
+    return result
@@ -0,0 +1,113 @@
+"""End-to-end run_pipeline benchmarks against an in-process Mongo stand-in and a stub LLM with fixed latency."""
+from typing import Any
+
+from app.config import settings
+from app.db import APPROVALS_COLLECTION
+from app.llm import client as llm_client
+from app.llm.limiter import get_llm_limiter
+from app.llm.scorer import score_cache
+from app.models import Action
+from app.pipeline import run_pipeline
+from app.policy.store import refresh_snapshot
+
+from benchmarks.fakes import StubLLM
+from benchmarks.harness import measure_latency
+from benchmarks.policy import make_rules
+from tests.fakes import FakeDatabase
+
+POLICY = {"rules": [
+    {"effect": "allow", "match": {"action_type": "read_file", "resource_pattern": "/tmp/*"}},
+    {"effect": "deny", "match": {"action_type": "read_file", "resource_pattern": "/etc/*"}},
+] + make_rules(500, "mixed")}
+
+
+def _action(n: int, type_: str = "send_email", resource: str = "smtp://mail.example.com", unique: bool = True) -> Action:
+    payload = {"to": "someone@example.com", "subject": "report", "body": "numbers attached", "n": n if unique else 0}
+    return Action(action_id=str(n), agent_id="bench", type=type_, resource=resource, payload=payload)
+
+
+def _uncertain_action(n: int) -> Action:
+    """A rewrite candidate with a field the local redactor leaves to the LLM (session_note)."""
+    action = _action(n)
+    action.payload["session_note"] = f"customer callback re ticket {n}"
+    return action
+
+
+async def _scenario(db, actions: list[Action], concurrency: int) -> dict[str, Any]:
+    score_cache().clear()
+    db.pop(APPROVALS_COLLECTION, None)  # the fake scans linearly; earlier scenarios' approvals would dominate
+    return await measure_latency([lambda a=a: run_pipeline(db, a) for a in actions], concurrency)
+
+
+async def run(quick: bool = False, llm_latency_ms: float = 50.0) -> dict[str, Any]:
+    count = 200 if quick else 1000
+    db = FakeDatabase()
+    await db["policies"].insert_one({"name": "bench", "kind": "dsl", "definition": POLICY, "version": 1})
+    await refresh_snapshot(db)
+
+    saved = (settings.openai_api_key, llm_client._client)
+    saved_mode = settings.llm_pipeline_mode
+    saved_batch = settings.llm_batch_enabled
+    saved_deadline = settings.pipeline_deadline_ms
+    saved_overload = settings.llm_overload_decision
+    stub = StubLLM(latency=llm_latency_ms / 1000)
+    settings.openai_api_key = "bench"
+    llm_client._client = stub
+    results: dict[str, Any] = {}
+    try:
+        for concurrency in (1, 50):
+            n = count if concurrency > 1 else count // 10
+            results[f"pipeline/policy_allow/c={concurrency}"] = await _scenario(
+                db, [_action(i, "read_file", f"/tmp/file{i}") for i in range(count)], concurrency
+            )
+            results[f"pipeline/policy_deny/c={concurrency}"] = await _scenario(
+                db, [_action(i, "read_file", f"/etc/conf{i}") for i in range(count)], concurrency
+            )
+            for decision in ("allow", "needs_approval", "rewrite"):
+                stub.decisions = (decision,)
+                results[f"pipeline/llm_{decision}/uncached/c={concurrency}"] = await _scenario(
+                    db, [_action(i) for i in range(n)], concurrency
+                )
+            # Rewrite path with an uncertain field: scorer + rewriter calls vs one combined call.
+            for mode in ("two_call", "combined"):
+                settings.llm_pipeline_mode = mode
+                results[f"pipeline/llm_rewrite/{mode}/c={concurrency}"] = await _scenario(
+                    db, [_uncertain_action(i) for i in range(n)], concurrency
+                )
+            settings.llm_pipeline_mode = saved_mode
+            stub.decisions = ("allow",)
+            # Identical actions: first call pays the LLM, the rest hit the cache / coalesce.
+            results[f"pipeline/llm_allow/repeated/c={concurrency}"] = await _scenario(
+                db, [_action(i, unique=False) for i in range(n)], concurrency
+            )
+        # Micro-batching: distinct concurrent actions share scorer requests (see llm_calls).
+        settings.llm_batch_enabled = True
+        calls = stub.calls
+        batched = await _scenario(db, [_action(i) for i in range(count)], 50)
+        batched["llm_calls"] = stub.calls - calls
+        results["pipeline/llm_allow/batched/c=50"] = batched
+        settings.llm_batch_enabled = saved_batch
+        # Unhealthy provider: LLM 20x slower than usual, deadline 5x the usual latency. Every call
+        # outlives the deadline, so each request is shed (see "shed") about one deadline after it
+        # starts: p50 sits just above the deadline, p99 adds event-loop queueing at c=50. Shed
+        # actions are blocked rather than sent for approval so the scenario times the LLM path,
+        # not approval writes into the linear-scan fake.
+        settings.pipeline_deadline_ms = llm_latency_ms * 5
+        settings.llm_overload_decision = "block"
+        stub.latency = llm_latency_ms * 20 / 1000
+        limiter = get_llm_limiter()
+        shed_before = sum(limiter.shed.values())
+        slow = await _scenario(db, [_action(i) for i in range(count)], 50)
+        slow["shed"] = sum(limiter.shed.values()) - shed_before
+        results["pipeline/llm_slow/deadline/c=50"] = slow
+        stub.latency = llm_latency_ms / 1000
+        settings.pipeline_deadline_ms = saved_deadline
+        settings.llm_overload_decision = saved_overload
+        results["pipeline/meta"] = {"llm_latency_ms": llm_latency_ms, "llm_calls": stub.calls}
+    finally:
+        settings.openai_api_key, llm_client._client = saved
+        settings.llm_pipeline_mode = saved_mode
+        settings.llm_batch_enabled = saved_batch
+        settings.pipeline_deadline_ms = saved_deadline
+        settings.llm_overload_decision = saved_overload
+    return results
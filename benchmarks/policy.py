@@ -0,0 +1,106 @@
+"""Microbenchmarks for the policy engine: rule count x pattern mix x backend, payload size, _matches_pattern."""
+import random
+from typing import Any
+
+from app.models import Action
+from app.policy.compiler import compile_policy
+from app.policy.engine import BACKENDS, _matches_pattern, enable_profiling, evaluate
+
+from benchmarks.harness import measure
+
+ACTION_TYPES = [f"tool_{i}" for i in range(50)] + ["read_file", "write_file", "http_request", "send_email"]
+
+
+def _pattern(rng: random.Random, kind: str, i: int) -> str:
+    base = f"/srv/tenant{i % 97}/app{i}"
+    if kind == "literal":
+        return f"{base}/config.yaml"
+    if kind == "glob":
+        return f"{base}/*"
+    return rf"re:^{base}/.*\.(key|pem)$" if rng.random() < 0.5 else rf"re:/app{i}/secret"
+
+
+def make_rules(count: int, mix: str, seed: int = 0) -> list[dict[str, Any]]:
+    """mix: literal | glob | regex | mixed."""
+    rng = random.Random(seed)
+    kinds = ("literal", "glob", "regex")
+    rules = []
+    for i in range(count):
+        kind = rng.choice(kinds) if mix == "mixed" else mix
+        rules.append({
+            "effect": rng.choice(("allow", "deny")),
+            "match": {"action_type": rng.choice(ACTION_TYPES), "resource_pattern": _pattern(rng, kind, i)},
+        })
+    return rules
+
+
+def make_actions(count: int, rule_count: int, seed: int = 1) -> list[Action]:
+    """Half the actions target resources some rule covers, half miss everything."""
+    rng = random.Random(seed)
+    actions = []
+    for n in range(count):
+        i = rng.randrange(max(rule_count, 1))
+        resource = f"/srv/tenant{i % 97}/app{i}/config.yaml" if n % 2 else f"/home/user{n}/notes.txt"
+        actions.append(Action(action_id=str(n), agent_id="bench", type=rng.choice(ACTION_TYPES), resource=resource))
+    return actions
+
+
+def _evaluate_all(actions: list[Action], policy, backend: str):
+    def run():
+        for action in actions:
+            evaluate(action, policy, backend=backend)
+    return run
+
+
+def run(quick: bool = False) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    rule_counts = (10, 100, 1000) if quick else (10, 100, 1000, 10000)
+    repeat = 5 if quick else 15
+    for count in rule_counts:
+        for mix in ("literal", "glob", "regex", "mixed"):
+            policy = compile_policy(make_rules(count, mix))
+            actions = make_actions(200, count)
+            for backend in BACKENDS:
+                if backend == "linear" and count > 1000 and quick:
+                    continue
+                stats = measure(_evaluate_all(actions, policy, backend), repeat=repeat, number=1)
+                # One sample covers all 200 actions; report per action.
+                results[f"evaluate/{backend}/{mix}/rules={count}"] = {
+                    k: (round(v / len(actions), 3) if k.endswith("_us") else v) for k, v in stats.items()
+                }
+
+    # Profiling overhead: hit counters on every evaluation, plus timed rule-by-rule walks when sampled.
+    for rate in (0.0, 0.01, 1.0):
+        policy = compile_policy(make_rules(1000, "mixed"))
+        enable_profiling(policy, rate)
+        actions = make_actions(200, 1000)
+        stats = measure(_evaluate_all(actions, policy, "indexed"), repeat=repeat, number=1)
+        results[f"evaluate/indexed/mixed/rules=1000/profile_rate={rate}"] = {
+            k: (round(v / len(actions), 3) if k.endswith("_us") else v) for k, v in stats.items()
+        }
+
+    # Raw (uncompiled) rule lists: compiled once, then looked up by their marshal encoding on every call.
+    rules = make_rules(100, "mixed")
+    action = make_actions(1, 100)[0]
+    results["evaluate/raw_rules/mixed/rules=100"] = measure(lambda: evaluate(action, rules), repeat=repeat, number=10)
+
+    # Payload size: conditions are checked against payloads of growing size.
+    for keys in (0, 10, 1000):
+        payload = {f"k{i}": i for i in range(keys)}
+        cond_rules = [
+            {"effect": "deny", "match": {"action_type": "send_email", "payload_conditions": {f"k{i}": -1}}}
+            for i in range(50)
+        ]
+        policy = compile_policy(cond_rules)
+        action = Action(action_id="p", agent_id="bench", type="send_email", payload=payload)
+        results[f"evaluate/payload_conditions/payload_keys={keys}"] = measure(
+            lambda: evaluate(action, policy), repeat=repeat, number=100
+        )
+
+    for name, pattern, value in (
+        ("literal", "/etc/passwd", "/etc/passwd"),
+        ("glob", "/etc/*", "/etc/passwd"),
+        ("regex", r"re:^/etc/.*\.key$", "/etc/ssl/private/server.key"),
+    ):
+        results[f"matches_pattern/{name}"] = measure(lambda: _matches_pattern(pattern, value), repeat=repeat, number=1000)
+    return results
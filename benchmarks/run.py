@@ -0,0 +1,64 @@
+"""Run the benchmark suites and write machine-readable JSON (stdout or --out)."""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import detectors, pipeline, policy, serialization
+
+SUITES = ("policy", "pipeline", "serialization", "detectors")
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="run only these suites (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer samples")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="stub LLM latency for the pipeline suite")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    suites = args.suite or list(SUITES)
+    results: dict = {}
+    if "policy" in suites:
+        results.update(policy.run(args.quick))
+    if "pipeline" in suites:
+        results.update(asyncio.run(pipeline.run(args.quick, args.llm_latency_ms)))
+    if "serialization" in suites:
+        results.update(serialization.run(args.quick))
+    if "detectors" in suites:
+        results.update(detectors.run(args.quick))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "quick": args.quick,
+            "suites": suites,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Serialization cost of EvaluateResponse and approval documents, by payload size."""
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
+
+from app.api.approvals import _doc_to_approval_response
+from app.models import EvaluateResponse
+
+from benchmarks.harness import measure
+
+
+def _payload(size: int) -> dict[str, Any]:
+    return {f"field_{i}": {"value": "x" * 32, "n": i, "tags": ["a", "b"]} for i in range(size)}
+
+
+def run(quick: bool = False) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    repeat = 5 if quick else 15
+    for size in (0, 10, 100, 1000):
+        payload = _payload(size)
+        response = EvaluateResponse(
+            action_id="a1",
+            policy_decision="unknown",
+            decision="rewritten",
+            reason="stub",
+            score=0.4,
+            rewritten_payload=payload or None,
+        )
+        results[f"evaluate_response/dump_json/payload={size}"] = measure(response.model_dump_json, repeat=repeat, number=50)
+
+        doc = {
+            "_id": ObjectId(),
+            "action_id": "a1",
+            "agent_id": "bench",
+            "action_type": "send_email",
+            "resource": "smtp://example",
+            "payload": payload,
+            "risk_score": 0.7,
+            "reason": "stub",
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc),
+        }
+        results[f"approval/doc_to_response/payload={size}"] = measure(
+            lambda: _doc_to_approval_response(doc), repeat=repeat, number=50
+        )
+        results[f"approval/doc_to_json/payload={size}"] = measure(
+            lambda: _doc_to_approval_response(doc).model_dump_json(), repeat=repeat, number=50
+        )
+    return results
@@ -1,5 +1,5 @@
 #!/usr/bin/env bash
-# Run Guardian Agent API. Requires MongoDB (MONGODB_URL in .env). Redis/streams added at deployment.
+# Run Guardian Agent API. Requires MongoDB (MONGODB_URL in .env). Set REDIS_URL to also consume the actions stream.
 set -e
 cd "$(dirname "$0")"
 
@@ -0,0 +1,30 @@
+"""Randomized equivalence check: every policy match backend vs the original rule-walking evaluate. No DB.
+`pytest tests/test_policy_backends.py` runs a small seeded version; use this for large fuzz runs."""
+import argparse
+import random
+import sys
+
+from app.policy.engine import BACKENDS
+from app.policy.fuzz import first_mismatch
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--policies", type=int, default=500, help="random rule sets to generate")
+    parser.add_argument("--max-rules", type=int, default=80)
+    parser.add_argument("--actions", type=int, default=100, help="actions evaluated per rule set")
+    args = parser.parse_args()
+
+    checked, mismatch = first_mismatch(random.Random(args.seed), args.policies, args.max_rules, args.actions)
+    if mismatch is not None:
+        print(f"MISMATCH backend={mismatch['backend']} expected={mismatch['expected']} got={mismatch['got']}")
+        print(f"action={mismatch['action']}")
+        print(f"rules={mismatch['rules']}")
+        return 1
+    print(f"{checked} actions x {len(BACKENDS)} backends agree with the reference evaluate.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
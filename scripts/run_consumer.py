@@ -0,0 +1,38 @@
+"""Run the Redis Streams consumer as a standalone process; requires MONGODB_URL and REDIS_URL."""
+import asyncio
+import logging
+
+from app.audit import start_audit, stop_audit
+from app.config import settings
+from app.db import close_db, get_database, start_db
+from app.llm.client import close_llm, start_llm
+from app.policy.store import start_policy_sync, stop_policy_sync
+from app.stream.consumer import StreamConsumer, connect_redis
+
+
+async def main():
+    if not settings.redis_url:
+        raise SystemExit("REDIS_URL is not set.")
+    await start_db()
+    await start_policy_sync(get_database())
+    await start_audit(get_database())
+    await start_llm()
+    consumer = StreamConsumer(connect_redis(), get_database())
+    print(f"Consuming {consumer.stream} as {consumer.group}/{consumer.consumer} -> {consumer.results_stream}")
+    try:
+        await consumer.run()
+    finally:
+        await consumer.drain(timeout=10.0)
+        await consumer.redis.aclose()
+        await stop_audit()
+        await close_llm()
+        await stop_policy_sync()
+        await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,186 @@
+"""Replay recorded actions (JSONL) against current vs candidate policy rules and report decision flips.
+
+Pure policy engine only: no MongoDB, no LLM. Input is streamed in chunks to a process pool.
+
+Policy files may hold {"rules": [...]}, a list of rules, or a list of policy documents as
+returned by GET /policies (their definition.rules are concatenated in order).
+
+    python -m scripts.simulate_policy actions.jsonl --current current.json --candidate candidate.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any
+
+from pydantic import ValidationError
+
+from app.models import Action
+from app.policy.compiler import CompiledPolicy, compile_policy
+from app.policy.engine import BACKENDS, evaluate
+
+DECISIONS = ("allowed", "denied", "unknown")
+
+
+def load_rules(path: str | None) -> list[Any]:
+    """Flatten a policy file into an ordered rule list. No file means no rules (everything unknown)."""
+    if path is None:
+        return []
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return list(data.get("rules") or (data.get("definition") or {}).get("rules") or [])
+    rules: list[Any] = []
+    for item in data:
+        if isinstance(item, dict) and "definition" in item:
+            rules.extend((item.get("definition") or {}).get("rules") or [])
+        else:
+            rules.append(item)
+    return rules
+
+
+# Per-worker state, compiled once by the pool initializer.
+_current: CompiledPolicy | None = None
+_candidate: CompiledPolicy | None = None
+_backend: str | None = None
+
+
+def _init_worker(current_rules: list[Any], candidate_rules: list[Any], backend: str | None) -> None:
+    global _current, _candidate, _backend
+    _current = compile_policy(current_rules)
+    _candidate = compile_policy(candidate_rules)
+    _backend = backend
+
+
+def _evaluate_chunk(first_line: int, lines: list[str], max_flips: int) -> dict[str, Any]:
+    current_counts: Counter = Counter()
+    candidate_counts: Counter = Counter()
+    transitions: Counter = Counter()
+    flips: list[dict[str, Any]] = []
+    invalid = 0
+    for offset, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            action = Action.model_validate_json(line)
+        except ValidationError:
+            invalid += 1
+            continue
+        before = evaluate(action, _current, backend=_backend)
+        after = evaluate(action, _candidate, backend=_backend)
+        current_counts[before] += 1
+        candidate_counts[after] += 1
+        if before != after:
+            transitions[f"{before}->{after}"] += 1
+            if len(flips) < max_flips:
+                flips.append({"line": first_line + offset, "action_id": action.action_id, "current": before, "candidate": after})
+    return {
+        "current": current_counts,
+        "candidate": candidate_counts,
+        "transitions": transitions,
+        "flips": flips,
+        "invalid": invalid,
+    }
+
+
+def _chunks(f, chunk_size: int) -> Iterator[tuple[int, list[str]]]:
+    chunk: list[str] = []
+    first_line = 1
+    for line_no, line in enumerate(f, start=1):
+        if not chunk:
+            first_line = line_no
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield first_line, chunk
+            chunk = []
+    if chunk:
+        yield first_line, chunk
+
+
+def simulate(args: argparse.Namespace) -> dict[str, Any]:
+    current_rules = load_rules(args.current)
+    candidate_rules = load_rules(args.candidate)
+    totals = {"current": Counter(), "candidate": Counter(), "transitions": Counter(), "invalid": 0}
+    diffs = open(args.diffs_out, "w", encoding="utf-8") if args.diffs_out else None
+    flips_left = args.max_diffs
+
+    def _collect(future: Future) -> None:
+        nonlocal flips_left
+        result = future.result()
+        for key in ("current", "candidate", "transitions"):
+            totals[key].update(result[key])
+        totals["invalid"] += result["invalid"]
+        if diffs is not None:
+            for flip in result["flips"][:flips_left]:
+                diffs.write(json.dumps(flip) + "\n")
+            flips_left -= min(flips_left, len(result["flips"]))
+
+    started = time.perf_counter()
+    f = sys.stdin if args.actions == "-" else open(args.actions, encoding="utf-8")
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(current_rules, candidate_rules, args.backend),
+        ) as pool:
+            pending: set[Future] = set()
+            for first_line, chunk in _chunks(f, args.chunk_size):
+                # Bounded window of submitted chunks keeps memory flat for any input size.
+                if len(pending) >= args.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _collect(future)
+                max_flips = flips_left if diffs is not None else 0
+                pending.add(pool.submit(_evaluate_chunk, first_line, chunk, max_flips))
+            for future in wait(pending).done:
+                _collect(future)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        if diffs is not None:
+            diffs.close()
+    elapsed = time.perf_counter() - started
+
+    evaluated = sum(totals["current"].values())
+    return {
+        "actions": evaluated,
+        "invalid_lines": totals["invalid"],
+        "current": {d: totals["current"][d] for d in DECISIONS},
+        "candidate": {d: totals["candidate"][d] for d in DECISIONS},
+        "flipped": sum(totals["transitions"].values()),
+        "transitions": dict(totals["transitions"].most_common()),
+        "llm_fallthrough": {
+            "current": totals["current"]["unknown"],
+            "candidate": totals["candidate"]["unknown"],
+            "delta": totals["candidate"]["unknown"] - totals["current"]["unknown"],
+        },
+        "rules": {"current": len(current_rules), "candidate": len(candidate_rules)},
+        "elapsed_seconds": round(elapsed, 3),
+        "actions_per_second": round(evaluated / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("actions", help="JSONL file of recorded actions ('-' for stdin)")
+    parser.add_argument("--current", help="current policy file (omit for an empty rule set)")
+    parser.add_argument("--candidate", required=True, help="candidate policy file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="policy match backend (default: settings)")
+    parser.add_argument("--diffs-out", help="write flipped actions as JSONL to this file")
+    parser.add_argument("--max-diffs", type=int, default=100_000, help="cap on flipped actions written")
+    args = parser.parse_args()
+
+    report = simulate(args)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
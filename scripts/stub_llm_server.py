@@ -0,0 +1,59 @@
+"""Local OpenAI-compatible stub for POST /v1/chat/completions, answering like benchmarks.fakes.StubLLM.
+
+Point the app at it to exercise the scorer, rewriter and batcher over real HTTP without an API key:
+
+    python -m scripts.stub_llm_server --port 8099 --latency-ms 50 --malformed-every 5
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=stub LLM_BATCH_ENABLED=true uvicorn app.main:app
+"""
+import argparse
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+from benchmarks.fakes import StubLLM
+
+
+def build_app(stub: StubLLM) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        resp = await stub.chat.completions.create(model=body.get("model", "stub"), messages=body["messages"])
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": resp.choices[0].message.content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": stub.calls}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--decisions", default="allow,block,needs_approval,rewrite", help="comma-separated verdict pool")
+    parser.add_argument("--malformed-every", type=int, default=0, help="make every n-th batched verdict invalid")
+    args = parser.parse_args()
+    stub = StubLLM(latency=args.latency_ms / 1000, decisions=tuple(args.decisions.split(",")))
+    stub.malformed_every = args.malformed_every
+    uvicorn.run(build_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
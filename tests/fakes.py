@@ -0,0 +1,372 @@
+"""In-process stand-ins for MongoDB and Redis Streams, shared by the tests and the benchmarks."""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+
+_MISSING = object()
+
+
+def _get(doc: dict, key: str) -> Any:
+    """Value at a dotted path, or None when absent."""
+    value: Any = doc
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part, _MISSING)
+        if value is _MISSING:
+            return None
+    return value
+
+
+def _compare(value: Any, op: str, arg: Any) -> bool:
+    if op == "$in":
+        return value in arg
+    if op == "$nin":
+        return value not in arg
+    if op == "$ne":
+        return value != arg
+    if op == "$exists":
+        return (value is not None) == bool(arg)
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > arg
+    if op == "$gte":
+        return value >= arg
+    if op == "$lt":
+        return value < arg
+    if op == "$lte":
+        return value <= arg
+    raise NotImplementedError(f"query operator {op} is not simulated")
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, expected in query.items():
+        if key == "$or":
+            if not any(_matches(doc, clause) for clause in expected):
+                return False
+            continue
+        if key == "$and":
+            if not all(_matches(doc, clause) for clause in expected):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(expected, dict) and expected and all(k.startswith("$") for k in expected):
+            if not all(_compare(value, op, arg) for op, arg in expected.items()):
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False) -> None:
+    for op, fields in update.items():
+        for key, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                doc[key] = value
+            elif op == "$inc":
+                doc[key] = doc.get(key, 0) + value
+
+
+class FakeCursor:
+    def __init__(self, docs: list[dict]):
+        self._docs = docs
+
+    def sort(self, key, direction=None):
+        keys = key if isinstance(key, list) else [(key, direction or 1)]
+        for k, d in reversed(keys):
+            self._docs.sort(key=lambda doc: (doc.get(k) is None, doc.get(k)), reverse=d == -1)
+        return self
+
+    def skip(self, n: int):
+        self._docs = self._docs[n:]
+        return self
+
+    def limit(self, n: int):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self._docs if length is None else self._docs[:length])
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeChangeStream:
+    """
+    Change events from writes made after watch() was called, filtered by a $match pipeline.
+    Events carry operationType, ns, documentKey and fullDocument (inserts, or updates with
+    full_document="updateLookup"; never deletes).
+    """
+
+    def __init__(self, db: "FakeDatabase", pipeline: list[dict] | None, coll: str | None, full_document: str | None):
+        self._db = db
+        self._match = [stage["$match"] for stage in pipeline or [] if "$match" in stage]
+        self._coll = coll
+        self._lookup = full_document == "updateLookup"
+        self._queue: asyncio.Queue = asyncio.Queue()
+        db._streams.add(self)
+
+    def _publish(self, coll: str, operation: str, doc: dict) -> None:
+        if self._coll is not None and coll != self._coll:
+            return
+        event = {"operationType": operation, "ns": {"db": "fake", "coll": coll}, "documentKey": {"_id": doc["_id"]}}
+        if operation == "insert" or (self._lookup and operation == "update"):
+            event["fullDocument"] = dict(doc)
+        if all(_matches(event, match) for match in self._match):
+            self._queue.put_nowait(event)
+
+    def close(self) -> None:
+        self._db._streams.discard(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+
+class FakeCollection:
+    """Just enough of Motor's collection API for the pipeline and approval handlers."""
+
+    def __init__(self, db: "FakeDatabase | None" = None, name: str = ""):
+        self.docs: list[dict] = []
+        self._db = db
+        self.name = name
+
+    def _changed(self, operation: str, doc: dict) -> None:
+        if self._db is not None:
+            for stream in list(self._db._streams):
+                stream._publish(self.name, operation, doc)
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        self._changed("insert", doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+        self.docs.extend(docs)
+        for doc in docs:
+            self._changed("insert", doc)
+        return SimpleNamespace(inserted_ids=[d["_id"] for d in docs])
+
+    def find(self, query=None, projection=None, **kwargs):
+        return FakeCursor([d for d in self.docs if _matches(d, query or {})])
+
+    async def find_one(self, query=None, projection=None, sort=None, **kwargs):
+        cursor = self.find(query)
+        if sort:
+            cursor.sort(sort)
+        docs = await cursor.to_list(1)
+        return docs[0] if docs else None
+
+    def _update_one(self, query, update, upsert) -> tuple[dict | None, dict | None, bool]:
+        """(document before, document after, inserted) for the first match, or an upsert."""
+        for doc in self.docs:
+            if _matches(doc, query):
+                before = dict(doc)
+                _apply_update(doc, update)
+                self._changed("update", doc)
+                return before, doc, False
+        if upsert:
+            doc = {k: v for k, v in query.items() if not isinstance(v, dict) and not k.startswith("$")}
+            doc.setdefault("_id", ObjectId())
+            _apply_update(doc, update, inserting=True)
+            self.docs.append(doc)
+            self._changed("insert", doc)
+            return None, doc, True
+        return None, None, False
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False, sort=None, **kwargs):
+        before, after, _ = self._update_one(query, update, upsert)
+        return after if return_document else before
+
+    async def bulk_write(self, operations, ordered=True, **kwargs):
+        """UpdateOne operations only (the approval store's upserts)."""
+        matched = upserted = 0
+        for op in operations:
+            if not isinstance(op, UpdateOne):
+                raise NotImplementedError(f"bulk_write: {type(op).__name__} is not simulated")
+            _, after, inserted = self._update_one(op._filter, op._doc, op._upsert)
+            upserted += inserted
+            matched += after is not None and not inserted
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_count=upserted)
+
+    async def update_many(self, query, update, **kwargs):
+        matched = [d for d in self.docs if _matches(d, query)]
+        for doc in matched:
+            _apply_update(doc, update)
+            self._changed("update", doc)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+    async def delete_one(self, query, **kwargs):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                del self.docs[i]
+                self._changed("delete", doc)
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def create_index(self, *args, **kwargs):
+        return "fake"
+
+    def watch(self, pipeline=None, full_document=None, **kwargs) -> FakeChangeStream:
+        return FakeChangeStream(self._db, pipeline, self.name, full_document)
+
+
+class FakeDatabase(dict):
+    """db[name] -> FakeCollection, created on first use. watch() streams writes to every collection."""
+
+    def __init__(self):
+        super().__init__()
+        self._streams: set[FakeChangeStream] = set()
+
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection(self, name)
+        return collection
+
+    def watch(self, pipeline=None, full_document=None, **kwargs) -> FakeChangeStream:
+        return FakeChangeStream(self, pipeline, None, full_document)
+
+
+class _FakeGroup:
+    __slots__ = ("delivered", "pending")
+
+    def __init__(self, delivered: int):
+        self.delivered = delivered  # entries of the stream handed out with ">"
+        self.pending: dict[str, list] = {}  # entry id -> [consumer, delivered_at, times_delivered]
+
+
+class FakeRedis:
+    """
+    Just enough of redis.asyncio's stream API for StreamConsumer (decode_responses=True):
+    consumer groups with a pending entries list, XAUTOCLAIM idle times and delivery counts.
+    """
+
+    def __init__(self):
+        self.streams: dict[str, list[tuple[str, dict]]] = {}
+        self.groups: dict[tuple[str, str], _FakeGroup] = {}
+        self._seq = 0
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True, **kwargs):
+        self._seq += 1
+        entry_id = f"{self._seq}-0"
+        entries = self.streams.setdefault(name, [])
+        entries.append((entry_id, {k: str(v) for k, v in fields.items()}))
+        if maxlen is not None and len(entries) > maxlen:
+            del entries[: len(entries) - maxlen]
+        return entry_id
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        if (name, groupname) in self.groups:
+            raise RuntimeError("BUSYGROUP Consumer Group name already exists")
+        entries = self.streams.setdefault(name, []) if mkstream else self.streams[name]
+        self.groups[(name, groupname)] = _FakeGroup(0 if id == "0" else len(entries))
+
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None, **kwargs):
+        response = []
+        for name in streams:
+            group = self.groups[(name, groupname)]
+            entries = self.streams.get(name, [])[group.delivered:]
+            if count:
+                entries = entries[:count]
+            group.delivered += len(entries)
+            for entry_id, _ in entries:
+                group.pending[entry_id] = [consumername, time.monotonic(), 1]
+            if entries:
+                response.append([name, list(entries)])
+        if not response and block:
+            await asyncio.sleep(min(block, 50) / 1000)
+        return response
+
+    async def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None, **kwargs):
+        group = self.groups[(name, groupname)]
+        fields = dict(self.streams.get(name, []))
+        now = time.monotonic()
+        claimed, deleted = [], []
+        for entry_id in sorted(group.pending, key=_entry_key):
+            if _entry_key(entry_id) < _entry_key(start_id):
+                continue
+            if count and len(claimed) + len(deleted) >= count:
+                return [entry_id, claimed, deleted]
+            info = group.pending[entry_id]
+            if (now - info[1]) * 1000 < min_idle_time:
+                continue
+            if entry_id not in fields:
+                del group.pending[entry_id]
+                deleted.append(entry_id)
+                continue
+            info[:] = [consumername, now, info[2] + 1]
+            claimed.append((entry_id, fields[entry_id]))
+        return ["0-0", claimed, deleted]
+
+    async def xpending_range(self, name, groupname, min, max, count, consumername=None, idle=None):
+        group = self.groups[(name, groupname)]
+        low = _entry_key(min) if min != "-" else (0, 0)
+        high = _entry_key(max) if max != "+" else (float("inf"), 0)
+        now = time.monotonic()
+        rows = [
+            {"message_id": entry_id, "consumer": info[0], "time_since_delivered": int((now - info[1]) * 1000), "times_delivered": info[2]}
+            for entry_id, info in sorted(group.pending.items(), key=lambda kv: _entry_key(kv[0]))
+            if low <= _entry_key(entry_id) <= high and consumername in (None, info[0])
+        ]
+        return rows[:count]
+
+    async def xack(self, name, groupname, *ids):
+        group = self.groups[(name, groupname)]
+        return sum(group.pending.pop(entry_id, None) is not None for entry_id in ids)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class _FakePipeline:
+    """Queues calls and runs them in order on execute(), like a non-transactional redis pipeline."""
+
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        calls, self._calls = self._calls, []
+        return [await getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+def _entry_key(entry_id: str) -> tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
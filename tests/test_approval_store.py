@@ -0,0 +1,125 @@
+"""Approval dedupe (app/approval_store.py): upserts by fingerprint, insert races and resolution reuse."""
+import asyncio
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.approval_store import save_approval, save_approvals
+from app.config import settings
+from app.db import APPROVALS_COLLECTION
+from app.models import EvaluateResponse
+from tests.fakes import FakeCollection, FakeDatabase
+
+
+def _pending(fingerprint: str, action_id: str = "a1") -> tuple[EvaluateResponse, dict]:
+    now = datetime.now(timezone.utc)
+    response = EvaluateResponse(action_id=action_id, policy_decision="unknown", decision="needs_approval", reason="risky", score=0.8)
+    doc = {
+        "action_id": action_id,
+        "agent_id": "bot",
+        "action_type": "send_email",
+        "resource": "smtp://mail",
+        "payload": {},
+        "risk_score": 0.8,
+        "reason": "risky",
+        "status": "pending",
+        "created_at": now,
+        "fingerprint": fingerprint,
+        "last_seen_at": now,
+    }
+    return response, doc
+
+
+class _RacingCollection(FakeCollection):
+    """Another worker inserts the pending request for the first fingerprint just before our first upsert."""
+
+    def __init__(self, db, name):
+        super().__init__(db, name)
+        self.raced = False
+
+    def _race(self, fingerprint: str) -> None:
+        self.raced = True
+        self.docs.append({"_id": ObjectId(), "fingerprint": fingerprint, "status": "pending", "occurrences": 1})
+
+    async def find_one_and_update(self, query, update, upsert=False, **kwargs):
+        if upsert and not self.raced:
+            self._race(query["fingerprint"])
+            raise DuplicateKeyError("E11000 duplicate key error", 11000)
+        return await super().find_one_and_update(query, update, upsert=upsert, **kwargs)
+
+    async def bulk_write(self, operations, ordered=True, **kwargs):
+        if self.raced:
+            return await super().bulk_write(operations, ordered=ordered, **kwargs)
+        self._race(operations[0]._filter["fingerprint"])
+        rest = await super().bulk_write(operations[1:], ordered=ordered, **kwargs)
+        raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}], "nUpserted": rest.upserted_count})
+
+
+def _db(racing: bool = False) -> FakeDatabase:
+    db = FakeDatabase()
+    if racing:
+        db[APPROVALS_COLLECTION] = _RacingCollection(db, APPROVALS_COLLECTION)
+    return db
+
+
+def test_repeats_attach_to_one_pending_request():
+    async def run():
+        db = _db()
+        first, second = _pending("fp"), _pending("fp", "a2")
+        await save_approval(db, *first)
+        await save_approval(db, *second)
+        return db[APPROVALS_COLLECTION].docs, first[0], second[0]
+
+    docs, first, second = asyncio.run(run())
+    assert len(docs) == 1 and docs[0]["occurrences"] == 2
+    assert docs[0]["action_id"] == "a1"  # the first action's details are kept
+    assert first.approval_id == second.approval_id == str(docs[0]["_id"])
+
+
+def test_lost_insert_race_attaches_to_the_winner():
+    async def run():
+        db = _db(racing=True)
+        response, doc = _pending("fp")
+        await save_approval(db, response, doc)
+        return db[APPROVALS_COLLECTION].docs, response
+
+    docs, response = asyncio.run(run())
+    assert len(docs) == 1 and docs[0]["occurrences"] == 2
+    assert response.approval_id == str(docs[0]["_id"])
+
+
+def test_batch_groups_by_fingerprint_and_retries_lost_races():
+    async def run():
+        db = _db(racing=True)
+        pending = [_pending("fp1", "a1"), _pending("fp2", "a2"), _pending("fp1", "a3")]
+        await save_approvals(db, pending)
+        return db[APPROVALS_COLLECTION].docs, [response for response, _ in pending]
+
+    docs, responses = asyncio.run(run())
+    by_fingerprint = {doc["fingerprint"]: doc for doc in docs}
+    assert len(docs) == 2
+    assert by_fingerprint["fp1"]["occurrences"] == 3  # the winner's 1 + this batch's 2
+    assert by_fingerprint["fp2"]["occurrences"] == 1
+    assert [r.approval_id for r in responses] == [str(by_fingerprint[f]["_id"]) for f in ("fp1", "fp2", "fp1")]
+
+
+def test_recent_resolution_is_reused(monkeypatch):
+    monkeypatch.setattr(settings, "approval_reuse_window_seconds", 3600)
+
+    async def run():
+        db = _db()
+        oid = (await db[APPROVALS_COLLECTION].insert_one({
+            "fingerprint": "fp", "status": "denied", "resolved_by": "ops", "resolved_at": datetime.now(timezone.utc),
+        })).inserted_id
+        single, batched = _pending("fp"), _pending("fp", "a2")
+        await save_approval(db, *single)
+        await save_approvals(db, [batched])
+        return oid, len(db[APPROVALS_COLLECTION].docs), single[0], batched[0]
+
+    oid, count, single, batched = asyncio.run(run())
+    assert count == 1  # nothing new written
+    for response in (single, batched):
+        assert response.decision == "blocked"
+        assert response.approval_id == str(oid)
+        assert response.reason.startswith("reused approval")
@@ -0,0 +1,68 @@
+"""GET /approvals (app/api/approvals.py) against the in-process FakeDatabase."""
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.approvals import router
+from app.config import settings
+from app.db import APPROVALS_COLLECTION, get_db
+from tests.fakes import FakeDatabase
+
+
+def _client(count: int) -> TestClient:
+    db = FakeDatabase()
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    db[APPROVALS_COLLECTION].docs.extend(
+        {
+            "_id": ObjectId(),
+            "action_id": str(n),
+            "agent_id": "bot",
+            "action_type": "send_email",
+            "payload": {"n": n},
+            "status": "pending",
+            "created_at": base + timedelta(seconds=n // 2),
+        }
+        for n in range(count)
+    )
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_without_limit_or_cursor_returns_the_default_page(monkeypatch):
+    monkeypatch.setattr(settings, "approvals_page_default_limit", 100)
+    response = _client(250).get("/approvals", params={"view": "summary"})
+    assert response.status_code == 200
+    assert len(response.json()) == 100
+    assert "x-next-cursor" in response.headers
+    assert "payload" not in response.json()[0]
+
+
+def test_all_streams_everything():
+    client = _client(250)
+    response = client.get("/approvals", params={"all": "true"})
+    assert len(response.json()) == 250
+    assert "x-next-cursor" not in response.headers
+    assert client.get("/approvals", params={"all": "true", "limit": 10}).status_code == 400
+
+
+def test_pages_follow_next_cursor():
+    client = _client(25)
+    seen, params = [], {"limit": 10}
+    while True:
+        response = client.get("/approvals", params=params)
+        seen.extend(item["action_id"] for item in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        assert 'rel="next"' in response.headers["link"]
+        params = {"limit": 10, "after": cursor}
+    assert [len(seen), len(set(seen))] == [25, 25]
+    assert seen == sorted(seen, key=int, reverse=True)
+
+
+def test_bad_cursor_is_rejected():
+    assert _client(3).get("/approvals", params={"after": "not-a-cursor"}).status_code == 400
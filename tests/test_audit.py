@@ -0,0 +1,161 @@
+"""Audit sink (app/audit.py): overflow policies, flush on shutdown, spill to disk when MongoDB is down, and the TTL index."""
+import asyncio
+import json
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from app.audit import AuditSink
+from app.db import AUDIT_COLLECTION, _ensure_audit_ttl
+from tests.fakes import FakeCollection
+
+
+class _RecordingCollection(FakeCollection):
+    def __init__(self):
+        super().__init__()
+        self.batches: list[list[int]] = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.batches.append([doc["n"] for doc in docs])
+        return await super().insert_many(docs, ordered=ordered)
+
+
+class _DownCollection:
+    async def insert_many(self, docs, ordered=True):
+        raise AutoReconnect("mongo down")
+
+
+def test_failed_batches_are_spilled(tmp_path):
+    spill = tmp_path / "audit.ndjson"
+
+    async def run():
+        sink = AuditSink(_DownCollection(), max_queue=10, batch_size=3, flush_interval=60, spill_path=str(spill))
+        for n in range(5):
+            await sink.record({"n": n})
+        await sink.stop()
+        return sink.stats()
+
+    stats = asyncio.run(run())
+    assert [json.loads(line)["n"] for line in spill.read_text().splitlines()] == [0, 1, 2, 3, 4]
+    assert (stats["spilled"], stats["dropped"], stats["spill_queued"], stats["failed_batches"]) == (5, 0, 0, 1)
+
+
+def test_unwritable_spill_counts_as_dropped(tmp_path):
+    async def run():
+        sink = AuditSink(_DownCollection(), max_queue=2, batch_size=10, flush_interval=60, overflow="spill", spill_path=str(tmp_path))
+        for n in range(5):
+            await sink.record({"n": n})  # the last 3 overflow into the spill file, a directory here
+        await sink.stop()
+        return sink.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["spilled"], stats["dropped"]) == (0, 5)
+
+
+def test_drop_oldest_evicts_the_oldest_queued_decisions():
+    collection = _RecordingCollection()
+
+    async def run():
+        sink = AuditSink(collection, max_queue=3, batch_size=10, flush_interval=60)
+        for n in range(5):
+            await sink.record({"n": n})
+        queued = sink.stats()["queued"]
+        await sink.stop()
+        return queued, sink.stats()
+
+    queued, stats = asyncio.run(run())
+    assert queued == 3
+    assert collection.batches == [[2, 3, 4]]
+    assert (stats["written"], stats["dropped"]) == (3, 2)
+
+
+def test_block_makes_callers_wait_for_space():
+    collection = _RecordingCollection()
+
+    async def run():
+        # No background task: the buffer only drains when the test flushes it.
+        sink = AuditSink(collection, max_queue=2, batch_size=10, flush_interval=60, overflow="block")
+        await sink.record({"n": 0})
+        await sink.record({"n": 1})
+        waiting = asyncio.create_task(sink.record({"n": 2}))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        assert sink._ready.is_set()  # the flusher is woken rather than left to its interval
+        await sink.flush()
+        await asyncio.wait_for(waiting, 1)
+        await sink.stop()
+        return sink.stats()
+
+    stats = asyncio.run(run())
+    assert collection.batches == [[0, 1], [2]]
+    assert (stats["written"], stats["dropped"]) == (3, 0)
+
+
+def test_stop_drains_the_queue_in_batches():
+    collection = _RecordingCollection()
+
+    async def run():
+        sink = AuditSink(collection, max_queue=100, batch_size=2, flush_interval=60)
+        sink.start()
+        for n in range(5):
+            await sink.record({"n": n})
+        await sink.stop()
+        return sink.stats()
+
+    stats = asyncio.run(run())
+    assert [n for batch in collection.batches for n in batch] == [0, 1, 2, 3, 4]
+    assert all(len(batch) <= 2 for batch in collection.batches)
+    assert (stats["queued"], stats["written"], stats["dropped"]) == (0, 5, 0)
+
+
+class _IndexedDatabase(dict):
+    """decision_audit with an index_information() result, recording index calls and commands."""
+
+    def __init__(self, ts_index: dict | None, command_error: Exception | None = None):
+        super().__init__()
+        self.calls: list[tuple] = []
+        self.command_error = command_error
+        database = self
+
+        class Collection:
+            async def index_information(self):
+                return {"_id_": {"key": [("_id", 1)]}, **({"ts_1": ts_index} if ts_index is not None else {})}
+
+            async def create_index(self, key, **kwargs):
+                database.calls.append(("create_index", key, kwargs))
+
+            async def drop_index(self, name):
+                database.calls.append(("drop_index", name))
+
+        self[AUDIT_COLLECTION] = Collection()
+
+    async def command(self, name, value, **kwargs):
+        self.calls.append((name, value, kwargs))
+        if self.command_error is not None:
+            raise self.command_error
+
+
+@pytest.mark.parametrize("ts_index, retention, calls", [
+    (None, 86400, [("create_index", "ts", {"expireAfterSeconds": 86400})]),
+    (None, 0, [("create_index", "ts", {})]),
+    ({"key": [("ts", 1)], "expireAfterSeconds": 86400}, 86400, []),
+    (
+        {"key": [("ts", 1)], "expireAfterSeconds": 86400},
+        172800,
+        [("collMod", AUDIT_COLLECTION, {"index": {"keyPattern": {"ts": 1}, "expireAfterSeconds": 172800}})],
+    ),
+    ({"key": [("ts", 1)]}, 3600, [("collMod", AUDIT_COLLECTION, {"index": {"keyPattern": {"ts": 1}, "expireAfterSeconds": 3600}})]),
+    ({"key": [("ts", 1)], "expireAfterSeconds": 86400}, 0, [("drop_index", "ts_1"), ("create_index", "ts", {})]),
+    ({"key": [("ts", 1)]}, 0, []),
+])
+def test_ensure_audit_ttl(ts_index, retention, calls):
+    db = _IndexedDatabase(ts_index)
+    asyncio.run(_ensure_audit_ttl(db, retention))
+    assert db.calls == calls
+
+
+def test_failed_collmod_keeps_the_old_ttl(caplog):
+    db = _IndexedDatabase({"key": [("ts", 1)], "expireAfterSeconds": 86400}, OperationFailure("not authorized"))
+    asyncio.run(_ensure_audit_ttl(db, 3600))
+    assert [call[0] for call in db.calls] == ["collMod"]
+    assert "could not set the decision_audit TTL to 3600s (still 86400)" in caplog.text
@@ -0,0 +1,122 @@
+"""Batch evaluation (app/pipeline.run_pipeline_batch) against the in-process FakeDatabase."""
+import asyncio
+from types import SimpleNamespace
+
+from pymongo.errors import OperationFailure
+
+from app import pipeline
+from app.config import settings
+from app.db import APPROVALS_COLLECTION
+from app.models import Action
+from app.policy.compiler import compile_policy
+from tests.fakes import FakeDatabase
+
+RULES = [
+    {"effect": "allow", "match": {"action_type": "read_file", "resource_pattern": "/tmp/*"}},
+    {"effect": "deny", "match": {"resource_pattern": "/etc/*"}},
+]
+
+
+def _action(action_id: str, type: str = "send_email", resource: str = "", **payload) -> Action:
+    return Action(action_id=action_id, agent_id="bot", type=type, resource=resource, payload=payload)
+
+
+def _patch(monkeypatch, peak: list[int] | None = None):
+    """One snapshot for the batch; the scorer answers from the action's payload, or raises."""
+    snapshots = []
+    active = 0
+
+    async def fake_snapshot(db):
+        snapshots.append(db)
+        return SimpleNamespace(policy=compile_policy(RULES))
+
+    async def fake_score(action: Action):
+        nonlocal active
+        active += 1
+        if peak is not None:
+            peak.append(active)
+        await asyncio.sleep(0.001)
+        active -= 1
+        if "boom" in action.payload:
+            raise RuntimeError("scorer exploded")
+        return action.payload.get("score", 0.1), action.payload.get("verdict", "allow"), "scored"
+
+    monkeypatch.setattr(pipeline, "get_snapshot", fake_snapshot)
+    monkeypatch.setattr(pipeline, "score_action", fake_score)
+    monkeypatch.setattr(settings, "llm_pipeline_mode", "two_call")
+    return snapshots
+
+
+def _mixed() -> list[Action]:
+    return [
+        _action("allowed", "read_file", "/tmp/a"),
+        _action("ask-1", to="cfo@example.com", verdict="needs_approval", score=0.8),
+        _action("raises", boom=True),
+        _action("denied", "read_file", "/etc/passwd"),
+        _action("ask-2", to="cfo@example.com", verdict="needs_approval", score=0.8),  # same action as ask-1
+        _action("ask-3", to="ops@example.com", verdict="needs_approval", score=0.8),
+        _action("llm-allowed", to="me@example.com"),
+    ]
+
+
+class _CountingBulkWrite:
+    def __init__(self, collection, error: Exception | None = None):
+        self._bulk_write = collection.bulk_write
+        self.error = error
+        self.calls: list[int] = []
+
+    async def __call__(self, operations, ordered=True, **kwargs):
+        self.calls.append(len(operations))
+        if self.error is not None:
+            raise self.error
+        return await self._bulk_write(operations, ordered=ordered, **kwargs)
+
+
+def test_results_keep_input_order_with_per_item_errors_and_one_bulk_insert(monkeypatch):
+    snapshots = _patch(monkeypatch)
+    db = FakeDatabase()
+    approvals = db[APPROVALS_COLLECTION]
+    bulk_write = approvals.bulk_write = _CountingBulkWrite(approvals)
+    actions = _mixed()
+
+    items = asyncio.run(pipeline.run_pipeline_batch(db, actions))
+
+    assert len(snapshots) == 1
+    assert [(item.index, item.action_id) for item in items] == [(i, a.action_id) for i, a in enumerate(actions)]
+    decisions = [item.result.decision if item.result else None for item in items]
+    assert decisions == ["allowed", "needs_approval", None, "blocked", "needs_approval", "needs_approval", "allowed"]
+    assert items[2].error == "RuntimeError: scorer exploded"
+    assert all(item.error is None for i, item in enumerate(items) if i != 2)
+
+    # One bulk_write with one upsert per distinct action; repeats attach to the same request.
+    assert bulk_write.calls == [2]
+    assert len(approvals.docs) == 2
+    ask_1, ask_2, ask_3 = (items[i].result.approval_id for i in (1, 4, 5))
+    assert ask_1 is not None and ask_1 == ask_2 != ask_3
+    assert {doc["occurrences"] for doc in approvals.docs if str(doc["_id"]) == ask_1} == {2}
+
+
+def test_failed_bulk_insert_turns_every_pending_item_into_an_error(monkeypatch):
+    _patch(monkeypatch)
+    db = FakeDatabase()
+    approvals = db[APPROVALS_COLLECTION]
+    approvals.bulk_write = _CountingBulkWrite(approvals, OperationFailure("not primary"))
+
+    items = asyncio.run(pipeline.run_pipeline_batch(db, _mixed()))
+
+    for i in (1, 4, 5):
+        assert items[i].result is None
+        assert items[i].error == "approval insert failed: not primary"
+    assert [items[i].result.decision for i in (0, 3, 6)] == ["allowed", "blocked", "allowed"]
+    assert items[2].error == "RuntimeError: scorer exploded"
+    assert approvals.docs == []
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    peak: list[int] = []
+    _patch(monkeypatch, peak)
+    monkeypatch.setattr(settings, "batch_max_concurrency", 3)
+    actions = [_action(str(n), n=n) for n in range(20)]
+    items = asyncio.run(pipeline.run_pipeline_batch(FakeDatabase(), actions))
+    assert [item.result.decision for item in items] == ["allowed"] * 20
+    assert max(peak) == 3
@@ -0,0 +1,86 @@
+"""Micro-batching scorer (app/llm/batcher.py): verdict matching and per-item errors."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm import client as llm_client
+from app.llm.batcher import BatchItemError, ScoreBatcher
+from app.models import Action
+
+
+def _action(n: int) -> Action:
+    return Action(action_id=f"a{n}", agent_id="bot", type="send_email", resource=f"smtp://{n}")
+
+
+class _ScriptedBatcher(ScoreBatcher):
+    """Answers each batch with `reply(actions)` instead of calling the LLM."""
+
+    def __init__(self, reply, window: float = 0.01, max_items: int = 8):
+        super().__init__(window, max_items)
+        self.reply = reply
+        self.sizes: list[int] = []
+
+    async def _call(self, actions):
+        self.sizes.append(len(actions))
+        return self.reply(actions)
+
+
+def _score_all(batcher: ScoreBatcher, count: int) -> list:
+    async def run():
+        return await asyncio.gather(*(batcher.score(_action(n)) for n in range(count)), return_exceptions=True)
+
+    return asyncio.run(run())
+
+
+def test_invalid_or_missing_verdicts_fail_only_their_action():
+    verdicts = {
+        0: {"score": 0.2, "decision": "Allow", "reason": "fine"},
+        1: {"score": 1.5, "decision": "block"},
+        2: {"score": 0.9, "decision": "maybe"},
+        4: "not an object",
+    }
+    batcher = _ScriptedBatcher(lambda actions: verdicts)
+    results = _score_all(batcher, 5)
+    assert results[0] == (0.2, "allow", "fine")
+    assert [str(e) for e in results[1:]] == [
+        "invalid score 1.5", "invalid decision 'maybe'", "no verdict for this action", "verdict is not an object",
+    ]
+    assert all(isinstance(e, BatchItemError) for e in results[1:])
+    assert batcher.stats()["item_failures"] == 4
+
+
+def test_failed_request_fails_every_action_and_full_batches_flush_early():
+    def reply(actions):
+        raise ConnectionError("provider down")
+
+    batcher = _ScriptedBatcher(reply, window=10, max_items=3)
+    results = _score_all(batcher, 6)  # would wait 10s for the window if full batches did not flush
+    assert [type(e) for e in results] == [ConnectionError] * 6
+    assert batcher.sizes == [3, 3]
+
+
+class _Completions:
+    def __init__(self, content: str):
+        self.content = content
+
+    async def create(self, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('[{"index": 1, "score": 0.5}, {"index": 0, "score": 0.1}]', {1: {"index": 1, "score": 0.5}, 0: {"index": 0, "score": 0.1}}),
+    ('{"verdicts": [{"score": 0.1}, {"score": 0.2}]}', {0: {"score": 0.1}, 1: {"score": 0.2}}),
+    ('```json\n[{"index": 0, "score": 0.1}, {"index": 0, "score": 0.9}]\n```', {0: {"index": 0, "score": 0.1}}),
+])
+def test_call_matches_verdicts_by_index_or_position(monkeypatch, content, expected):
+    monkeypatch.setattr(llm_client, "_client", SimpleNamespace(chat=SimpleNamespace(completions=_Completions(content))))
+    assert asyncio.run(ScoreBatcher(0.01, 8)._call([_action(0), _action(1)])) == expected
+
+
+def test_call_rejects_a_reply_that_is_not_an_array(monkeypatch):
+    reply = json.dumps({"score": 0.1, "decision": "allow"})
+    monkeypatch.setattr(llm_client, "_client", SimpleNamespace(chat=SimpleNamespace(completions=_Completions(reply))))
+    with pytest.raises(ValueError):
+        asyncio.run(ScoreBatcher(0.01, 8)._call([_action(0)]))
@@ -0,0 +1,126 @@
+"""Bulk approve/deny (app/approval_store.resolve_approvals and POST /approvals/bulk/*)."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.approvals import router
+from app.approval_store import resolve_approvals
+from app.config import settings
+from app.db import APPROVALS_COLLECTION, get_db
+from app.notify import get_notifier
+from app.ui.router import router as ui_router
+from tests.fakes import FakeDatabase
+
+
+async def _db_with(docs: list[dict]) -> tuple[FakeDatabase, list[str]]:
+    db = FakeDatabase()
+    result = await db[APPROVALS_COLLECTION].insert_many(docs)
+    return db, [str(oid) for oid in result.inserted_ids]
+
+
+def test_resolve_by_ids_reports_each_outcome():
+    async def run():
+        db, (pending, done) = await _db_with([
+            {"status": "pending", "agent_id": "bot"},
+            {"status": "denied", "agent_id": "bot"},
+        ])
+        missing = str(ObjectId())
+        outcomes, resolved = await resolve_approvals(db, "approved", "ops", ids=[pending, done, missing, "junk", pending])
+        return db, pending, outcomes, resolved
+
+    db, pending, outcomes, resolved = asyncio.run(run())
+    assert [(o["outcome"], o["status"]) for o in outcomes] == [
+        ("resolved", "approved"), ("already_resolved", "denied"), ("not_found", None), ("not_found", None),
+    ]
+    assert [str(doc["_id"]) for doc in resolved] == [pending]
+    doc = db[APPROVALS_COLLECTION].docs[0]
+    assert (doc["status"], doc["resolved_by"]) == ("approved", "ops")
+
+
+def test_resolve_by_query_only_touches_matching_pending():
+    async def run():
+        now = datetime.now(timezone.utc)
+        db, ids = await _db_with([
+            {"status": "pending", "agent_id": "bot", "created_at": now - timedelta(hours=2)},
+            {"status": "pending", "agent_id": "bot", "created_at": now},
+            {"status": "pending", "agent_id": "other", "created_at": now - timedelta(hours=2)},
+            {"status": "approved", "agent_id": "bot", "created_at": now - timedelta(hours=2)},
+        ])
+        query = {"agent_id": "bot", "created_at": {"$lt": now - timedelta(hours=1)}}
+        outcomes, resolved = await resolve_approvals(db, "denied", "ops", query=query)
+        return db, ids, outcomes, resolved
+
+    db, ids, outcomes, resolved = asyncio.run(run())
+    assert outcomes == [{"id": ids[0], "outcome": "resolved", "status": "denied"}]
+    assert [doc["status"] for doc in resolved] == ["denied"]
+    assert [doc["status"] for doc in db[APPROVALS_COLLECTION].docs] == ["denied", "pending", "pending", "approved"]
+
+
+def test_bulk_endpoints_validate_and_notify(monkeypatch):
+    db, ids = asyncio.run(_db_with([{"status": "pending", "agent_id": "bot"}, {"status": "pending", "agent_id": "bot"}]))
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+    published = []
+    monkeypatch.setattr(get_notifier(), "publish", published.append)
+    monkeypatch.setattr(settings, "bulk_resolve_max_ids", 2)
+
+    assert client.post("/approvals/bulk/approve", json={}).status_code == 422
+    assert client.post("/approvals/bulk/approve", json={"ids": ids * 2}).status_code == 413
+    response = client.post("/approvals/bulk/deny", json={"agent_id": "bot", "resolved_by": "ops"})
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["resolved"]) == ("denied", 2)
+    assert sorted(str(doc["_id"]) for doc in published) == sorted(ids)
+
+
+def test_filter_matching_more_than_the_cap_resolves_nothing(monkeypatch):
+    db, ids = asyncio.run(_db_with(
+        [{"status": "pending", "agent_id": "bot"} for _ in range(3)] + [{"status": "approved", "agent_id": "bot"}]
+    ))
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+    monkeypatch.setattr(get_notifier(), "publish", lambda doc: None)
+    monkeypatch.setattr(settings, "bulk_resolve_max_ids", 2)
+
+    response = client.post("/approvals/bulk/approve", json={"agent_id": "bot"})
+    assert response.status_code == 413
+    assert "More than 2 pending approvals match" in response.json()["detail"]
+    assert [doc["status"] for doc in db[APPROVALS_COLLECTION].docs] == ["pending"] * 3 + ["approved"]
+
+    monkeypatch.setattr(settings, "bulk_resolve_max_ids", 3)  # resolved approvals do not count
+    response = client.post("/approvals/bulk/approve", json={"agent_id": "bot"})
+    assert (response.status_code, response.json()["resolved"]) == (200, 3)
+
+
+def _ui_client(db) -> TestClient:
+    app = FastAPI()
+    app.include_router(ui_router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app, follow_redirects=False)
+
+
+def test_ui_bulk_rejects_oversized_selection_without_resolving(monkeypatch):
+    db, ids = asyncio.run(_db_with([{"status": "pending", "agent_id": "bot"} for _ in range(3)]))
+    monkeypatch.setattr(settings, "bulk_resolve_max_ids", 2)
+    response = _ui_client(db).post("/ui/approvals/bulk", data={"decision": "approve", "ids": ids, "status": "pending"})
+    assert response.status_code == 413
+    assert "select at most 2" in response.text
+    assert [doc["status"] for doc in db[APPROVALS_COLLECTION].docs] == ["pending"] * 3
+
+
+def test_ui_bulk_redirects_to_the_approvals_page_not_the_referer(monkeypatch):
+    db, ids = asyncio.run(_db_with([{"status": "pending", "agent_id": "bot"} for _ in range(2)]))
+    monkeypatch.setattr(get_notifier(), "publish", lambda doc: None)
+    client = _ui_client(db)
+    headers = {"Referer": "https://evil.example/phish"}
+    response = client.post("/ui/approvals/bulk", data={"decision": "deny", "ids": ids, "status": "all"}, headers=headers)
+    assert (response.status_code, response.headers["location"]) == (303, "/ui/approvals?status=all")
+    assert [doc["status"] for doc in db[APPROVALS_COLLECTION].docs] == ["denied"] * 2
+    response = client.post("/ui/approvals/bulk", data={"decision": "approve", "status": "//evil.example"}, headers=headers)
+    assert response.headers["location"] == "/ui/approvals?status=pending"
@@ -0,0 +1,103 @@
+"""Combined score-and-rewrite mode (app/llm/scorer.py score_and_rewrite) with a scripted LLM client."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import pipeline
+from app.config import settings
+from app.llm import client as llm_client
+from app.llm import scorer
+from app.llm.cache import DecisionCache
+from app.models import Action
+from app.policy.compiler import compile_policy
+
+FALLBACK = {"score": 0.6, "decision": "rewrite", "reason": "two-call verdict"}
+
+
+class _ScriptedCompletions:
+    """Answers each create() with the next reply, recording which system prompt asked."""
+
+    def __init__(self, replies: list[str]):
+        self.replies = list(replies)
+        self.calls: list[str] = []
+
+    async def create(self, messages, **kwargs):
+        system = messages[0]["content"]
+        self.calls.append("combined" if system == scorer.COMBINED_SYSTEM else "scorer" if system == scorer.SCORER_SYSTEM else "rewriter")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.replies.pop(0)))])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+    monkeypatch.setattr(settings, "llm_pipeline_mode", "combined")
+    monkeypatch.setattr(settings, "llm_batch_enabled", False)
+    monkeypatch.setattr(scorer, "_cache", DecisionCache(max_entries=100, default_ttl=60))
+
+    def script(*replies: str) -> _ScriptedCompletions:
+        completions = _ScriptedCompletions(replies)
+        monkeypatch.setattr(llm_client, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return completions
+
+    return script
+
+
+def _action() -> Action:
+    # home_address is an uncertain key word: its text is sent to the LLM to make safe.
+    return Action(action_id="a1", agent_id="bot", type="send_email", payload={"home_address": "12 Elm St", "note": "hi"})
+
+
+@pytest.mark.parametrize("reply", [
+    {"score": 1.5, "decision": "allow", "reason": "x"},
+    {"score": -0.1, "decision": "allow", "reason": "x"},
+    {"score": True, "decision": "allow", "reason": "x"},
+    {"score": "0.5", "decision": "allow", "reason": "x"},
+    {"score": 0.5, "decision": "escalate", "reason": "x"},
+    {"score": 0.5, "reason": "x"},
+    {"score": 0.5, "decision": "rewrite", "reason": "x"},
+    {"score": 0.5, "decision": "rewrite", "reason": "x", "rewrites": ["[REDACTED]"]},
+    {"score": 0.5, "decision": "rewrite", "reason": "x", "rewrites": {"payload.home_address": None}},
+    "not json at all",
+    ["score", 0.5],
+])
+def test_invalid_combined_reply_falls_back_to_two_calls(llm, reply):
+    completions = llm(reply if isinstance(reply, str) else json.dumps(reply), json.dumps(FALLBACK))
+    before = scorer._combined_fallbacks.value()
+    verdict, rewritten = asyncio.run(scorer.score_and_rewrite(_action()))
+    assert verdict == (0.6, "rewrite", "two-call verdict")
+    assert rewritten is None  # the pipeline still has to call rewrite_action
+    assert completions.calls == ["combined", "scorer"]
+    assert scorer._combined_fallbacks.value() == before + 1
+
+
+def test_fallback_rewrite_verdict_runs_the_rewriter(llm):
+    completions = llm("{}", json.dumps(FALLBACK), json.dumps({"payload.home_address": "[ADDRESS]"}))
+    response, doc = asyncio.run(pipeline.decide(_action(), compile_policy([])))
+    assert completions.calls == ["combined", "scorer", "rewriter"]
+    assert (response.decision, response.reason, doc) == ("rewritten", "two-call verdict", None)
+    assert response.rewritten_payload == {"home_address": "[ADDRESS]", "note": "hi"}
+
+
+def test_valid_combined_reply_rewrites_and_caches_the_verdict(llm):
+    reply = {"score": 0.4, "decision": "rewrite", "reason": "pii", "rewrites": {"payload.home_address": "[ADDRESS]"}}
+    completions = llm(json.dumps(reply))
+    before = scorer._combined_fallbacks.value()
+
+    async def run():
+        first = await pipeline.decide(_action(), compile_policy([]))
+        # A cached rewrite verdict comes without a payload: the pipeline calls the rewriter.
+        return first, await scorer.score_and_rewrite(_action())
+
+    (response, _), second = asyncio.run(run())
+    assert (response.decision, response.score, response.reason) == ("rewritten", 0.4, "pii")
+    assert response.rewritten_payload == {"home_address": "[ADDRESS]", "note": "hi"}
+    assert second == ((0.4, "rewrite", "pii"), None)
+    assert completions.calls == ["combined"]
+    assert scorer._combined_fallbacks.value() == before
+
+
+def test_non_rewrite_verdict_needs_no_rewrites(llm):
+    llm(json.dumps({"score": 0.1, "decision": "allow", "reason": "fine"}))
+    assert asyncio.run(scorer.score_and_rewrite(_action())) == ((0.1, "allow", "fine"), None)
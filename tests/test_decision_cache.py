@@ -0,0 +1,50 @@
+"""LLM decision cache (app/llm/cache.py): LRU bound, per-decision TTLs and generation invalidation."""
+from app.llm.cache import DecisionCache
+
+ALLOW = (0.1, "allow", "ok")
+BLOCK = (0.9, "block", "bad")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DecisionCache(max_entries=2, default_ttl=60, clock=_Clock())
+    cache.put("a", ALLOW, None)
+    cache.put("b", ALLOW, None)
+    assert cache.get("a", None) == ALLOW  # a is now the most recent
+    cache.put("c", ALLOW, None)
+    assert cache.get("b", None) is None
+    assert cache.get("a", None) == ALLOW and cache.get("c", None) == ALLOW
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_their_decision_ttl():
+    clock = _Clock()
+    cache = DecisionCache(max_entries=10, default_ttl=60, decision_ttls={"block": 600, "needs_approval": 0}, clock=clock)
+    cache.put("allow", ALLOW, None)
+    cache.put("block", BLOCK, None)
+    cache.put("ask", (0.8, "needs_approval", "?"), None)  # TTL 0: never cached
+    clock.now = 59.9
+    assert cache.get("allow", None) == ALLOW
+    clock.now = 60
+    assert cache.get("allow", None) is None
+    assert cache.get("block", None) == BLOCK
+    assert cache.get("ask", None) is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_generation_change_drops_everything_and_ignores_stale_puts():
+    cache = DecisionCache(max_entries=10, default_ttl=60, clock=_Clock())
+    cache.get("a", (1, "model"))
+    cache.put("a", ALLOW, (1, "model"))
+    assert cache.get("a", (2, "model")) is None  # policy version changed
+    cache.put("b", ALLOW, (1, "model"))  # computed before the change
+    assert cache.get("b", (2, "model")) is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["invalidations"], stats["hits"]) == (0, 1, 0)
@@ -0,0 +1,107 @@
+"""Keyset pagination and change-stream sync against the in-process FakeDatabase."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import OperationFailure
+
+from app.config import settings
+from app.db import APPROVALS_COLLECTION, POLICIES_COLLECTION
+from app.notify import get_notifier, start_approval_notifier, stop_approval_notifier
+from app.pagination import NEWEST_FIRST, page_query
+from app.policy import store
+from tests.fakes import FakeDatabase
+
+
+def test_keyset_pages_cover_every_document_once():
+    async def run():
+        collection = FakeDatabase()["items"]
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(25):
+            # Runs of equal timestamps exercise the _id tie-break.
+            await collection.insert_one({"n": i, "kind": "a" if i % 5 else "b", "created_at": base + timedelta(seconds=i // 3)})
+        seen, after = [], None
+        while True:
+            query, after = await page_query(collection, {"kind": "a"}, 6, after)
+            seen.extend(await collection.find(query).sort(NEWEST_FIRST).to_list(length=None))
+            if after is None:
+                return seen
+
+    seen = asyncio.run(run())
+    expected = sorted((d for d in range(25) if d % 5), key=lambda i: (i // 3, i), reverse=True)
+    assert [doc["n"] for doc in seen] == expected
+
+
+def test_policy_snapshot_follows_change_stream(monkeypatch):
+    monkeypatch.setattr(settings, "policy_change_stream", True)
+
+    async def run():
+        db = FakeDatabase()
+        await store.start_policy_sync(db)
+        try:
+            await asyncio.sleep(0)
+            assert store.sync_mode() == "change_stream"
+            rules = [{"effect": "deny", "match": {"action_type": "exec"}}]
+            await db[POLICIES_COLLECTION].insert_one({"name": "p", "kind": "denylist", "definition": {"rules": rules}})
+            for _ in range(20):
+                await asyncio.sleep(0)
+            return len(store.current_snapshot().policy)
+        finally:
+            await store.stop_policy_sync()
+
+    assert asyncio.run(run()) == 1
+
+
+class _FlakyWatchDatabase(FakeDatabase):
+    """watch() fails the first `failures` times, as on a replica set mid-election."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def watch(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise OperationFailure("not primary")
+        return super().watch(*args, **kwargs)
+
+
+def test_policy_sync_retries_change_stream_after_failure(monkeypatch):
+    monkeypatch.setattr(settings, "policy_change_stream", True)
+    monkeypatch.setattr(settings, "policy_poll_interval_seconds", 0.001)
+    monkeypatch.setattr(settings, "policy_change_stream_retry_seconds", 0.01)
+
+    async def run():
+        db = _FlakyWatchDatabase(failures=2)
+        await store.start_policy_sync(db)
+        try:
+            await asyncio.sleep(0.005)
+            modes = [store.sync_mode()]
+            for _ in range(100):
+                await asyncio.sleep(0.005)
+                if store.sync_mode() == "change_stream":
+                    break
+            modes.append(store.sync_mode())
+            return modes, db.failures
+        finally:
+            await store.stop_policy_sync()
+
+    assert asyncio.run(run()) == (["polling", "change_stream"], 0)
+
+
+def test_approval_waiter_woken_by_change_stream():
+    async def run():
+        db = FakeDatabase()
+        approvals = db[APPROVALS_COLLECTION]
+        oid = (await approvals.insert_one({"status": "pending", "created_at": datetime.now(timezone.utc)})).inserted_id
+        await start_approval_notifier(db)
+        try:
+            waiter = asyncio.create_task(get_notifier().wait(db, oid, timeout=5))
+            await asyncio.sleep(0.01)
+            # Resolved behind the API's back, as by another worker.
+            await approvals.update_many({"_id": oid}, {"$set": {"status": "approved", "resolved_by": "ops"}})
+            return await asyncio.wait_for(waiter, 1)
+        finally:
+            await stop_approval_notifier()
+
+    event = asyncio.run(run())
+    assert event["status"] == "approved"
@@ -0,0 +1,91 @@
+"""The in-process MongoDB stand-in (tests/fakes.py) itself: queries, cursors, bulk writes and change streams."""
+import asyncio
+
+from pymongo import UpdateOne
+
+from tests.fakes import FakeDatabase
+
+
+async def _filled(n: int = 10):
+    db = FakeDatabase()
+    await db["items"].insert_many([{"n": i, "kind": "even" if i % 2 == 0 else "odd", "meta": {"rank": i % 3}} for i in range(n)])
+    return db
+
+
+def _ns(docs):
+    return [doc["n"] for doc in docs]
+
+
+def test_query_operators_and_dotted_paths():
+    async def run():
+        items = (await _filled())["items"]
+        queries = [
+            {"$or": [{"n": {"$lt": 2}}, {"n": {"$gte": 8}}]},
+            {"$and": [{"kind": "odd"}, {"n": {"$gt": 3}}]},
+            {"kind": "even", "$or": [{"n": 0}, {"meta.rank": 1}]},
+            {"n": {"$in": [1, 2, 3], "$ne": 2}},
+            {"n": {"$nin": [0, 1]}, "meta.rank": 0},
+            {"missing": {"$exists": False}, "n": {"$lte": 1}},
+        ]
+        return [_ns(await items.find(q).sort("n", 1).to_list(length=None)) for q in queries]
+
+    assert asyncio.run(run()) == [[0, 1, 8, 9], [5, 7, 9], [0, 4], [1, 3], [3, 6, 9], [0, 1]]
+
+
+def test_cursor_sort_skip_limit():
+    async def run():
+        items = (await _filled())["items"]
+        by_kind = await items.find().sort([("kind", 1), ("n", -1)]).skip(3).limit(4).to_list(length=None)
+        tail = await items.find({"kind": "odd"}).sort("n", -1).skip(4).to_list(length=None)
+        return _ns(by_kind), _ns(tail)
+
+    assert asyncio.run(run()) == ([2, 0, 9, 7], [1])
+
+
+def test_bulk_write_upserts_and_updates():
+    async def run():
+        items = (await _filled(3))["items"]
+        result = await items.bulk_write([
+            UpdateOne({"n": 1}, {"$inc": {"hits": 1}}, upsert=True),
+            UpdateOne({"n": 7}, {"$set": {"kind": "new"}, "$setOnInsert": {"hits": 0}}, upsert=True),
+            UpdateOne({"n": 8}, {"$set": {"kind": "ignored"}}),
+        ])
+        return result, await items.find_one({"n": 1}), await items.find_one({"n": 7}), await items.find_one({"n": 8})
+
+    result, updated, inserted, missing = asyncio.run(run())
+    assert (result.matched_count, result.upserted_count) == (1, 1)
+    assert updated["hits"] == 1
+    assert inserted["kind"] == "new" and inserted["hits"] == 0
+    assert missing is None
+
+
+def test_change_streams_filter_by_collection_and_match():
+    async def run():
+        db = FakeDatabase()
+        everything = db.watch()
+        inserts = db["items"].watch([{"$match": {"operationType": "insert"}}])
+        looked_up = db["items"].watch(full_document="updateLookup")
+        await db["items"].insert_one({"n": 1})
+        await db["other"].insert_one({"n": 2})
+        await db["items"].update_many({"n": 1}, {"$set": {"seen": True}})
+        inserts.close()
+        await db["items"].insert_one({"n": 3})  # after close: not delivered
+
+        def drain(stream):
+            events = []
+            while not stream._queue.empty():
+                events.append(stream._queue.get_nowait())
+            return events
+
+        async with looked_up:
+            first = await anext(looked_up)
+        return drain(everything), drain(inserts), first, drain(looked_up)
+
+    everything, inserts, first, rest = asyncio.run(run())
+    assert [(e["ns"]["coll"], e["operationType"]) for e in everything] == [
+        ("items", "insert"), ("other", "insert"), ("items", "update"), ("items", "insert"),
+    ]
+    assert "fullDocument" not in everything[2]
+    assert [e["fullDocument"]["n"] for e in inserts] == [1]
+    assert first["fullDocument"] == {"_id": first["documentKey"]["_id"], "n": 1}
+    assert [e["fullDocument"].get("seen") for e in rest] == [True, None]
@@ -0,0 +1,122 @@
+"""Adaptive LLM concurrency limit (app/llm/limiter.py): AIMD, queue bound and expected-wait shedding."""
+import asyncio
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.llm.limiter import AdaptiveLimiter, Overloaded, deadline
+
+
+def _limiter(initial: int = 4, max_queue: int = 10) -> AdaptiveLimiter:
+    return AdaptiveLimiter(initial=initial, min_limit=1, max_limit=16, target_latency=1.0, max_queue=max_queue)
+
+
+def test_fast_calls_raise_the_limit_by_about_one_per_limit_calls():
+    limiter = _limiter()
+
+    async def run():
+        for _ in range(4):
+            async with limiter.slot():
+                pass
+
+    asyncio.run(run())
+    assert 4.9 < limiter.limit < 5  # 4 + 1/4 + 1/4.25 + ...
+    asyncio.run(run())
+    assert int(limiter.limit) == 5
+
+
+def test_slow_or_failed_calls_halve_the_limit_once_per_call_duration():
+    limiter = _limiter(initial=16)
+    limiter._observe(2.0, ok=True)  # over the 1s target
+    assert limiter.limit == 8
+    limiter._observe(0.1, ok=False)  # within the EWMA of the previous decrease
+    assert limiter.limit == 8
+    limiter._last_decrease -= 10
+    limiter._observe(0.1, ok=False)
+    assert limiter.limit == 4
+    for _ in range(5):
+        limiter._last_decrease -= 10
+        limiter._observe(0.1, ok=False)
+    assert limiter.limit == 1  # min_limit
+
+
+def test_errors_and_timeouts_in_a_slot_count_as_failures():
+    limiter = _limiter(initial=8)
+
+    async def fail():
+        async with limiter.slot():
+            raise RuntimeError("provider error")
+
+    async def too_slow():
+        with deadline(0.01):
+            async with limiter.slot():
+                await asyncio.sleep(1)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(fail())
+    assert limiter.limit == 4
+    limiter._last_decrease -= 10
+    with pytest.raises(Overloaded) as e:
+        asyncio.run(too_slow())
+    assert e.value.reason == "deadline_exceeded"
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_full_queue_sheds_and_counts_live_waiters_only():
+    limiter = _limiter(initial=1, max_queue=2)
+
+    async def run():
+        await limiter._acquire()  # the only slot
+        waiters = [asyncio.create_task(limiter._acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as e:
+            await limiter._acquire()
+        assert e.value.reason == "queue_full"
+        waiters[0].cancel()
+        await asyncio.gather(waiters[0], return_exceptions=True)
+        waiters.append(asyncio.create_task(limiter._acquire()))  # the cancelled waiter freed its place
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 2
+        for waiter in waiters[1:]:
+            limiter._release()
+            await waiter
+        limiter._release()
+
+    asyncio.run(run())
+    assert limiter.shed["queue_full"] == 1
+    assert (limiter.in_flight, limiter.stats()["queued"]) == (0, 0)
+
+
+def test_expected_wait_past_the_deadline_is_shed_up_front():
+    limiter = _limiter(initial=1)
+    limiter._latency = 1.0  # each call takes about a second
+
+    async def run():
+        await limiter._acquire()
+        started = time.monotonic()
+        with deadline(0.5), pytest.raises(Overloaded) as e:
+            await limiter._acquire()
+        assert e.value.reason == "deadline"
+        assert time.monotonic() - started < 0.1  # refused, not queued until the deadline
+        with deadline(5):
+            waiter = asyncio.create_task(limiter._acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 1
+        limiter._release()
+        await waiter
+        limiter._release()
+
+    asyncio.run(run())
+    assert limiter.shed["deadline"] == 1
+
+
+@pytest.mark.parametrize("decision, valid", [("needs_approval", True), ("block", True), ("allow", False), ("blocked", False)])
+def test_overload_decision_is_validated(decision, valid):
+    if valid:
+        assert Settings(llm_overload_decision=decision).llm_overload_decision == decision
+    else:
+        with pytest.raises(ValidationError):
+            Settings(llm_overload_decision=decision)
@@ -0,0 +1,141 @@
+"""Per-caller deadlines for shared LLM work: single-flight (app/llm/singleflight.py) and the batcher (app/llm/batcher.py)."""
+import asyncio
+import time
+
+import pytest
+
+from app.llm import limiter as limiter_module
+from app.llm.batcher import ScoreBatcher
+from app.llm.limiter import AdaptiveLimiter, Overloaded, deadline, remaining
+from app.llm.singleflight import SingleFlight
+from app.models import Action
+
+CALL_SECONDS = 0.3
+
+
+async def _slow_verdict():
+    assert remaining() is None  # shared work never runs under one caller's deadline
+    await asyncio.sleep(CALL_SECONDS)
+    return 0.1, "allow", "ok"
+
+
+async def _timed(call, seconds):
+    started = time.monotonic()
+    with deadline(seconds):
+        try:
+            result = await call()
+        except Overloaded as e:
+            result = e.reason
+    return result, time.monotonic() - started
+
+
+async def _leader_and_follower(call, leader_deadline, follower_deadline):
+    leader = asyncio.create_task(_timed(call, leader_deadline))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(_timed(call, follower_deadline))
+    return await leader, await follower
+
+
+@pytest.mark.parametrize("leader_deadline, follower_deadline", [(5, 0.05), (0.05, 5)])
+def test_single_flight_waiters_keep_their_own_deadline(leader_deadline, follower_deadline):
+    flights = SingleFlight()
+
+    async def run():
+        return await _leader_and_follower(lambda: flights.do("k", _slow_verdict), leader_deadline, follower_deadline)
+
+    outcomes = asyncio.run(run())
+    assert flights.executions == 1 and flights.coalesced == 1
+    for (result, took), limit in zip(outcomes, (leader_deadline, follower_deadline)):
+        if limit < CALL_SECONDS:
+            assert result == "deadline_exceeded"
+            assert took < CALL_SECONDS
+        else:
+            assert result == (0.1, "allow", "ok")
+
+
+def test_single_flight_cancels_call_when_every_waiter_times_out():
+    flights = SingleFlight()
+    finished = []
+
+    async def call():
+        await asyncio.sleep(CALL_SECONDS)
+        finished.append(True)
+
+    async def run():
+        await asyncio.gather(_timed(lambda: flights.do("k", call), 0.02), _timed(lambda: flights.do("k", call), 0.02))
+        await asyncio.sleep(CALL_SECONDS)
+
+    asyncio.run(run())
+    assert finished == []
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_abandoned_call_counts_as_slow_for_the_limiter(monkeypatch):
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=16, target_latency=1.0, max_queue=10)
+    monkeypatch.setattr(limiter_module, "_limiter", limiter)
+    flights = SingleFlight()
+
+    async def call():
+        async with limiter.slot():
+            await asyncio.sleep(CALL_SECONDS)
+
+    async def run():
+        await asyncio.gather(_timed(lambda: flights.do("k", call), 0.02), _timed(lambda: flights.do("k", call), 0.02))
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["limit"] == 4  # halved
+    assert stats["in_flight"] == 0
+    assert stats["latency_ewma_ms"] is not None
+    assert stats["shed_deadline_exceeded"] == 2
+
+
+class _SlowBatcher(ScoreBatcher):
+    def __init__(self):
+        super().__init__(window=0.01, max_items=8)
+        self.calls = 0
+        self.completed = 0
+
+    async def _call(self, actions):
+        self.calls += 1
+        assert remaining() is None
+        await asyncio.sleep(CALL_SECONDS)
+        self.completed += 1
+        return {i: {"score": 0.1, "decision": "allow", "reason": "ok"} for i in range(len(actions))}
+
+
+def _action(n: int) -> Action:
+    return Action(action_id=f"a{n}", agent_id="bot", type="read_file", resource=f"/tmp/{n}")
+
+
+@pytest.mark.parametrize("first_deadline, second_deadline", [(5, 0.05), (0.05, 5)])
+def test_batched_callers_keep_their_own_deadline(first_deadline, second_deadline):
+    batcher = _SlowBatcher()
+
+    async def run():
+        first = asyncio.create_task(_timed(lambda: batcher.score(_action(1)), first_deadline))
+        second = asyncio.create_task(_timed(lambda: batcher.score(_action(2)), second_deadline))
+        return await first, await second
+
+    outcomes = asyncio.run(run())
+    assert batcher.calls == 1
+    for (result, took), limit in zip(outcomes, (first_deadline, second_deadline)):
+        if limit < CALL_SECONDS:
+            assert result == "deadline_exceeded"
+            assert took < CALL_SECONDS
+        else:
+            assert result == (0.1, "allow", "ok")
+
+
+def test_batch_is_cancelled_when_every_caller_times_out():
+    batcher = _SlowBatcher()
+
+    async def run():
+        await asyncio.gather(*(_timed(lambda n=n: batcher.score(_action(n)), 0.05) for n in range(3)))
+        await asyncio.sleep(CALL_SECONDS)
+
+    asyncio.run(run())
+    assert batcher.calls == 1
+    assert batcher.completed == 0
+    assert batcher.stats()["in_flight_batches"] == 0
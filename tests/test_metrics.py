@@ -0,0 +1,83 @@
+"""Prometheus text exposition (app/metrics.py) and the pipeline's stage timer and decision paths."""
+import pytest
+
+from app import pipeline
+from app.metrics import Counter, Gauge, Histogram, Registry, stats_collector
+from app.models import EvaluateResponse
+
+
+def test_registry_renders_counters_gauges_and_histograms():
+    registry = Registry()
+    requests = registry.register(Counter("t_requests_total", "Requests", ["path"]))
+    in_flight = registry.register(Gauge("t_in_flight", "In flight"))
+    latency = registry.register(Histogram("t_seconds", "Latency", ["stage"], buckets=(0.1, 1.0)))
+    requests.inc("/a")
+    requests.inc("/a", amount=2)
+    requests.inc('say "hi"\n')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.1, 0.5, 7.0):
+        latency.observe(value, "score")
+    registry.register_collector(stats_collector("t_cache", lambda: {"hits": 3, "enabled": True, "mode": "lru"}, "Cache"))
+
+    assert registry.render() == "\n".join([
+        "# HELP t_requests_total Requests",
+        "# TYPE t_requests_total counter",
+        't_requests_total{path="/a"} 3.0',
+        't_requests_total{path="say \\"hi\\"\\n"} 1.0',
+        "# HELP t_in_flight In flight",
+        "# TYPE t_in_flight gauge",
+        "t_in_flight 1.0",
+        "# HELP t_seconds Latency",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{stage="score",le="0.1"} 2',  # le is inclusive: 0.1 lands in the 0.1 bucket
+        't_seconds_bucket{stage="score",le="1.0"} 3',
+        't_seconds_bucket{stage="score",le="+Inf"} 4',
+        't_seconds_sum{stage="score"} 7.65',
+        't_seconds_count{stage="score"} 4',
+        "# HELP t_cache_hits Cache (hits)",  # bools and strings are skipped
+        "# TYPE t_cache_hits gauge",
+        "t_cache_hits 3",
+    ]) + "\n"
+
+
+def test_unlabelled_histogram_and_gauge_set():
+    latency = Histogram("t_seconds", "Latency", buckets=(1.0,))
+    latency.observe(2.0)
+    assert latency.render()[2:] == ['t_seconds_bucket{le="1.0"} 0', 't_seconds_bucket{le="+Inf"} 1', "t_seconds_sum 2.0", "t_seconds_count 1"]
+    level = Gauge("t_level", "Level", ["queue"])
+    level.set(5, "audit")
+    assert level.value("audit") == 5 and level.value("other") == 0.0
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = pipeline.StageTimer()
+    started = timer.record("policy", timer.started)
+    timer.record("score", started)
+    timer.record("score", started)
+    assert list(timer.stages) == ["policy", "score"]
+    assert all(seconds >= 0 for seconds in timer.stages.values())
+
+
+def _response(policy_decision: str, decision: str, reason: str = "") -> EvaluateResponse:
+    return EvaluateResponse(action_id="a", policy_decision=policy_decision, decision=decision, reason=reason)
+
+
+@pytest.mark.parametrize("policy_decision, decision, reason, path", [
+    ("allowed", "allowed", "policy allow", "policy_allow"),
+    ("denied", "blocked", "policy deny", "policy_deny"),
+    ("unknown", "blocked", "prescorer: aws_access_key in payload.key", "prescore_block"),
+    ("unknown", "needs_approval", "prescorer: dotenv in resource", "prescore_needs_approval"),
+    ("unknown", "allowed", "looks fine", "llm_allow"),
+    ("unknown", "blocked", "exfiltration", "llm_block"),
+    ("unknown", "needs_approval", "external send", "llm_needs_approval"),
+    ("unknown", "rewritten", "pii", "llm_rewrite"),
+    ("unknown", "needs_approval", "overloaded: queue full", "llm_overload"),
+    ("unknown", "blocked", "overloaded: queue full", "llm_overload"),
+    ("unknown", "needs_approval", "scorer error: timeout", "scorer_error"),
+    ("unknown", "allowed", "reused approval 65f0 (approved by ops)", "approval_reused"),
+    ("unknown", "escalated", "new decision", "other"),
+])
+def test_decision_path_labels(policy_decision, decision, reason, path):
+    assert pipeline._path(_response(policy_decision, decision, reason)) == path
@@ -0,0 +1,80 @@
+"""Streaming NDJSON evaluate (app/api/decide.py): line splitting across chunks and the in-flight window."""
+import asyncio
+import json
+
+from app.api import decide
+from app.config import settings
+from app.models import Action, EvaluateResponse
+
+
+class _Request:
+    """The part of starlette's Request the NDJSON reader uses: the body as chunks."""
+
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+async def _lines(chunks: list[bytes]) -> list[tuple[int, bytes | None]]:
+    return [item async for item in decide._ndjson_lines(_Request(chunks))]
+
+
+def test_lines_split_across_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "ndjson_max_line_bytes", 8)
+    chunks = [b'{"a"', b':1}\n\n  \n{"b":2}\n', b"x" * 5, b"x" * 5 + b"\nshort\n", b"toolongtail"]
+    assert asyncio.run(_lines(chunks)) == [
+        (1, b'{"a":1}'),
+        (4, b'{"b":2}'),
+        (5, None),  # 10 bytes, split over two chunks
+        (6, b"short"),
+        (7, None),  # unterminated last line, also too long
+    ]
+
+
+def test_unterminated_last_line_is_kept():
+    assert asyncio.run(_lines([b'{"a":1}\n{"b"', b":2}"])) == [(1, b'{"a":1}'), (2, b'{"b":2}')]
+
+
+def _action_line(n: int) -> bytes:
+    return Action(action_id=str(n), agent_id="bot", type="read_file", resource="/tmp/x").model_dump_json().encode() + b"\n"
+
+
+def _run_stream(monkeypatch, body: list[bytes], ordered: bool, window: int) -> tuple[list[dict], int]:
+    active, peak = 0, 0
+
+    async def fake_pipeline(db, action, policy, source):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001 * (10 - int(action.action_id) % 10))  # later actions finish first
+        active -= 1
+        return EvaluateResponse(action_id=action.action_id, policy_decision="allowed", decision="allowed", reason="policy allow")
+
+    async def fake_snapshot(db):
+        return type("Snapshot", (), {"policy": None})()
+
+    monkeypatch.setattr(decide, "run_pipeline", fake_pipeline)
+    monkeypatch.setattr(decide, "get_snapshot", fake_snapshot)
+
+    async def run():
+        return [json.loads(line) async for line in decide._evaluate_ndjson(None, _Request(body), ordered, window)]
+
+    return asyncio.run(run()), peak
+
+
+def test_ordered_stream_keeps_input_order_within_window(monkeypatch):
+    body = [b"".join(_action_line(n) for n in range(10)), b"not json\n", _action_line(10)]
+    out, peak = _run_stream(monkeypatch, body, ordered=True, window=3)
+    assert [o.get("action_id") for o in out] == [str(n) for n in range(10)] + [None, "10"]
+    assert out[10]["line"] == 11 and out[10]["error"].startswith("invalid action")
+    assert peak <= 3
+
+
+def test_unordered_stream_returns_everything_within_window(monkeypatch):
+    out, peak = _run_stream(monkeypatch, [b"".join(_action_line(n) for n in range(10))], ordered=False, window=4)
+    assert sorted(int(o["action_id"]) for o in out) == list(range(10))
+    assert [o["action_id"] for o in out] != [str(n) for n in range(10)]  # finish order, not input order
+    assert peak <= 4
@@ -0,0 +1,142 @@
+"""Approval waiters, SSE subscriptions and change-stream sync (app/notify.py) against the FakeDatabase."""
+import asyncio
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.config import settings
+from app.db import APPROVALS_COLLECTION
+from app.notify import ApprovalNotifier, get_notifier, start_approval_notifier, stop_approval_notifier
+from tests.fakes import FakeDatabase
+
+
+async def _pending(db) -> ObjectId:
+    result = await db[APPROVALS_COLLECTION].insert_one({"status": "pending", "created_at": datetime.now(timezone.utc)})
+    return result.inserted_id
+
+
+def test_wait_times_out_with_the_pending_state():
+    async def run():
+        db = FakeDatabase()
+        notifier = ApprovalNotifier()
+        oid = await _pending(db)
+        event = await notifier.wait(db, oid, timeout=0.01)
+        return event, notifier.stats()["waiters"]
+
+    event, waiters = asyncio.run(run())
+    assert event["status"] == "pending"
+    assert waiters == 0  # the timed-out waiter is unregistered
+
+
+def test_wait_is_woken_by_publish():
+    async def run():
+        db = FakeDatabase()
+        notifier = ApprovalNotifier()
+        oid = await _pending(db)
+        waiter = asyncio.create_task(notifier.wait(db, oid, timeout=5))
+        await asyncio.sleep(0.01)
+        notifier.publish({"_id": oid, "status": "denied", "resolved_by": "ops"})
+        return await asyncio.wait_for(waiter, 1)
+
+    event = asyncio.run(run())
+    assert (event["status"], event["resolved_by"]) == ("denied", "ops")
+
+
+def test_wait_returns_resolved_or_missing_approvals_without_waiting():
+    async def run():
+        db = FakeDatabase()
+        notifier = ApprovalNotifier()
+        oid = await _pending(db)
+        await db[APPROVALS_COLLECTION].update_many({"_id": oid}, {"$set": {"status": "approved"}})
+        return await notifier.wait(db, oid, timeout=5), await notifier.wait(db, ObjectId(), timeout=5)
+
+    resolved, missing = asyncio.run(run())
+    assert resolved["status"] == "approved"
+    assert missing is None
+
+
+class _CountingCollection:
+    def __init__(self, collection):
+        self._collection = collection
+        self.queries = []
+
+    def find(self, query=None, projection=None, **kwargs):
+        self.queries.append(query)
+        return self._collection.find(query, projection, **kwargs)
+
+
+def test_concurrent_waiters_share_one_lookup():
+    async def run():
+        db = FakeDatabase()
+        oids = [await _pending(db) for _ in range(5)]
+        counting = _CountingCollection(db[APPROVALS_COLLECTION])
+        notifier = ApprovalNotifier()
+        events = await asyncio.gather(*(notifier.wait({APPROVALS_COLLECTION: counting}, oid, timeout=0.01) for oid in oids + oids[:1]))
+        return events, counting.queries, notifier.lookup_queries
+
+    events, queries, lookups = asyncio.run(run())
+    assert [e["status"] for e in events] == ["pending"] * 6
+    assert lookups == 1
+    assert len(queries) == 1 and len(queries[0]["_id"]["$in"]) == 5
+
+
+def test_publish_delivers_each_resolution_once_and_drops_overflowing_subscribers(monkeypatch):
+    monkeypatch.setattr(settings, "approval_events_queue_size", 2)
+
+    async def run():
+        notifier = ApprovalNotifier()
+        slow, fast = notifier.subscribe(), notifier.subscribe()
+        oids = [ObjectId() for _ in range(3)]
+        notifier.publish({"_id": oids[0], "status": "pending"})  # not a resolution
+        for oid in oids:
+            notifier.publish({"_id": oid, "status": "approved"})
+            notifier.publish({"_id": oid, "status": "approved"})  # the change stream echoes the handler
+            if not fast.queue.empty():
+                fast.queue.get_nowait()
+        return slow, fast, notifier.stats()
+
+    slow, fast, stats = asyncio.run(run())
+    assert slow.overflowed and slow.queue.qsize() == 2
+    assert not fast.overflowed
+    assert (stats["published"], stats["subscribers"], stats["dropped_subscribers"]) == (3, 1, 1)
+
+
+def test_change_stream_is_retried_after_failure(monkeypatch):
+    monkeypatch.setattr(settings, "approval_wait_poll_interval_seconds", 0.001)
+    monkeypatch.setattr(settings, "approval_change_stream_retry_seconds", 0.01)
+
+    async def run():
+        db = FakeDatabase()
+        approvals = db[APPROVALS_COLLECTION]
+        watch, failures = approvals.watch, [2]
+
+        def flaky_watch(*args, **kwargs):
+            if failures[0]:
+                failures[0] -= 1
+                raise OperationFailure("not primary")
+            return watch(*args, **kwargs)
+
+        approvals.watch = flaky_watch
+        oid = await _pending(db)
+        await start_approval_notifier(db)
+        try:
+            await asyncio.sleep(0.005)
+            modes = [get_notifier().stats()["sync_mode"]]
+            for _ in range(100):
+                await asyncio.sleep(0.005)
+                if get_notifier().stats()["sync_mode"] == "change_stream":
+                    break
+            modes.append(get_notifier().stats()["sync_mode"])
+            sub = get_notifier().subscribe()
+            try:
+                # Resolved on another worker, with no local waiter: only the change stream carries it.
+                await approvals.update_many({"_id": oid}, {"$set": {"status": "approved"}})
+                event = await asyncio.wait_for(sub.queue.get(), 1)
+            finally:
+                get_notifier().unsubscribe(sub)
+            return modes, failures[0], event["id"] == str(oid)
+        finally:
+            await stop_approval_notifier()
+
+    assert asyncio.run(run()) == (["polling", "change_stream"], 0, True)
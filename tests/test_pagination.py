@@ -0,0 +1,45 @@
+"""Keyset cursors and the page boundary probe (app/pagination.py)."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.pagination import NEWEST_FIRST, decode_cursor, encode_cursor, page_query
+from tests.fakes import FakeDatabase
+
+
+def test_cursor_round_trips_at_millisecond_precision():
+    oid = ObjectId()
+    at = datetime(2026, 3, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+    token = encode_cursor(at, oid)
+    assert "=" not in token
+    assert decode_cursor(token) == (at.replace(microsecond=123000), oid)
+    # Motor returns naive UTC datetimes: same cursor.
+    assert encode_cursor(at.replace(tzinfo=None), oid) == token
+
+
+@pytest.mark.parametrize("token", ["", "bm9wZQ", encode_cursor(datetime.now(timezone.utc), ObjectId())[:-3], "%%%"])
+def test_malformed_cursor_raises_value_error(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+async def _pages(count: int, limit: int) -> list[list[int]]:
+    collection = FakeDatabase()["items"]
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for n in range(count):
+        await collection.insert_one({"n": n, "created_at": base + timedelta(milliseconds=n)})
+    pages, after = [], None
+    while True:
+        query, after = await page_query(collection, {}, limit, after)
+        pages.append([d["n"] for d in await collection.find(query).sort(NEWEST_FIRST).to_list(length=None)])
+        if after is None:
+            return pages
+
+
+@pytest.mark.parametrize("count, sizes", [(0, [0]), (3, [3]), (5, [5]), (6, [5, 1]), (10, [5, 5]), (11, [5, 5, 1])])
+def test_boundary_probe_knows_the_last_page(count, sizes):
+    pages = asyncio.run(_pages(count, 5))
+    assert [len(page) for page in pages] == sizes
+    assert [n for page in pages for n in page] == list(reversed(range(count)))
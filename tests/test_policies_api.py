@@ -0,0 +1,118 @@
+"""Policy API (app/api/policies.py): writes refresh the in-memory snapshot and bump its version; per-rule stats."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.policies import router
+from app.config import settings
+from app.db import POLICY_META_COLLECTION, get_db
+from app.models import Action
+from app.policy import store
+from app.policy.engine import evaluate
+from tests.fakes import FakeDatabase
+
+DENY_ETC = {"rules": [{"effect": "deny", "match": {"resource_pattern": "/etc/*"}}]}
+ALLOW_TMP = {"rules": [
+    {"effect": "allow", "match": {"action_type": "read_file", "resource_pattern": "/tmp/*"}},
+    {"effect": "allow", "match": {"action_type": "list_dir", "resource_pattern": "/tmp/*"}},
+]}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(store, "_snapshot", None)
+    db = FakeDatabase()
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app), db
+
+
+def _snapshot(client: TestClient) -> dict:
+    response = client.get("/policies/snapshot")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_snapshot_before_the_first_load(api):
+    client, _ = api
+    assert _snapshot(client) == {"version": 0, "refreshed_at": None, "rule_count": 0, "sync_mode": "stopped"}
+
+
+def test_create_update_and_delete_bump_the_snapshot_version(api):
+    client, db = api
+    created = client.post("/policies", json={"name": "etc", "kind": "denylist", "definition": DENY_ETC})
+    assert created.status_code == 201
+    policy_id = created.json()["id"]
+    first = _snapshot(client)
+    assert (first["version"], first["rule_count"]) == (1, 1)
+    assert first["refreshed_at"] is not None
+
+    updated = client.put(f"/policies/{policy_id}", json={"name": "tmp", "kind": "allowlist", "definition": ALLOW_TMP})
+    assert updated.status_code == 200
+    assert (updated.json()["name"], updated.json()["version"]) == ("tmp", 2)  # the document's own version
+    second = _snapshot(client)
+    assert (second["version"], second["rule_count"]) == (2, 2)
+    assert second["refreshed_at"] >= first["refreshed_at"]
+
+    assert client.delete(f"/policies/{policy_id}").status_code == 204
+    assert (_snapshot(client)["version"], _snapshot(client)["rule_count"]) == (3, 0)
+    assert client.get("/policies").json() == []
+    assert db[POLICY_META_COLLECTION].docs == [{"_id": "policies", "version": 3}]
+
+
+def test_rejected_writes_leave_the_version_alone(api):
+    client, _ = api
+    policy_id = client.post("/policies", json={"name": "etc", "kind": "denylist", "definition": DENY_ETC}).json()["id"]
+    invalid = {"rules": [{"effect": "maybe", "match": {}}]}
+    assert client.post("/policies", json={"name": "bad", "kind": "dsl", "definition": invalid}).status_code == 422
+    assert client.put(f"/policies/{policy_id}", json={"name": "bad", "kind": "dsl", "definition": invalid}).status_code == 422
+    missing = "65f000000000000000000000"
+    assert client.put(f"/policies/{missing}", json={"name": "x", "kind": "dsl", "definition": DENY_ETC}).status_code == 404
+    assert client.delete(f"/policies/{missing}").status_code == 404
+    assert client.delete("/policies/not-an-id").status_code == 404
+    assert _snapshot(client)["version"] == 1
+
+
+def _evaluate(resource: str, times: int) -> None:
+    policy = store.current_snapshot().policy
+    action = Action(action_id="a", agent_id="bot", type="read_file", resource=resource)
+    for _ in range(times):
+        evaluate(action, policy, backend="linear")
+
+
+@pytest.mark.parametrize("sample_rate", [0.25, 0.5, 1.0])
+def test_stats_count_matches_and_scale_sampled_tries(api, monkeypatch, sample_rate):
+    client, _ = api
+    monkeypatch.setattr(settings, "policy_profile_enabled", True)
+    monkeypatch.setattr(settings, "policy_profile_sample_rate", sample_rate)
+    deny_id = client.post("/policies", json={"name": "etc", "kind": "denylist", "definition": DENY_ETC}).json()["id"]
+    allow_id = client.post("/policies", json={"name": "tmp", "kind": "allowlist", "definition": ALLOW_TMP}).json()["id"]
+    # Linear order: deny /etc/*, then allow read_file /tmp/*, then allow list_dir /tmp/*.
+    _evaluate("/etc/passwd", 20)
+    _evaluate("/tmp/x", 100)
+
+    deny = client.get(f"/policies/{deny_id}/stats").json()
+    allow = client.get(f"/policies/{allow_id}/stats").json()
+    assert (allow["profiling"], allow["sample_rate"], allow["evaluations"]) == (True, sample_rate, 120)
+    assert allow["sampled"] == 120 * sample_rate
+    assert (deny["matches"], allow["matches"]) == (20, 100)
+    assert [(r["position"], r["effect"], r["matches"]) for r in allow["rules"]] == [(0, "allow", 100), (1, "allow", 0)]
+    # Every evaluation tries the deny rule; only /tmp ones reach the first allow rule. The timed
+    # sample is scaled back up, so the estimates do not depend on the sample rate.
+    assert [r["sampled_tries"] for r in deny["rules"] + allow["rules"]] == [120 * sample_rate, 100 * sample_rate, 0]
+    assert [r["estimated_tries"] for r in deny["rules"] + allow["rules"]] == [120, 100, 0]
+    assert allow["rules"][0]["mean_match_ns"] > 0 and allow["rules"][1]["mean_match_ns"] is None
+    assert allow["rules"][0]["match"] == ALLOW_TMP["rules"][0]["match"]
+
+
+def test_stats_are_empty_without_profiling(api, monkeypatch):
+    client, _ = api
+    monkeypatch.setattr(settings, "policy_profile_enabled", False)
+    policy_id = client.post("/policies", json={"name": "etc", "kind": "denylist", "definition": DENY_ETC}).json()["id"]
+    _evaluate("/etc/passwd", 10)
+    assert client.get(f"/policies/{policy_id}/stats").json() == {
+        "policy_id": policy_id, "profiling": False, "sample_rate": 0.0, "since": None, "evaluations": 0, "sampled": 0,
+        "matches": 0, "sampled_tries": 0, "sampled_match_ns": 0, "rules": [],
+    }
+    assert client.get("/policies/65f000000000000000000000/stats").status_code == 404
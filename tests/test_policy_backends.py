@@ -0,0 +1,13 @@
+"""Every policy match backend (linear, indexed, combined) agrees with the original rule-walking evaluate."""
+import random
+
+import pytest
+
+from app.policy.fuzz import first_mismatch
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_backends_match_reference(seed):
+    checked, mismatch = first_mismatch(random.Random(seed), policies=40, max_rules=60, actions=40)
+    assert mismatch is None, mismatch
+    assert checked == 40 * 40
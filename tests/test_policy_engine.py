@@ -0,0 +1,108 @@
+"""Policy evaluation (app/policy/engine.py) beyond backend equivalence."""
+import asyncio
+import json
+
+import pytest
+
+from app.models import Action, BatchEvaluateItem
+from app.pipeline import decide
+from app.policy import engine
+from app.policy.compiler import compile_policy
+from app.policy.engine import enable_profiling, evaluate, explain, profile_by_policy
+
+
+def _action(resource: str) -> Action:
+    return Action(action_id="t", agent_id="bot", type="read_file", resource=resource)
+
+
+def test_raw_rule_list_is_compiled_once_per_content(monkeypatch):
+    compiled = []
+    compile_policy = engine.compile_policy
+
+    def counting(rules):
+        compiled.append(len(rules))
+        return compile_policy(rules)
+
+    monkeypatch.setattr(engine, "compile_policy", counting)
+    monkeypatch.setattr(engine, "_raw_policies", {})
+    rules = [{"effect": "deny", "match": {"resource_pattern": "/etc/*"}}]
+    assert evaluate(_action("/etc/passwd"), rules) == "denied"
+    assert evaluate(_action("/tmp/x"), rules) == "unknown"
+    assert evaluate(_action("/tmp/x"), list(rules)) == "unknown"  # another list, same content
+    assert compiled == [1]
+
+    rules.append({"effect": "allow", "match": {"resource_pattern": "/tmp/*"}})
+    assert evaluate(_action("/tmp/x"), rules) == "allowed"
+    assert compiled == [1, 2]
+
+
+def test_raw_rule_list_edited_in_place_is_recompiled(monkeypatch):
+    monkeypatch.setattr(engine, "_raw_policies", {})
+    rules = [{"effect": "allow", "match": {"resource_pattern": "/etc/*"}}]
+    assert evaluate(_action("/etc/passwd"), rules) == "allowed"
+    rules[0] = {"effect": "deny", "match": {"resource_pattern": "/etc/*"}}
+    assert evaluate(_action("/etc/passwd"), rules) == "denied"
+    rules[0]["match"]["resource_pattern"] = "/var/*"
+    assert evaluate(_action("/etc/passwd"), rules) == "unknown"
+    assert explain(_action("/var/log"), rules)[0] == "denied"
+
+
+def _two_policies():
+    rules = [
+        {"effect": "deny", "match": {"resource_pattern": "/etc/*"}},
+        {"effect": "deny", "match": {"action_type": "delete_file"}},
+        {"effect": "allow", "match": {"resource_pattern": "/tmp/*"}},
+    ]
+    return compile_policy(rules, origins=[("p1", 0), ("p1", 1), ("p2", 0)])
+
+
+@pytest.mark.parametrize("backend", engine.BACKENDS)
+def test_explain_reports_the_deciding_rule_and_tries(backend):
+    policy = _two_policies()
+    decision, rule, tried = explain(_action("/tmp/x"), policy, backend)
+    assert decision == "allowed"
+    assert (rule.policy_id, rule.position) == ("p2", 0)
+    assert tried == (3 if backend == "linear" else 1)  # the index skips the /etc/* rule and the delete_file rule
+    assert explain(_action("/var/x"), policy, backend)[::2] == ("unknown", 3 if backend == "linear" else 0)
+    assert explain(_action("/etc/passwd"), policy, backend)[0] == evaluate(_action("/etc/passwd"), policy, backend)
+
+
+def test_profile_counts_every_evaluation_and_samples_tries():
+    policy = _two_policies()
+    profile = enable_profiling(policy, 0.5)
+    for resource in ["/tmp/a", "/tmp/b", "/etc/passwd", "/etc/hosts", "/var/x", "/var/y"]:
+        evaluate(_action(resource), policy, "linear")
+    assert (profile.evaluations, profile.sampled, profile.unmatched) == (6, 3, 2)
+    assert profile.matches == [2, 0, 2]
+    assert profile.tries == [3, 2, 2]  # sampled: /tmp/b, /etc/hosts, /var/y
+
+    grouped = profile_by_policy(policy)
+    assert set(grouped) == {"p1", "p2"}
+    p1 = grouped["p1"]
+    assert (p1["matches"], p1["sampled_tries"]) == (2, 5)
+    assert [(r["position"], r["matches"], r["estimated_tries"]) for r in p1["rules"]] == [(0, 2, 6), (1, 0, 4)]
+    assert grouped["p2"]["rules"][0]["match"] == {"resource_pattern": "/tmp/*"}
+    assert all(r["mean_match_ns"] is not None for r in p1["rules"])
+
+
+def test_zero_sample_rate_only_counts_matches():
+    policy = _two_policies()
+    profile = enable_profiling(policy, 0)
+    explain(_action("/tmp/a"), policy, "linear")
+    evaluate(_action("/etc/passwd"), policy, "combined")
+    assert (profile.evaluations, profile.sampled, profile.tries) == (2, 0, [0, 0, 0])
+    assert profile.matches == [1, 0, 1]
+    assert profile_by_policy(policy)["p1"]["rules"][0]["estimated_tries"] == 0
+    assert profile_by_policy(_two_policies()) == {}
+
+
+def test_explain_field_is_only_serialized_for_explain_requests():
+    policy = _two_policies()
+    plain, _ = asyncio.run(decide(_action("/tmp/x"), policy))
+    explained, _ = asyncio.run(decide(_action("/tmp/x"), policy, explain=True))
+    assert "explain" not in json.loads(plain.model_dump_json())
+    assert "explain" not in BatchEvaluateItem(index=0, action_id="t", result=plain).model_dump()["result"]
+    assert json.loads(plain.model_dump_json())["approval_id"] is None  # other null fields stay
+    body = json.loads(explained.model_dump_json())
+    assert body["explain"]["rules_tried"] == 1
+    assert body["explain"]["rule"]["policy_id"] == "p2"
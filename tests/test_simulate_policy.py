@@ -0,0 +1,108 @@
+"""Policy replay (scripts/simulate_policy.py): policy file shapes, chunked process-pool runs, flips and diffs."""
+import argparse
+import json
+
+import pytest
+
+from scripts.simulate_policy import load_rules, simulate
+
+CURRENT = [
+    {"effect": "allow", "match": {"action_type": "read_file", "resource_pattern": "/tmp/*"}},
+    {"effect": "deny", "match": {"resource_pattern": "/etc/*"}},
+]
+CANDIDATE = [
+    {"effect": "deny", "match": {"resource_pattern": "/tmp/secret*"}},
+    *CURRENT,
+    {"effect": "allow", "match": {"action_type": "send_email"}},
+]
+
+
+@pytest.mark.parametrize("shape", [
+    {"rules": CURRENT},
+    {"definition": {"rules": CURRENT}},
+    CURRENT,
+    [{"name": "a", "definition": {"rules": CURRENT[:1]}}, {"name": "b", "definition": {"rules": CURRENT[1:]}}],
+    [{"name": "empty", "definition": None}, *CURRENT],
+])
+def test_load_rules_flattens_each_file_shape(tmp_path, shape):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps(shape))
+    assert load_rules(str(path)) == CURRENT
+
+
+def test_no_file_means_no_rules():
+    assert load_rules(None) == []
+
+
+def _actions(tmp_path, n: int = 400) -> str:
+    """Every 5th action reads a secret, every 5th sends email, every 5th touches /etc; one line in 50 is invalid."""
+    kinds = [
+        {"type": "read_file", "resource": "/tmp/a"},
+        {"type": "read_file", "resource": "/tmp/secret.txt"},
+        {"type": "send_email", "resource": "cfo@example.com"},
+        {"type": "write_file", "resource": "/etc/hosts"},
+        {"type": "http_request", "resource": "https://example.com"},
+    ]
+    lines = []
+    for i in range(n):
+        if i % 50 == 49:
+            lines.append('{"action_id": "broken", "type": ')
+        else:
+            lines.append(json.dumps({"action_id": f"a{i}", "agent_id": "bot", **kinds[i % 5]}))
+        if i % 100 == 0:
+            lines.append("")
+    path = tmp_path / "actions.jsonl"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def _args(tmp_path, actions: str, **overrides) -> argparse.Namespace:
+    for name, rules in (("current", CURRENT), ("candidate", CANDIDATE)):
+        (tmp_path / f"{name}.json").write_text(json.dumps({"rules": rules}))
+    values = {
+        "actions": actions,
+        "current": str(tmp_path / "current.json"),
+        "candidate": str(tmp_path / "candidate.json"),
+        "workers": 1,
+        "chunk_size": 10_000,
+        "backend": None,
+        "diffs_out": None,
+        "max_diffs": 100_000,
+    }
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+def _comparable(report: dict) -> dict:
+    return {k: v for k, v in report.items() if k not in ("elapsed_seconds", "actions_per_second")}
+
+
+def test_chunked_pool_run_matches_a_single_process_run(tmp_path):
+    actions = _actions(tmp_path)
+    single = simulate(_args(tmp_path, actions))
+    chunked = simulate(_args(tmp_path, actions, workers=3, chunk_size=7))
+    assert _comparable(chunked) == _comparable(single)
+
+
+def test_counts_transitions_and_invalid_lines(tmp_path):
+    report = simulate(_args(tmp_path, _actions(tmp_path), workers=2, chunk_size=33))
+    # 400 actions: 8 invalid lines (i % 50 == 49, all http_request); 392 valid, 80 of each kind but 72 http_request.
+    assert report["actions"] == 392 and report["invalid_lines"] == 8
+    assert report["current"] == {"allowed": 160, "denied": 80, "unknown": 152}
+    assert report["candidate"] == {"allowed": 160, "denied": 160, "unknown": 72}
+    assert report["transitions"] == {"allowed->denied": 80, "unknown->allowed": 80}
+    assert report["flipped"] == 160
+    assert report["llm_fallthrough"] == {"current": 152, "candidate": 72, "delta": -80}
+    assert report["rules"] == {"current": 2, "candidate": 4}
+
+
+def test_diffs_are_capped_across_chunks(tmp_path):
+    diffs = tmp_path / "diffs.jsonl"
+    report = simulate(_args(tmp_path, _actions(tmp_path), workers=2, chunk_size=9, diffs_out=str(diffs), max_diffs=25))
+    written = [json.loads(line) for line in diffs.read_text().splitlines()]
+    assert report["flipped"] == 160
+    assert len(written) == 25
+    assert {(d["current"], d["candidate"]) for d in written} <= {("allowed", "denied"), ("unknown", "allowed")}
+    lines = (tmp_path / "actions.jsonl").read_text().splitlines()
+    for d in written:
+        assert json.loads(lines[d["line"] - 1])["action_id"] == d["action_id"]  # line numbers are 1-based file lines
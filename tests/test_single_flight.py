@@ -0,0 +1,88 @@
+"""Single-flight (app/llm/singleflight.py): coalescing, shared errors and waiter cancellation."""
+import asyncio
+
+import pytest
+
+from app.llm.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("k", fn) for _ in range(5)), flights.do("other", fn))
+        again = await flights.do("k", fn)  # the first flight has landed: runs again
+        return results, again
+
+    results, again = asyncio.run(run())
+    assert results == ["result"] * 6 and again == "result"
+    assert len(calls) == 3
+    assert flights.stats() == {"in_flight": 0, "executions": 3, "coalesced": 4}
+
+
+def test_exception_reaches_every_waiter():
+    flights = SingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("provider down")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", fn) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert [type(e) for e in errors] == [ValueError] * 3
+    assert flights.stats()["executions"] == 1
+
+
+def test_cancelled_waiter_detaches_without_cancelling_the_call():
+    flights = SingleFlight()
+    finished = []
+
+    async def fn():
+        await asyncio.sleep(0.02)
+        finished.append(True)
+        return "result"
+
+    async def run():
+        leader = asyncio.create_task(flights.do("k", fn))
+        follower = asyncio.create_task(flights.do("k", fn))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result
+
+    assert asyncio.run(run()) == "result"
+    assert finished == [True]
+
+
+def test_call_is_cancelled_when_every_waiter_is():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def fn():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        waiters = [asyncio.create_task(flights.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0.005)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flights.stats()["in_flight"]
+
+    assert asyncio.run(run()) == 0
+    assert cancelled == [True]
@@ -0,0 +1,113 @@
+"""Redis Streams consumer (app/stream/consumer.py) against the in-process FakeRedis."""
+import asyncio
+import json
+
+from app.models import Action
+from app.stream import consumer as consumer_module
+from app.stream.consumer import StreamConsumer
+from tests.fakes import FakeDatabase, FakeRedis
+
+
+def _consumer(redis: FakeRedis, **kwargs) -> StreamConsumer:
+    return StreamConsumer(
+        redis,
+        FakeDatabase(),
+        stream="actions",
+        results_stream="decisions",
+        dead_letter_stream="actions:dead",
+        group="g",
+        consumer="c1",
+        block_ms=1,
+        claim_idle_ms=1,
+        claim_interval_seconds=0.001,
+        **kwargs,
+    )
+
+
+def _action(n: int) -> str:
+    return Action(action_id=f"a{n}", agent_id="bot", type="read_file", resource=f"/tmp/{n}").model_dump_json()
+
+
+def test_processes_batch_and_acks():
+    async def run():
+        redis = FakeRedis()
+        consumer = _consumer(redis)
+        for n in range(3):
+            await redis.xadd("actions", {"action": _action(n)})
+        await redis.xadd("actions", {"action": "not json"})
+        assert await consumer.run_once() == 4
+        return redis, consumer
+
+    redis, consumer = asyncio.run(run())
+    results = [fields for _, fields in redis.streams["decisions"]]
+    assert [r["action_id"] for r in results] == ["a0", "a1", "a2", ""]
+    assert json.loads(results[0]["result"])["action_id"] == "a0"
+    assert results[3]["error"].startswith("invalid action")
+    assert redis.groups[("actions", "g")].pending == {}
+    assert consumer.stats()["processed"] == 4
+
+
+def test_failing_entry_is_dead_lettered_after_max_deliveries(monkeypatch):
+    async def failing_pipeline(*args, **kwargs):
+        raise RuntimeError("pipeline down")
+
+    monkeypatch.setattr(consumer_module, "run_pipeline", failing_pipeline)
+
+    async def run():
+        redis = FakeRedis()
+        consumer = _consumer(redis, max_deliveries=2)
+        await redis.xadd("actions", {"action": _action(0)})
+        await consumer.run_once()  # delivery 1 fails, entry stays pending
+        for _ in range(3):  # reclaimed: delivery 2 fails, then dead-lettered
+            await asyncio.sleep(0.005)
+            await consumer._read_once()
+            await consumer.drain()
+        return redis, consumer
+
+    redis, consumer = asyncio.run(run())
+    [(_, dead)] = redis.streams["actions:dead"]
+    assert dead["entry_id"] == "1-0"
+    assert dead["deliveries"] == "2"
+    assert json.loads(dead["action"])["action_id"] == "a0"
+    assert redis.groups[("actions", "g")].pending == {}
+    assert "decisions" not in redis.streams
+    assert consumer.stats()["dead_lettered"] == 1
+    assert consumer.stats()["failed"] == 2
+
+
+class _UnavailableRedis(FakeRedis):
+    """Refuses the first `failures` xgroup_create calls, as Redis does while it is still starting."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+        self.group_attempts = 0
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        self.group_attempts += 1
+        if self.group_attempts <= self.failures:
+            raise ConnectionError("Connection refused")
+        return await super().xgroup_create(name, groupname, id=id, mkstream=mkstream)
+
+
+def test_run_retries_group_creation_until_redis_is_up(monkeypatch, caplog):
+    monkeypatch.setattr(consumer_module, "_RETRY_SECONDS", 0.001)
+
+    async def run():
+        redis = _UnavailableRedis(failures=3)
+        consumer = _consumer(redis)
+        await redis.xadd("actions", {"action": _action(0)})
+        task = asyncio.create_task(consumer.run())
+        for _ in range(200):
+            await asyncio.sleep(0.005)
+            if consumer.processed:
+                break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return redis, consumer, task
+
+    redis, consumer, task = asyncio.run(run())
+    assert task.cancelled()  # still running: the connection errors did not escape run()
+    assert redis.group_attempts == 4
+    assert consumer.processed == 1
+    assert caplog.text.count("stream read failed (Connection refused); retrying") == 3
@@ -0,0 +1,91 @@
+"""Scorer payload digest (app/llm/summarize.py): byte budget, field priority, markers and bounded work."""
+import json
+import random
+import time
+
+import pytest
+
+from app.llm.summarize import summarize_payload
+
+BUDGETS = (2, 16, 64, 200, 512, 1024, 4096)
+
+
+def _payload(rng: random.Random, depth: int = 0):
+    roll = rng.random()
+    if depth < 4 and roll < 0.3:
+        return {f"k{i}ü": _payload(rng, depth + 1) for i in range(rng.randint(0, 8))}
+    if depth < 4 and roll < 0.45:
+        return [_payload(rng, depth + 1) for _ in range(rng.randint(0, 10))]
+    if roll < 0.7:
+        return "naïve € 😀 " * rng.randint(0, 100)
+    return rng.choice([1, 2.5, None, True, "x" * rng.randint(0, 400)])
+
+
+@pytest.mark.parametrize("budget", BUDGETS)
+def test_digest_fits_the_budget_in_utf8_bytes(budget):
+    rng = random.Random(budget)
+    for _ in range(200):
+        payload = _payload(rng)
+        out = summarize_payload(payload, budget)
+        assert len(out.encode()) <= budget, (payload, out)
+        json.loads(out)
+
+
+def test_security_keys_survive_ahead_of_bulk_text():
+    payload = {
+        "body": "lorem ipsum " * 5000,
+        "notes": ["filler text"] * 50,
+        "meta": {"headers": {"Authorization": "Bearer abc"}, "trace": "t" * 300},
+        "to": ["cfo@example.com", "ops@example.com"],
+        "command": "rm -rf /var/lib/db",
+        "attachment": "https://files.example.com/export.csv",
+    }
+    digest = json.loads(summarize_payload(payload, 256))
+    assert digest["to"] == ["cfo@example.com", "ops@example.com"]
+    assert digest["command"] == "rm -rf /var/lib/db"
+    assert digest["attachment"] == "https://files.example.com/export.csv"
+    assert "body" not in digest or digest["body"].startswith("[60000 chars, prefix hash ")
+
+
+def test_long_text_is_elided_with_size_and_prefix_hash():
+    digest = json.loads(summarize_payload({"body": "word " * 100}, 1024))
+    assert digest["body"].startswith("[500 chars, prefix hash ")
+    assert digest["body"].endswith("word…")
+    other = json.loads(summarize_payload({"body": "word " * 100 + "x"}, 1024))["body"]
+    assert other.split("]")[0] != digest["body"].split("]")[0]  # the size differs even when the prefix is equal
+
+
+def test_containers_that_did_not_fit_end_with_more_markers():
+    digest = json.loads(summarize_payload({"items": list(range(100)), **{f"f{i}": "v" for i in range(100)}}, 1024))
+    assert digest["items"] == [0, 1, 2, "+97 more"]  # lists show their first few items
+    assert digest["…"] == "+37 more"  # dicts take at most 64 of their 101 keys
+    small = json.loads(summarize_payload({f"f{i}": "value" for i in range(50)}, 120))
+    assert small["…"] == f"+{50 - len(small) + 1} more"
+
+
+def test_relevant_lists_keep_more_items():
+    recipients = [f"user{i}@example.com" for i in range(40)]
+    digest = json.loads(summarize_payload({"recipients": recipients}, 4096))
+    assert digest["recipients"][:32] == recipients[:32]
+    assert digest["recipients"][32:] == ["+8 more"]
+
+
+def test_scalar_payloads_fit_the_budget():
+    assert summarize_payload("short", 64) == '"short"'
+    assert json.loads(summarize_payload("é" * 1000, 64)).startswith("[1000 chars, prefix hash ")
+    assert json.loads(summarize_payload("é" * 1000, 20)) == "é" * 7 + "…"  # 2 quotes, 7 two-byte characters and a 3-byte ellipsis
+    assert summarize_payload(12345, 3) == '""'
+
+
+def test_work_is_bounded_on_multi_megabyte_input():
+    payload = {
+        "body": "ü" * 16_000_000,
+        "rows": [{"n": i, "text": "row"} for i in range(200_000)],
+        **{f"k{i}": i for i in range(100_000)},
+    }
+    started = time.perf_counter()
+    for _ in range(20):
+        out = summarize_payload(payload, 1024)
+    # Hashing or encoding the whole body would take over a second for 20 digests.
+    assert time.perf_counter() - started < 0.5
+    assert len(out.encode()) <= 1024